@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+#
+# ===========================================================
+# benchmark_html_text.py
+# Part of the DOCUFIND Project (MCP-based Document Processor)
+#
+# Description:
+#   Microbenchmark of the per-email HTML cleanup cost: body
+#   extraction (EmailProcessor._get_email_body) and concept
+#   extraction (DocuFindProcessor._extract_email_concept).
+# ===========================================================
+
+"""
+Benchmark HTML - DOCUFIND
+Mide el coste por correo de convertir HTML a texto (cuerpo y concepto)
+"""
+
+import sys
+import time
+import argparse
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+
+src_dir = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(src_dir))
+
+from email_processor import EmailProcessor
+from find_documents_main import DocuFindProcessor
+
+def build_marketing_email(items: int = 60) -> str:
+    """Genera un correo HTML tipo factura/marketing con CSS, scripts y tablas"""
+    rows = ''.join(
+        f'<tr><td style="padding:8px;color:#333333;font-family:Arial, Helvetica, sans-serif">'
+        f'Producto {i} &ndash; Suscripci&oacute;n mensual</td>'
+        f'<td class="custom-price" style="text-align:right;font-weight:bold">$ {i * 3}.99</td></tr>'
+        for i in range(items)
+    )
+    css = ''.join(f'.custom-{i}{{margin:0 auto;padding:{i}px;color:rgb(51, 51, 51)}}\n' for i in range(80))
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>Tu factura</title>'
+        f'<style type="text/css">{css}</style>'
+        '<!--[if mso]><style>table {border-collapse:collapse;}</style><![endif]-->'
+        '<script>window.dataLayer = window.dataLayer || []; function gtag(){dataLayer.push(arguments);}</script>'
+        '</head><body style="margin:0;background:#f4f4f4">'
+        '<div class="custom-header" style="font-family:system-ui, BlinkMacSystemFont, Segoe UI, Roboto">'
+        '<h1>Factura No. INV-2024-0042</h1><p>Hola,&nbsp;gracias por tu compra en '
+        '<a href="https://www.example.com/track?id=123">Example&amp;Co</a>.</p></div>'
+        f'<table width="100%" cellpadding="0">{rows}</table>'
+        '<p style="font-size:12px">Total a pagar: <b>$ 5,490.00 USD</b></p>'
+        '<p>Contacto: facturacion@example.com &copy; 2024</p>'
+        '</body></html>'
+    )
+
+def bench(label: str, func, repeat: int) -> float:
+    """Ejecuta func repeat veces y muestra el coste medio en microsegundos"""
+    func()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    per_call = (time.perf_counter() - start) / repeat * 1e6
+    print(f"  {label:<40} {per_call:10.1f} µs/correo")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark de limpieza HTML por correo')
+    parser.add_argument('--repeat', type=int, default=300, help='Repeticiones por medición')
+    parser.add_argument('--items', type=int, default=60, help='Filas de la tabla del correo')
+    args = parser.parse_args()
+
+    html = build_marketing_email(args.items)
+
+    message = MIMEMultipart('alternative')
+    message['Subject'] = 'Tu factura de diciembre'
+    message.attach(MIMEText(html, 'html', 'utf-8'))
+
+    email_processor = EmailProcessor.__new__(EmailProcessor)
+    processor = DocuFindProcessor.__new__(DocuFindProcessor)
+    email_info = {'subject': 'Tu factura de diciembre', 'body': html}
+
+    print(f"📏 Correo HTML de {len(html) / 1024:.1f} KB, {args.repeat} repeticiones")
+    body_cost = bench('_get_email_body (MIME → texto)', lambda: email_processor._get_email_body(message), args.repeat)
+    concept_cost = bench('_extract_email_concept (HTML → concepto)',
+                         lambda: processor._extract_email_concept(email_info), args.repeat)
+    print(f"  {'Total por correo':<40} {body_cost + concept_cost:10.1f} µs/correo")
+
+if __name__ == "__main__":
+    main()
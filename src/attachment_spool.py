@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Attachment Spool - DOCUFIND
+Almacenamiento temporal de adjuntos con presupuesto de memoria
+"""
+
+import io
+import os
+import mmap
+import binascii
+import logging
+import shutil
+import threading
+import time
+from email.message import Message
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Iterator, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Caracteres del payload codificado que se decodifican por paso
+SPOOL_CHUNK_CHARS = 256 * 1024
+
+# Prefijo de los archivos del spool
+SPOOL_FILE_PREFIX = 'docufind-att-'
+
+# Subdirectorio propio de cada proceso (docufind-spool-<pid>): dos ejecuciones
+# simultáneas nunca borran los archivos de la otra
+SPOOL_DIR_PREFIX = 'docufind-spool-'
+
+# Antigüedad a partir de la cual se borra el spool de otro proceso cuando no
+# se puede comprobar si sigue vivo
+STALE_SPOOL_SECONDS = 24 * 3600
+
+class SpooledAttachment:
+    """
+    Contenido decodificado de un adjunto
+
+    Los adjuntos pequeños quedan en memoria como bytes; los que no caben en
+    el presupuesto se guardan en un archivo del directorio temporal, ya
+    cerrado. Solo al leer content se abre un mmap de solo lectura (se lee de
+    la caché de páginas, sin copiarlo a RAM), de modo que los adjuntos en
+    espera no ocupan descriptores de archivo.
+    """
+
+    def __init__(self, spool: 'AttachmentSpool', size: int,
+                 data: Optional[bytes] = None, path: Optional[Path] = None):
+        """
+        Args:
+            spool: Spool que reservó la memoria del adjunto
+            size: Bytes decodificados
+            data: Contenido, si quedó en memoria
+            path: Archivo con el contenido, si pasó a disco
+        """
+        self._spool = spool
+        self._data = data
+        self._map: Optional[mmap.mmap] = None
+        self.path = path
+        self.size = size
+        self.in_memory = path is None
+
+    @property
+    def content(self) -> Union[bytes, mmap.mmap]:
+        """Bytes del adjunto, o un mmap del archivo si está en disco"""
+        if self.in_memory:
+            return self._data or b''
+
+        if self._map is None and self.path is not None and self.size:
+            with open(self.path, 'rb') as f:
+                # El mmap conserva su propio descriptor; el archivo se cierra ya
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map if self._map is not None else b''
+
+    def close(self):
+        """Libera la memoria o el archivo temporal del adjunto"""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # Aún hay vistas del mmap en uso: se cierra al recolectarlas
+                pass
+            self._map = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+        if self.in_memory and self._spool is not None:
+            self._spool.release(self.size)
+        self._spool = None
+        self._data = None
+
+class AttachmentSpool:
+    """
+    Decodifica adjuntos MIME directamente a archivos temporales
+
+    El payload en base64 o quoted-printable se decodifica por bloques: mientras
+    el total en memoria de los adjuntos abiertos no supere el presupuesto se
+    quedan en RAM, y el resto se escribe a disco en el directorio temporal.
+    Así la memoria máxima no depende del número ni del tamaño de los adjuntos
+    en vuelo.
+    """
+
+    def __init__(self,
+                 directory: str = "temp",
+                 memory_budget: int = 64 * 1024 * 1024,
+                 max_file_memory: int = 4 * 1024 * 1024):
+        """
+        Inicializa el spool
+
+        Args:
+            directory: Directorio de los archivos temporales (cada proceso usa
+                su propio subdirectorio dentro de él)
+            memory_budget: Bytes máximos de adjuntos en memoria a la vez
+            max_file_memory: Bytes máximos en memoria de un solo adjunto
+        """
+        self.base_directory = Path(directory)
+        self.directory = self.base_directory / f"{SPOOL_DIR_PREFIX}{os.getpid()}"
+        self.memory_budget = max(0, int(memory_budget))
+        self.max_file_memory = max(0, min(int(max_file_memory), self.memory_budget))
+
+        self._lock = threading.Lock()
+        self.in_memory = 0
+        self.spilled = 0
+
+        self._remove_stale_spools()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _remove_stale_spools(self):
+        """
+        Borra los spools que dejaron ejecuciones interrumpidas
+
+        El del propio PID es siempre de un proceso anterior (p. ej. el PID 1
+        de un contenedor). El de otro PID solo se borra si ese proceso ya no
+        existe o, si no se puede comprobar, cuando pasa de STALE_SPOOL_SECONDS.
+        """
+        if not self.base_directory.is_dir():
+            return
+
+        now = time.time()
+        for path in self.base_directory.glob(f'{SPOOL_DIR_PREFIX}*'):
+            pid = path.name[len(SPOOL_DIR_PREFIX):]
+            if not pid.isdigit() or not path.is_dir():
+                continue
+
+            if int(pid) != os.getpid():
+                alive = _process_alive(int(pid))
+                if alive is None:
+                    try:
+                        alive = now - path.stat().st_mtime < STALE_SPOOL_SECONDS
+                    except OSError:
+                        continue
+                if alive:
+                    continue
+
+            shutil.rmtree(path, ignore_errors=True)
+
+    def store(self, part: Message) -> SpooledAttachment:
+        """
+        Decodifica el payload de una parte MIME en el spool
+
+        Args:
+            part: Parte MIME del adjunto (no multipart)
+
+        Returns:
+            Adjunto decodificado (en memoria o respaldado por archivo)
+        """
+        with self._lock:
+            allowance = min(self.max_file_memory, self.memory_budget - self.in_memory)
+            # Reserva provisional para que otros hilos no cuenten el mismo hueco
+            reserved = max(allowance, 0)
+            self.in_memory += reserved
+
+        buffer: Optional[io.BytesIO] = io.BytesIO()
+        file = None
+        size = 0
+        try:
+            for chunk in _decoded_chunks(part):
+                if file is None and size + len(chunk) > reserved:
+                    # No cabe en la reserva: lo decodificado hasta ahora pasa a disco
+                    file = NamedTemporaryFile(dir=str(self.directory), prefix=SPOOL_FILE_PREFIX,
+                                              delete=False)
+                    file.write(buffer.getvalue())
+                    buffer = None
+                (file or buffer).write(chunk)
+                size += len(chunk)
+        except Exception:
+            if file is not None:
+                file.close()
+                os.remove(file.name)
+            self.release(reserved)
+            raise
+
+        if file is not None:
+            file.close()
+            attachment = SpooledAttachment(self, size, path=Path(file.name))
+        else:
+            attachment = SpooledAttachment(self, size, data=buffer.getvalue())
+
+        # Ajustar la reserva al tamaño real (0 si pasó a disco)
+        with self._lock:
+            self.in_memory -= reserved - (size if attachment.in_memory else 0)
+            if not attachment.in_memory:
+                self.spilled += 1
+
+        if not attachment.in_memory:
+            logger.debug(f"💾 Adjunto de {size / 1024:.0f} KB en disco ({self.directory})")
+
+        return attachment
+
+    def release(self, size: int):
+        """Devuelve al presupuesto la memoria de un adjunto cerrado"""
+        with self._lock:
+            self.in_memory = max(0, self.in_memory - size)
+
+def _process_alive(pid: int) -> Optional[bool]:
+    """Indica si un proceso existe (None si no se puede saber en este sistema)"""
+    if os.name != 'posix':
+        # En Windows os.kill termina el proceso: no sirve para comprobarlo
+        return None
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, pero es de otro usuario
+        return True
+    except OSError:
+        return None
+    return True
+
+def _decoded_chunks(part: Message) -> Iterator[bytes]:
+    """Payload decodificado de la parte, por bloques"""
+    payload = part.get_payload()
+    encoding = str(part.get('Content-Transfer-Encoding', '')).strip().lower()
+
+    if not isinstance(payload, str) or encoding not in ('base64', 'quoted-printable'):
+        # 7bit/8bit/binary/uuencode: el decodificador de email ya es directo
+        yield part.get_payload(decode=True) or b''
+        return
+
+    decode = _decode_base64_chunks if encoding == 'base64' else _decode_qp_chunks
+    yield from decode(payload)
+
+def _line_chunks(payload: str):
+    """Trozos del payload de unos SPOOL_CHUNK_CHARS cortados en fin de línea"""
+    start = 0
+    length = len(payload)
+    while start < length:
+        end = start + SPOOL_CHUNK_CHARS
+        if end < length:
+            newline = payload.find('\n', end)
+            end = length if newline < 0 else newline + 1
+        yield payload[start:end]
+        start = end
+
+def _decode_base64_chunks(payload: str):
+    """Decodifica base64 por bloques (múltiplos de 4 caracteres útiles)"""
+    pending = ''
+    for chunk in _line_chunks(payload):
+        data = pending + ''.join(chunk.split())
+        usable = len(data) - len(data) % 4
+        pending = data[usable:]
+        if usable:
+            try:
+                yield binascii.a2b_base64(data[:usable])
+            except (binascii.Error, ValueError):
+                logger.debug("Bloque base64 inválido en un adjunto, se omite")
+    if pending:
+        # Relleno que falte al final (igual que el decodificador de email)
+        try:
+            yield binascii.a2b_base64(pending + '=' * (-len(pending) % 4))
+        except (binascii.Error, ValueError):
+            pass
+
+def _decode_qp_chunks(payload: str):
+    """Decodifica quoted-printable por bloques de líneas completas"""
+    for chunk in _line_chunks(payload):
+        yield binascii.a2b_qp(chunk.encode('ascii', 'surrogateescape'))
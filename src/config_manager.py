@@ -81,7 +81,13 @@ class ConfigManager:
                 "max_results": config.get("processing_options", {}).get("max_emails", 100),
                 "senders": [],  # No está en tu config actual
                 "subject_filters": config.get("search_parameters", {}).get("keywords", []),
-                "has_attachments": True
+                "has_attachments": True,
+                "fetch_batch_size": config.get("processing_options", {}).get("fetch_batch_size", 50),
+                "two_phase_fetch": config.get("processing_options", {}).get("two_phase_fetch", False),
+                "connection_pool_size": config.get("processing_options", {}).get("imap_connections", 4),
+                "spool_attachments": config.get("processing_options", {}).get("spool_attachments", True),
+                "attachment_spool_dir": config.get("processing_options", {}).get("attachment_spool_dir", "temp"),
+                "attachment_memory_mb": config.get("processing_options", {}).get("attachment_memory_mb", 64)
             },
             
             # Configuración de Google Drive - mapeando desde google_services
@@ -95,7 +101,17 @@ class ConfigManager:
                 "root_folder": config.get("google_services", {}).get("drive_folder_root", "DOCUFIND"),
                 "create_year_folders": True,
                 "create_month_folders": True,
-                "upload_reports": True
+                "upload_reports": True,
+                "sheet_batch_rows": config.get("google_services", {}).get("sheet_batch_rows", 50),
+                "sheet_flush_seconds": config.get("google_services", {}).get("sheet_flush_seconds", 30),
+                "id_cache_path": config.get("google_services", {}).get("id_cache_path", "config/drive_cache.json"),
+                "precreate_folders": config.get("google_services", {}).get("precreate_folders", True),
+                "resumable_threshold_mb": config.get("google_services", {}).get("resumable_threshold_mb", 5),
+                "upload_chunk_mb": config.get("google_services", {}).get("upload_chunk_mb", 8),
+                "upload_max_retries": config.get("google_services", {}).get("upload_max_retries", 5),
+                "upload_sessions_path": config.get("google_services", {}).get("upload_sessions_path", "config/upload_sessions.json"),
+                "rate_limits": config.get("google_services", {}).get("rate_limits", {}),
+                "api_max_retries": config.get("google_services", {}).get("api_max_retries", 5)
             },
             
             # Configuración de extracción
@@ -108,18 +124,32 @@ class ConfigManager:
                 "confidence_threshold": 0.6,
                 "supported_formats": [".pdf", ".xml", ".txt", ".html"],
                 "ocr_enabled": False,
-                "enable_ai": config.get("processing_options", {}).get("enable_ai_extraction", True)
+                "enable_ai": config.get("processing_options", {}).get("enable_ai_extraction", True),
+                "pdf_max_pages": config.get("processing_options", {}).get("pdf_max_pages", 5),
+                "pdf_max_chars": config.get("processing_options", {}).get("pdf_max_chars", 100000),
+                "window_mode": config.get("processing_options", {}).get("window_mode", "head_tail"),
+                "window_head_chars": config.get("processing_options", {}).get("window_head_chars", 8192),
+                "window_tail_chars": config.get("processing_options", {}).get("window_tail_chars", 4096)
             },
             
             # Configuración de procesamiento - mapeando desde processing_options
             "processing": {
                 "batch_size": 10,
-                "parallel_processing": False,
+                "parallel_processing": config.get("processing_options", {}).get("parallel_processing", False),
+                "extraction_workers": config.get("processing_options", {}).get("extraction_workers"),
+                "deduplicate": config.get("processing_options", {}).get("deduplicate", True),
+                "content_store_path": config.get("processing_options", {}).get("content_store_path", "config/content_store.db"),
+                "extraction_cache": config.get("processing_options", {}).get("extraction_cache", True),
+                "extraction_cache_path": config.get("processing_options", {}).get("extraction_cache_path", "config/extraction_cache.db"),
+                "run_journal": config.get("processing_options", {}).get("run_journal", True),
+                "run_journal_path": config.get("processing_options", {}).get("run_journal_path", "config/run_journal.db"),
                 "retry_failed": True,
                 "max_retries": 3,
                 "timeout_seconds": config.get("processing_options", {}).get("timeout_seconds", 300),
                 "max_emails": config.get("processing_options", {}).get("max_emails", 1000),
-                "create_backup": config.get("processing_options", {}).get("create_backup", True)
+                "create_backup": config.get("processing_options", {}).get("create_backup", True),
+                "pipeline": config.get("processing_options", {}).get("pipeline", "sequential"),
+                "pipeline_workers": config.get("processing_options", {}).get("pipeline_workers", 4)
             },
             
             # Configuración de notificaciones - mapeando desde notification_settings
@@ -156,7 +186,8 @@ class ConfigManager:
                 "date_range_days": 30,
                 "start_date": config.get("search_parameters", {}).get("start_date"),
                 "end_date": config.get("search_parameters", {}).get("end_date"),
-                "skip_processed": True,
+                "skip_processed": config.get("processing_options", {}).get("skip_processed", True),
+                "sync_state_path": config.get("processing_options", {}).get("sync_state_path", "config/sync_state.json"),
                 "min_attachment_size_kb": 1,
                 "max_attachment_size_mb": 10,
                 "allowed_extensions": [
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Content Store - DOCUFIND
+Almacén direccionado por contenido (SHA-256) de adjuntos ya procesados
+"""
+
+import json
+import mmap
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+try:
+    from src.invoice_extractor import InvoiceData
+except ImportError:
+    from invoice_extractor import InvoiceData
+
+logger = logging.getLogger(__name__)
+
+def content_hash(content: Union[bytes, str, mmap.mmap]) -> str:
+    """
+    Calcula el SHA-256 del contenido de un adjunto
+
+    Args:
+        content: Bytes del adjunto, mmap de un adjunto en disco (se lee sin
+            copiarlo) o texto, que se codifica en UTF-8
+
+    Returns:
+        Hash hexadecimal
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return hashlib.sha256(content or b'').hexdigest()
+
+class ContentStore:
+    """
+    Registro de adjuntos por hash: nombre original e ID del archivo en Drive
+
+    Permite reconocer la misma factura recibida varias veces (recordatorios,
+    copias, reenvíos) y enlazar el archivo ya subido en lugar de repetirlo.
+    """
+
+    def __init__(self, path: str = "config/content_store.db"):
+        """
+        Inicializa el almacén
+
+        Args:
+            path: Ruta de la base de datos SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                sha256 TEXT PRIMARY KEY,
+                filename TEXT,
+                drive_file_id TEXT,
+                updated_at TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el registro de un contenido
+
+        Returns:
+            Diccionario con filename y drive_file_id, o None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT filename, drive_file_id FROM documents WHERE sha256 = ?",
+                (sha256,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'filename': row[0],
+            'drive_file_id': row[1]
+        }
+
+    def put(self, sha256: str, filename: Optional[str] = None, drive_file_id: Optional[str] = None):
+        """
+        Registra (o completa) un contenido
+
+        Los campos en None no sobrescriben lo ya guardado.
+
+        Args:
+            sha256: Hash del contenido
+            filename: Nombre original del adjunto
+            drive_file_id: ID del archivo subido a Drive
+        """
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO documents (sha256, filename, drive_file_id, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha256) DO UPDATE SET
+                    filename = COALESCE(excluded.filename, filename),
+                    drive_file_id = COALESCE(excluded.drive_file_id, drive_file_id),
+                    updated_at = excluded.updated_at
+                """,
+                (sha256, filename, drive_file_id, datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+class ExtractionCache:
+    """
+    Caché persistente de resultados de InvoiceExtractor
+
+    Cada entrada guarda las huellas por grupo del extractor que la produjo
+    (límites de texto, cada juego de patrones, contexto, categorías) y el
+    estado intermedio de la extracción. Al cambiar un grupo, la entrada se
+    actualiza rehaciendo solo esa parte (InvoiceExtractor.refresh) la próxima
+    vez que aparece el documento; los que no se vuelven a ver no se tocan.
+    """
+
+    def __init__(self, path: str = "config/extraction_cache.db"):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Ruta de la base de datos SQLite
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extractions (
+                sha256 TEXT PRIMARY KEY,
+                fingerprints TEXT NOT NULL,
+                invoice_data TEXT NOT NULL,
+                state TEXT,
+                updated_at TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la extracción guardada de un contenido
+
+        Args:
+            sha256: Hash del contenido
+
+        Returns:
+            Diccionario con fingerprints, invoice_data (InvoiceData) y state
+            (estado intermedio o None), o None si no hay entrada
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprints, invoice_data, state FROM extractions WHERE sha256 = ?",
+                (sha256,)
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'fingerprints': json.loads(row[0]),
+            'invoice_data': InvoiceData.from_dict(json.loads(row[1])),
+            'state': json.loads(row[2]) if row[2] else None
+        }
+
+    def put(self, sha256: str, fingerprints: Dict[str, str], invoice_data: InvoiceData,
+            state: Optional[Dict[str, Any]] = None):
+        """
+        Guarda la extracción de un contenido (reemplaza la anterior)
+
+        Args:
+            sha256: Hash del contenido
+            fingerprints: Huellas por grupo del extractor que produjo los datos
+            invoice_data: Datos extraídos de la factura
+            state: Estado intermedio de la extracción (para actualizarla por partes)
+        """
+        data_json = json.dumps(invoice_data.to_dict(), ensure_ascii=False, default=str)
+        state_json = json.dumps(state, ensure_ascii=False, default=str) if state is not None else None
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions "
+                "(sha256, fingerprints, invoice_data, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (sha256, json.dumps(fingerprints, sort_keys=True), data_json, state_json,
+                 datetime.now().isoformat())
+            )
+            self._conn.commit()
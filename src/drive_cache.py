@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Drive Cache - DOCUFIND
+Caché persistente de IDs de Google Drive (carpetas y hojas de cálculo)
+"""
+
+import json
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class DriveIdCache:
+    """
+    Caché clave → ID de Drive que sobrevive entre ejecuciones
+
+    Los IDs guardados se consideran válidos hasta que Drive responde 404 al
+    usarlos; en ese momento se invalidan y se vuelven a resolver. Así un
+    arranque en caliente no necesita ninguna búsqueda previa.
+    """
+
+    def __init__(self, path: Optional[str] = "config/drive_cache.json"):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Ruta del archivo JSON (None para una caché solo en memoria)
+        """
+        self.path = Path(path) if path else None
+        self.ids: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Carga la caché desde disco si existe"""
+        if not self.path or not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self.ids = {str(k): str(v) for k, v in data.items() if v}
+            logger.info(f"🗂️ Caché de IDs de Drive cargada: {len(self.ids)} entradas")
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"⚠️ Caché de Drive ilegible, se ignorará: {e}")
+            self.ids = {}
+
+    def _save(self):
+        """Guarda la caché de forma atómica (archivo temporal + replace)"""
+        if not self.path:
+            return
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.ids, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ No se pudo guardar la caché de Drive: {e}")
+
+    def get(self, key: str) -> Optional[str]:
+        """Obtiene el ID guardado para una clave"""
+        return self.ids.get(key)
+
+    def set(self, key: str, file_id: str):
+        """Guarda el ID de una clave"""
+        if not file_id:
+            return
+
+        with self._lock:
+            if self.ids.get(key) == file_id:
+                return
+            self.ids[key] = file_id
+            self._save()
+
+    def delete(self, key: str):
+        """Elimina una clave (si existe)"""
+        with self._lock:
+            if self.ids.pop(key, None) is not None:
+                self._save()
+
+    def invalidate(self, file_id: str) -> int:
+        """
+        Elimina todas las claves que apuntan a un ID (p. ej. tras un 404)
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            stale = [key for key, value in self.ids.items() if value == file_id]
+            for key in stale:
+                del self.ids[key]
+            if stale:
+                self._save()
+                logger.info(f"🗑️ ID de Drive invalidado en caché: {file_id}")
+            return len(stale)
+
+    def invalidate_tree(self, folder_id: str) -> int:
+        """
+        Elimina una carpeta y todas las carpetas en caché que cuelgan de ella
+
+        Las claves de carpeta son "folder:<ID del padre>/<nombre>", así que los
+        hijos de una carpeta borrada se encuentran por el ID de su padre.
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        with self._lock:
+            stale = set()
+            pending = [folder_id]
+            while pending:
+                current = pending.pop()
+                prefix = f"folder:{current}/"
+                for key, value in self.ids.items():
+                    if key in stale:
+                        continue
+                    if value == current:
+                        stale.add(key)
+                    elif key.startswith(prefix):
+                        stale.add(key)
+                        pending.append(value)
+
+            for key in stale:
+                del self.ids[key]
+            if stale:
+                self._save()
+                logger.info(f"🗑️ Carpeta de Drive invalidada en caché con su contenido: "
+                            f"{folder_id} ({len(stale)} entradas)")
+            return len(stale)
+
+    def folder_path(self, folder_id: str) -> Optional[str]:
+        """
+        Reconstruye la ruta de una carpeta a partir de las claves en caché
+
+        Returns:
+            Ruta "A/B/C" desde la raíz de Drive, o None si falta algún tramo
+        """
+        with self._lock:
+            parents = {value: key[len("folder:"):] for key, value in self.ids.items()
+                       if key.startswith("folder:")}
+
+        parts: List[str] = []
+        current = folder_id
+        while current != 'root':
+            entry = parents.get(current)
+            if entry is None or len(parts) > len(parents):
+                return None
+            current, name = entry.split('/', 1)
+            parts.append(name)
+
+        return '/'.join(reversed(parts))
@@ -7,16 +7,55 @@ Procesador de correos con soporte para Gmail, Outlook y otros
 import imaplib
 import email
 from email.message import Message
+from email.parser import BytesFeedParser
 from email.header import decode_header
-from email.utils import parsedate_to_datetime
+from email.utils import parsedate_to_datetime, decode_rfc2231, collapse_rfc2231_value
 import logging
 import base64
 import re
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Optional, Union, Iterator, Tuple, Iterable, Callable, Set
+
+try:
+    from src.sync_state import SyncStateStore
+    from src.html_text import html_to_text
+    from src.attachment_spool import AttachmentSpool, SpooledAttachment
+except ImportError:
+    from sync_state import SyncStateStore
+    from html_text import html_to_text
+    from attachment_spool import AttachmentSpool, SpooledAttachment
 
 logger = logging.getLogger(__name__)
 
+# UID dentro de la línea de respuesta de un FETCH
+_UID_RE = re.compile(rb'UID (\d+)')
+
+# Conexiones IMAP simultáneas permitidas por cuenta según proveedor
+PROVIDER_CONNECTION_LIMITS = {
+    'gmail': 15,
+    'outlook': 20,
+    'office365': 20,
+    'yahoo': 5
+}
+
+# Bytes del mensaje crudo que se entregan al parser por paso
+_FEED_CHUNK_SIZE = 64 * 1024
+
+# Cabeceras que se piden en la fase 1 del modo de dos fases
+_HEADER_FIELDS = 'SUBJECT FROM TO DATE MESSAGE-ID'
+
+# Tokens de una respuesta IMAP: paréntesis, strings, marcas de literal y átomos
+# (los átomos pueden incluir una sección entre corchetes: BODY[HEADER.FIELDS (...)])
+_TOKEN_RE = re.compile(
+    rb'\s+|\(|\)|"(?:[^"\\]|\\.)*"|\{\d+\}\Z|[^\s()"\[]+(?:\[[^\]]*\])?[^\s()]*'
+)
+
 class EmailCredentials:
     """Credenciales para el servidor de email"""
     
@@ -61,16 +100,210 @@ class EmailConfig:
         self.subject_filters = config_dict.get('subject_filters', [])
         self.has_attachments = config_dict.get('has_attachments', True)
         self.provider = config_dict.get('provider', 'gmail')
+        self.fetch_batch_size = config_dict.get('fetch_batch_size', 50)
+        self.two_phase_fetch = config_dict.get('two_phase_fetch', False)
+        self.connection_pool_size = config_dict.get('connection_pool_size', 4)
+        self.max_connections = config_dict.get('max_connections')
+        self.spool_attachments = config_dict.get('spool_attachments', True)
+        self.attachment_spool_dir = config_dict.get('attachment_spool_dir', 'temp')
+        self.attachment_memory_mb = config_dict.get('attachment_memory_mb', 64)
+        self.max_email_retries = config_dict.get('max_email_retries', 3)
+
+class EmailAttachment(dict):
+    """
+    Adjunto de un email ya descargado.
+    
+    Se comporta como el dict clásico ('filename', 'content', 'content_type',
+    'size') pero el contenido solo se decodifica al accederlo por primera vez,
+    a partir de la parte MIME ya parseada (nunca vuelve al servidor).
+    
+    Con un AttachmentSpool el payload se decodifica en el momento al spool
+    y se descarta del mensaje; 'content' es entonces bytes (adjunto en
+    memoria) o un mmap de solo lectura (adjunto en disco), que solo se abre
+    al leer 'content' por primera vez.
+    """
+    
+    _LAZY_KEYS = ('content', 'size')
+    
+    def __init__(self, part: Message, filename: str, spool: Optional[AttachmentSpool] = None):
+        super().__init__(filename=filename, content_type=part.get_content_type())
+        self._part = part
+        self._spooled: Optional[SpooledAttachment] = None
+        
+        if spool is not None:
+            self._spooled = spool.store(part)
+            # El payload codificado ya no hace falta en el árbol del mensaje
+            part.set_payload('')
+            self._part = None
+            self['size'] = self._spooled.size
+            if self._spooled.in_memory:
+                self['content'] = self._spooled.content
+    
+    def _decode(self):
+        """Decodifica el payload de la parte MIME y libera la referencia"""
+        content = self._part.get_payload(decode=True) or b''
+        self._part = None
+        self['content'] = content
+        self['size'] = len(content)
+    
+    def __missing__(self, key):
+        if key == 'content' and self._spooled is not None:
+            # Adjunto en disco: el mmap se abre al leerlo
+            self['content'] = self._spooled.content
+            return self['content']
+        if key in self._LAZY_KEYS and self._part is not None:
+            self._decode()
+            return self[key]
+        raise KeyError(key)
+    
+    def __contains__(self, key) -> bool:
+        return (super().__contains__(key)
+                or (key in self._LAZY_KEYS and (self._part is not None or self._spooled is not None)))
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def close(self):
+        """Libera el contenido decodificado (memoria o archivo temporal)"""
+        if self._spooled is not None:
+            self._spooled.close()
+            self._spooled = None
+        self._part = None
+        self.pop('content', None)
+
+class IMAPConnectionPool:
+    """
+    Pool de sesiones IMAP autenticadas para descargar lotes en paralelo
+    
+    Las sesiones se abren bajo demanda hasta el tamaño máximo. Si el servidor
+    rechaza una nueva sesión (límite del proveedor), el pool se reduce a las
+    que ya tiene abiertas.
+    """
+    
+    def __init__(self, factory: Callable[[], imaplib.IMAP4], size: int,
+                 primary: Optional[imaplib.IMAP4] = None):
+        """
+        Inicializa el pool
+        
+        Args:
+            factory: Función que abre una sesión autenticada con la carpeta seleccionada
+            size: Número máximo de sesiones (incluida la principal)
+            primary: Sesión principal ya abierta, que se reutiliza pero no se cierra
+        """
+        self.size = max(1, size)
+        self._factory = factory
+        self._primary = primary
+        self._idle: 'queue.LifoQueue[imaplib.IMAP4]' = queue.LifoQueue()
+        self._opened: List[imaplib.IMAP4] = []
+        self._created = 0
+        self._lock = threading.Lock()
+        
+        if primary is not None:
+            self._created = 1
+            self._idle.put(primary)
+    
+    def acquire(self) -> imaplib.IMAP4:
+        """Obtiene una sesión libre, abriendo una nueva si hay cupo"""
+        while True:
+            try:
+                return self._idle.get_nowait()
+            except queue.Empty:
+                pass
+            
+            with self._lock:
+                can_open = self._created < self.size
+                if can_open:
+                    self._created += 1
+            
+            if can_open:
+                try:
+                    connection = self._factory()
+                except Exception as e:
+                    with self._lock:
+                        self._created -= 1
+                        if self._created == 0:
+                            raise
+                        self.size = self._created
+                    logger.warning(f"⚠️ No se pudo abrir otra sesión IMAP ({e}), se usan {self.size}")
+                else:
+                    with self._lock:
+                        self._opened.append(connection)
+                    return connection
+            
+            # Esperar a que otra tarea libere (o descarte) una sesión
+            try:
+                return self._idle.get(timeout=1)
+            except queue.Empty:
+                continue
+    
+    def release(self, connection: imaplib.IMAP4):
+        """Devuelve una sesión al pool"""
+        self._idle.put(connection)
+    
+    def discard(self, connection: imaplib.IMAP4):
+        """Descarta una sesión rota para que se abra otra en su lugar"""
+        with self._lock:
+            self._created -= 1
+            if connection in self._opened:
+                self._opened.remove(connection)
+        if connection is not self._primary:
+            try:
+                connection.logout()
+            except Exception:
+                pass
+    
+    @contextmanager
+    def connection(self):
+        """
+        Context manager que adquiere y libera una sesión
+
+        La sesión siempre vuelve al pool o se descarta: si se perdiera, el
+        pool quedaría sin cupo y acquire() esperaría indefinidamente.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        except imaplib.IMAP4.abort:
+            self.discard(connection)
+            raise
+        except Exception:
+            # Respuesta NO/BAD o error al interpretarla: la sesión sigue utilizable
+            self.release(connection)
+            raise
+        except BaseException:
+            # Interrumpida a mitad de una respuesta: estado desconocido
+            self.discard(connection)
+            raise
+        else:
+            self.release(connection)
+    
+    def close_all(self):
+        """Cierra las sesiones abiertas por el pool (no la principal)"""
+        with self._lock:
+            opened, self._opened = self._opened, []
+        for connection in opened:
+            try:
+                connection.logout()
+            except Exception:
+                pass
+        if opened:
+            logger.info(f"📧 {len(opened)} sesiones IMAP adicionales cerradas")
 
 class EmailProcessor:
     """Procesador principal de correos electrónicos"""
     
-    def __init__(self, config: Union[Dict[str, Any], EmailConfig]):
+    def __init__(self,
+                 config: Union[Dict[str, Any], EmailConfig],
+                 sync_state: Optional[SyncStateStore] = None):
         """
         Inicializa el procesador de email
         
         Args:
             config: Configuración del procesador (dict o EmailConfig)
+            sync_state: Estado de sincronización incremental (opcional)
         """
         # Convertir dict a EmailConfig si es necesario
         if isinstance(config, dict):
@@ -80,6 +313,27 @@ class EmailProcessor:
             
         self.connection = None
         self.connected = False
+        self.pool: Optional[IMAPConnectionPool] = None
+        
+        # Correos ya descargados y parseados (id -> datos), para no repetir FETCH
+        self._email_cache: Dict[str, Dict[str, Any]] = {}
+        
+        # Adjuntos decodificados a temp/ con un presupuesto de memoria
+        self.spool: Optional[AttachmentSpool] = None
+        if self.config.spool_attachments:
+            self.spool = AttachmentSpool(
+                self.config.attachment_spool_dir,
+                memory_budget=int(self.config.attachment_memory_mb * 1024 * 1024)
+            )
+        
+        # Sincronización incremental por UID
+        self.sync_state = sync_state
+        self.uidvalidity: Optional[int] = None
+        # UIDs por debajo del cursor que quedaron sin procesar (se reintentan)
+        self._retry_uids: Set[int] = set()
+        # UIDs de la búsqueda actual aún sin procesar
+        self._outstanding_uids: Set[int] = set()
+        self._sync_lock = threading.Lock()
         
         logger.info(f"📧 EmailProcessor inicializado para: {self.config.username}")
     
@@ -91,20 +345,7 @@ class EmailProcessor:
             True si la conexión fue exitosa
         """
         try:
-            # Crear conexión IMAP
-            if self.config.use_ssl:
-                self.connection = imaplib.IMAP4_SSL(
-                    self.config.imap_server,
-                    self.config.imap_port
-                )
-            else:
-                self.connection = imaplib.IMAP4(
-                    self.config.imap_server,
-                    self.config.imap_port
-                )
-            
-            # Login
-            self.connection.login(self.config.username, self.config.password)
+            self.connection = self._open_connection()
             self.connected = True
             
             logger.info(f"✅ Conectado exitosamente a {self.config.imap_server}")
@@ -120,8 +361,148 @@ class EmailProcessor:
             logger.error(f"❌ Error conectando al servidor: {e}")
             return False
     
+    def _open_connection(self) -> imaplib.IMAP4:
+        """
+        Abre y autentica una sesión IMAP
+        
+        Returns:
+            Conexión autenticada
+        """
+        # Crear conexión IMAP
+        if self.config.use_ssl:
+            connection = imaplib.IMAP4_SSL(
+                self.config.imap_server,
+                self.config.imap_port
+            )
+        else:
+            connection = imaplib.IMAP4(
+                self.config.imap_server,
+                self.config.imap_port
+            )
+        
+        # Login
+        connection.login(self.config.username, self.config.password)
+        return connection
+    
+    def _open_pool_session(self) -> imaplib.IMAP4:
+        """Abre una sesión adicional del pool con la carpeta ya seleccionada"""
+        connection = self._open_connection()
+        connection.select(self.config.folder)
+        return connection
+    
+    def _connection_limit(self) -> int:
+        """Máximo de sesiones simultáneas permitidas por el proveedor"""
+        if self.config.max_connections:
+            return int(self.config.max_connections)
+        
+        server = self.config.imap_server.lower()
+        for provider, limit in PROVIDER_CONNECTION_LIMITS.items():
+            if provider in server:
+                return limit
+        
+        # Por defecto, el límite por cuenta de Gmail
+        return PROVIDER_CONNECTION_LIMITS.get(self.config.provider, PROVIDER_CONNECTION_LIMITS['gmail'])
+    
+    def _get_pool(self) -> Optional[IMAPConnectionPool]:
+        """
+        Obtiene (o crea) el pool de sesiones para descargas en paralelo
+        
+        Returns:
+            Pool, o None si está configurada una sola sesión
+        """
+        size = min(int(self.config.connection_pool_size or 1), self._connection_limit())
+        if size <= 1:
+            return None
+        
+        if self.pool is None:
+            self.pool = IMAPConnectionPool(self._open_pool_session, size, primary=self.connection)
+            logger.info(f"🔀 Pool IMAP de hasta {size} sesiones")
+        
+        return self.pool
+    
+    def _run_batches(self,
+                     uids: List[bytes],
+                     batch_size: Optional[int],
+                     worker: Callable[[List[int], imaplib.IMAP4], Tuple]) -> Iterator[Tuple[int, List[int], Optional[Tuple], float, int]]:
+        """
+        Ejecuta un trabajo por lote de UIDs, en paralelo si hay pool
+        
+        Los resultados se devuelven siempre en orden de UID, aunque los lotes
+        terminen desordenados, para que las filas de la hoja sean deterministas.
+        
+        Args:
+            uids: UIDs a descargar
+            batch_size: Correos por lote (por defecto config.fetch_batch_size)
+            worker: Función (lote, conexión) -> tupla de resultados
+            
+        Yields:
+            Tupla (número de lote, lote, resultado o None, segundos, UIDs acumulados)
+        """
+        batch_size = max(1, batch_size or self.config.fetch_batch_size)
+        ordered = sorted({int(uid) for uid in uids})
+        batches = [ordered[i:i + batch_size] for i in range(0, len(ordered), batch_size)]
+        
+        pool = self._get_pool() if len(batches) > 1 else None
+        done = 0
+        
+        if pool is None:
+            for batch_num, batch in enumerate(batches, 1):
+                started = time.perf_counter()
+                try:
+                    result = worker(batch, self.connection)
+                except Exception as e:
+                    logger.error(f"❌ Error en el lote {batch_num}: {e}")
+                    result = None
+                done += len(batch)
+                yield batch_num, batch, result, time.perf_counter() - started, done
+            return
+        
+        with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix='imap') as executor:
+            pending = deque()
+            for batch_num, batch in enumerate(batches, 1):
+                pending.append((batch_num, batch, executor.submit(self._run_pooled, pool, worker, batch)))
+                
+                # Ventana acotada para no acumular lotes sin consumir
+                while len(pending) > pool.size * 2:
+                    num, done_batch, future = pending.popleft()
+                    result, elapsed = future.result()
+                    done += len(done_batch)
+                    yield num, done_batch, result, elapsed, done
+            
+            while pending:
+                num, done_batch, future = pending.popleft()
+                result, elapsed = future.result()
+                done += len(done_batch)
+                yield num, done_batch, result, elapsed, done
+    
+    def _run_pooled(self,
+                    pool: IMAPConnectionPool,
+                    worker: Callable[[List[int], imaplib.IMAP4], Tuple],
+                    batch: List[int]) -> Tuple[Optional[Tuple], float]:
+        """
+        Ejecuta un lote en una sesión del pool, reintentando una vez si se cae
+        
+        Returns:
+            Tupla (resultado o None, segundos)
+        """
+        started = time.perf_counter()
+        for attempt in range(2):
+            try:
+                with pool.connection() as connection:
+                    return worker(batch, connection), time.perf_counter() - started
+            except imaplib.IMAP4.abort as e:
+                logger.warning(f"⚠️ Sesión IMAP caída en lote {compact_uid_set(batch)}: {e}")
+            except Exception as e:
+                logger.error(f"❌ Error en el lote {compact_uid_set(batch)}: {e}")
+                break
+        return None, time.perf_counter() - started
+    
     def disconnect(self):
         """Cierra la conexión con el servidor IMAP"""
+        if self.pool:
+            self.pool.close_all()
+            self.pool = None
+        
         if self.connection and self.connected:
             try:
                 self.connection.close()
@@ -137,7 +518,10 @@ class EmailProcessor:
                      query: Optional[str] = None,
                      senders: Optional[List[str]] = None,
                      subject_filters: Optional[List[str]] = None,
-                     has_attachments: Optional[bool] = None) -> List[Dict[str, Any]]:
+                     has_attachments: Optional[bool] = None,
+                     attachment_filter: Optional[Callable[[str], bool]] = None,
+                     exclude_uids: Optional[Set[str]] = None,
+                     include_uids: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
         """
         Busca correos según los criterios especificados
         
@@ -148,64 +532,684 @@ class EmailProcessor:
             senders: Lista de remitentes específicos
             subject_filters: Palabras clave en el asunto
             has_attachments: Solo correos con adjuntos
+            attachment_filter: Regla sobre el nombre de archivo para decidir
+                qué adjuntos descargar (solo en modo de dos fases)
+            exclude_uids: UIDs que no se descargan (p. ej. ya registrados)
+            include_uids: UIDs que se buscan aunque estén bajo el cursor incremental
             
         Returns:
             Lista de correos encontrados
         """
+        try:
+            emails = list(self.iter_emails(date_from, date_to, query, senders,
+                                           subject_filters, has_attachments,
+                                           attachment_filter, exclude_uids, include_uids))
+            
+            logger.info(f"✅ {len(emails)} correos procesados exitosamente")
+            return emails
+            
+        except Exception as e:
+            logger.error(f"❌ Error buscando emails: {e}")
+            return []
+    
+    def iter_emails(self,
+                    date_from: Optional[datetime] = None,
+                    date_to: Optional[datetime] = None,
+                    query: Optional[str] = None,
+                    senders: Optional[List[str]] = None,
+                    subject_filters: Optional[List[str]] = None,
+                    has_attachments: Optional[bool] = None,
+                    attachment_filter: Optional[Callable[[str], bool]] = None,
+                    exclude_uids: Optional[Set[str]] = None,
+                    include_uids: Optional[Set[str]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Igual que search_emails, pero devuelve los correos a medida que se descargan
+        
+        Los errores de conexión o búsqueda se propagan al consumidor.
+        
+        Yields:
+            Diccionario con los datos de cada email, en orden de UID
+        """
+        uids = self.search_uids(date_from, date_to, query, senders,
+                                subject_filters, has_attachments, exclude_uids, include_uids)
+        if not uids:
+            return
+        
+        if self.config.two_phase_fetch:
+            yield from self.fetch_emails_two_phase(
+                uids,
+                senders=senders or self.config.senders,
+                subject_filters=subject_filters or self.config.subject_filters,
+                has_attachments=has_attachments if has_attachments is not None else self.config.has_attachments,
+                attachment_filter=attachment_filter
+            )
+        else:
+            yield from self.fetch_emails(uids)
+    
+    def search_uids(self,
+                    date_from: Optional[datetime] = None,
+                    date_to: Optional[datetime] = None,
+                    query: Optional[str] = None,
+                    senders: Optional[List[str]] = None,
+                    subject_filters: Optional[List[str]] = None,
+                    has_attachments: Optional[bool] = None,
+                    exclude_uids: Optional[Set[str]] = None,
+                    include_uids: Optional[Set[str]] = None) -> List[bytes]:
+        """
+        Ejecuta la búsqueda IMAP y devuelve los UIDs encontrados
+        
+        Args:
+            date_from: Fecha inicial
+            date_to: Fecha final
+            query: Query adicional de búsqueda
+            senders: Lista de remitentes específicos
+            subject_filters: Palabras clave en el asunto
+            has_attachments: Solo correos con adjuntos
+            exclude_uids: UIDs que se descartan (después de aplicar max_results)
+            include_uids: UIDs que se buscan aunque estén bajo el cursor incremental
+                (p. ej. los pendientes de una ejecución reanudada)
+            
+        Returns:
+            Lista de UIDs (ya limitada a max_results)
+        """
         if not self.connected:
             if not self.connect():
                 return []
         
+        # Resolver desde qué UID buscar (sincronización incremental)
+        since_uid = None
+        retry_uids: Set[int] = set()
+        extra_uids: Set[int] = set()
+        if self.sync_state:
+            since_uid, has_new = self._resolve_since_uid()
+            if since_uid is not None:
+                retry_uids = set(self._retry_uids)
+                extra_uids = retry_uids | {int(uid) for uid in include_uids or ()}
+            if not has_new and not extra_uids:
+                logger.info(f"📭 Sin correos nuevos desde la última ejecución (UID {since_uid})")
+                return []
+        
+        # Seleccionar carpeta
+        self.connection.select(self.config.folder)
+        
+        # Construir query de búsqueda
+        search_criteria = self._build_search_criteria(
+            date_from, date_to, query,
+            senders or self.config.senders,
+            subject_filters or self.config.subject_filters,
+            has_attachments if has_attachments is not None else self.config.has_attachments
+        )
+        
+        if since_uid is not None and extra_uids:
+            # Los pendientes de ejecuciones anteriores entran aunque estén bajo el cursor
+            search_criteria = (f'OR UID {compact_uid_set(sorted(extra_uids))} '
+                               f'UID {since_uid + 1}:* {search_criteria}')
+        elif since_uid is not None:
+            search_criteria = f'UID {since_uid + 1}:* {search_criteria}'
+        
+        logger.info(f"🔍 Buscando correos con criterio: {search_criteria}")
+        
+        # Ejecutar búsqueda por UID (estables entre sesiones)
+        typ, data = self.connection.uid('SEARCH', None, search_criteria)
+        
+        if typ != 'OK':
+            logger.error("❌ Error en la búsqueda")
+            return []
+        
+        uids = data[0].split()
+        
+        # "n:*" siempre incluye el último UID aunque sea menor que n
+        if since_uid is not None:
+            uids = [uid for uid in uids if int(uid) > since_uid or int(uid) in extra_uids]
+            
+            # Pendientes que ya no aparecen (borrados o fuera del periodo): se olvidan
+            found = {int(uid) for uid in uids}
+            missing = retry_uids - found
+            if missing:
+                logger.info(f"🔖 {len(missing)} correos pendientes ya no aparecen en la búsqueda")
+                self._retry_uids -= missing
+            if retry_uids & found:
+                logger.info(f"🔁 Reintentando {len(retry_uids & found)} correos pendientes de ejecuciones anteriores")
+        
+        if not uids:
+            logger.info("📭 No se encontraron correos con los criterios especificados")
+            return []
+        
+        logger.info(f"📬 Se encontraron {len(uids)} correos")
+        
+        # Limitar resultados si es necesario
+        if self.config.max_results and len(uids) > self.config.max_results:
+            if since_uid is not None:
+                # En modo incremental se toman los más antiguos para no dejar huecos
+                uids = uids[:self.config.max_results]
+                logger.info(f"📊 Limitando a los {self.config.max_results} correos más antiguos pendientes")
+            else:
+                uids = uids[-self.config.max_results:]
+                logger.info(f"📊 Limitando a los últimos {self.config.max_results} correos")
+        
+        # Después del límite, para que el conjunto sea el mismo que sin exclusiones
+        if exclude_uids:
+            found = len(uids)
+            uids = [uid for uid in uids if uid.decode() not in exclude_uids]
+            if len(uids) < found:
+                logger.info(f"⏭️ Se omiten {found - len(uids)} correos ya registrados")
+        
+        self._outstanding_uids = {int(uid) for uid in uids}
+        return uids
+    
+    def _folder_status(self) -> Dict[str, int]:
+        """
+        Consulta UIDNEXT y UIDVALIDITY de la carpeta con STATUS (sin seleccionarla)
+        
+        Returns:
+            Diccionario con los valores devueltos por el servidor
+        """
+        folder = self.config.folder
+        if ' ' in folder and not folder.startswith('"'):
+            folder = f'"{folder}"'
+        
+        typ, data = self.connection.status(folder, '(UIDNEXT UIDVALIDITY)')
+        if typ != 'OK' or not data or not data[0]:
+            return {}
+        
+        return {
+            key.decode(): int(value)
+            for key, value in re.findall(rb'(UIDNEXT|UIDVALIDITY) (\d+)', data[0])
+        }
+    
+    def _resolve_since_uid(self) -> Tuple[Optional[int], bool]:
+        """
+        Determina el último UID procesado según el estado guardado
+        
+        Returns:
+            Tupla (último UID procesado o None para sincronización completa,
+            True si puede haber correos nuevos)
+        """
         try:
-            # Seleccionar carpeta
-            self.connection.select(self.config.folder)
-            
-            # Construir query de búsqueda
-            search_criteria = self._build_search_criteria(
-                date_from, date_to, query,
-                senders or self.config.senders,
-                subject_filters or self.config.subject_filters,
-                has_attachments if has_attachments is not None else self.config.has_attachments
-            )
+            status = self._folder_status()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo consultar STATUS de la carpeta: {e}")
+            status = {}
+        
+        self.uidvalidity = status.get('UIDVALIDITY')
+        self._retry_uids = set()
+        if self.uidvalidity is None:
+            logger.warning("⚠️ El servidor no informó UIDVALIDITY, sincronización completa")
+            return None, True
+        
+        saved = self.sync_state.get(self.config.username, self.config.folder)
+        if not saved:
+            logger.info("🔖 Sin estado previo, sincronización completa")
+            return None, True
+        
+        if saved.get('uidvalidity') != self.uidvalidity:
+            logger.warning("⚠️ UIDVALIDITY cambió en el servidor, resincronización completa")
+            self.sync_state.reset(self.config.username, self.config.folder)
+            return None, True
+        
+        since_uid = int(saved.get('last_uid', 0))
+        self._retry_uids = {int(uid) for uid in saved.get('retry_uids', [])}
+        uidnext = status.get('UIDNEXT')
+        logger.info(f"🔖 Sincronización incremental desde UID {since_uid + 1}")
+        
+        return since_uid, uidnext is None or uidnext > since_uid + 1
+    
+    def mark_processed(self, email_id: str):
+        """
+        Registra un correo como procesado en el estado de sincronización
+        
+        El cursor avanza hasta este UID; los UIDs menores de la búsqueda que
+        siguen sin procesar (lote o mensaje fallido, error al procesarlo) se
+        guardan como pendientes para la próxima ejecución.
+        
+        Args:
+            email_id: UID del email
+        """
+        self._mark_done([int(email_id)])
+    
+    def mark_skipped(self, uids: Iterable[int]):
+        """
+        Registra correos descartados por los filtros de la fase 1
+        
+        Un correo descartado (remitente, asunto o sin adjuntos candidatos) ya
+        está resuelto: no queda pendiente ni vuelve a buscarse.
+        
+        Args:
+            uids: UIDs descartados
+        """
+        self._mark_done(uids)
+    
+    def mark_failed(self, email_id: str) -> int:
+        """
+        Registra un intento fallido de procesar un correo
+        
+        El correo sigue pendiente y se reintenta en la próxima ejecución hasta
+        acumular max_email_retries fallos; entonces se da por terminado para
+        que un correo que siempre falla no se repita sin fin.
+        
+        Args:
+            email_id: UID del email
             
-            logger.info(f"🔍 Buscando correos con criterio: {search_criteria}")
+        Returns:
+            Intentos fallidos acumulados (1 sin sincronización incremental)
+        """
+        if not self.sync_state or self.uidvalidity is None:
+            return 1
+        
+        with self._sync_lock:
+            attempts = self.sync_state.record_failure(self.config.username, self.config.folder,
+                                                      self.uidvalidity, int(email_id))
+        
+        if attempts >= self.config.max_email_retries:
+            logger.warning(f"⚠️ Email {email_id} falló {attempts} veces, no se volverá a reintentar")
+            self._mark_done([int(email_id)])
+        return attempts
+    
+    def _mark_done(self, uids: Iterable[int]):
+        """Quita UIDs de los pendientes y avanza el cursor hasta el mayor de ellos"""
+        uids = {int(uid) for uid in uids}
+        if not uids or not self.sync_state or self.uidvalidity is None:
+            return
+        
+        # Las etapas del pipeline marcan desde hilos distintos
+        with self._sync_lock:
+            self._outstanding_uids -= uids
+            self._retry_uids -= uids
             
-            # Ejecutar búsqueda
-            typ, data = self.connection.search(None, search_criteria)
+            saved = self.sync_state.get(self.config.username, self.config.folder) or {}
+            cursor = max(max(uids), int(saved.get('last_uid', 0)))
+            retry = self._retry_uids | {pending for pending in self._outstanding_uids if pending < cursor}
             
-            if typ != 'OK':
-                logger.error("❌ Error en la búsqueda")
-                return []
+            self.sync_state.update(self.config.username, self.config.folder,
+                                   self.uidvalidity, max(uids), retry_uids=retry)
+    
+    def reset_sync_state(self):
+        """Olvida el último UID procesado para forzar una sincronización completa"""
+        if self.sync_state:
+            self.sync_state.reset(self.config.username, self.config.folder)
+    
+    def fetch_emails(self,
+                     uids: List[bytes],
+                     batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Descarga correos por lotes con UID FETCH y los devuelve a medida que llegan
+        
+        Cada lote envía un único conjunto compacto de UIDs (ej. "1:50,73,90:120")
+        en lugar de un FETCH por mensaje.
+        
+        Args:
+            uids: UIDs a descargar
+            batch_size: Correos por lote (por defecto config.fetch_batch_size)
             
-            email_ids = data[0].split()
+        Yields:
+            Diccionario con los datos de cada email, en orden de UID
+        """
+        total = len(set(uids))
+        
+        for batch_num, batch, result, elapsed, done in self._run_batches(uids, batch_size, self._fetch_batch):
+            emails, size = result or ([], 0)
+            logger.info(
+                f"📦 Lote {batch_num}: {len(emails)}/{len(batch)} correos, "
+                f"{size / 1024:.0f} KB en {elapsed:.2f}s "
+                f"({done}/{total})"
+            )
             
-            if not email_ids:
-                logger.info("📭 No se encontraron correos con los criterios especificados")
-                return []
+            yield from emails
+    
+    def _fetch_batch(self,
+                     uids: List[int],
+                     connection: Optional[imaplib.IMAP4] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Descarga un lote de correos con un único UID FETCH
+        
+        Args:
+            uids: UIDs ordenados del lote
+            connection: Sesión IMAP a usar (por defecto la principal)
             
-            logger.info(f"📬 Se encontraron {len(email_ids)} correos")
+        Returns:
+            Tupla (emails parseados en orden de UID, bytes recibidos)
+        """
+        connection = connection or self.connection
+        message_set = compact_uid_set(uids)
+        
+        try:
+            typ, data = connection.uid('FETCH', message_set, '(UID RFC822)')
+        except imaplib.IMAP4.abort:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Error descargando lote {message_set}: {e}")
+            return [], 0
+        
+        if typ != 'OK':
+            logger.error(f"❌ Error descargando lote {message_set}")
+            return [], 0
+        
+        fetched = {}
+        size = 0
+        for uid, raw_email in self._iter_fetch_response(data, b'RFC822'):
+            size += len(raw_email)
+            try:
+                msg = self._parse_message(raw_email)
+                fetched[uid] = self._build_email_data(str(uid), msg)
+            except Exception as e:
+                logger.error(f"❌ Error procesando email {uid}: {e}")
+        
+        # Marcar como leído si está configurado
+        if self.config.mark_as_read and fetched:
+            connection.uid('STORE', message_set, '+FLAGS', '\\Seen')
+        
+        return [fetched[uid] for uid in uids if uid in fetched], size
+    
+    def _parse_message(self, raw_email: bytes) -> Message:
+        """
+        Parsea un mensaje RFC822 entregándolo al parser por bloques
+        
+        A diferencia de message_from_bytes, no crea una copia decodificada
+        del mensaje completo antes de parsearlo.
+        """
+        parser = BytesFeedParser()
+        view = memoryview(raw_email)
+        for start in range(0, len(view), _FEED_CHUNK_SIZE):
+            parser.feed(view[start:start + _FEED_CHUNK_SIZE].tobytes())
+        view.release()
+        return parser.close()
+    
+    def _iter_fetch_response(self, data: List[Any], item: bytes) -> Iterator[Tuple[int, bytes]]:
+        """
+        Recorre una respuesta de FETCH devolviendo (uid, literal)
+        
+        Algunos servidores envían "UID n" antes del literal y otros después,
+        en la línea de cierre; se soportan ambos casos. Cada literal se quita
+        de la respuesta al entregarlo, así solo vive mientras se procesa.
+        
+        Args:
+            data: Respuesta cruda de imaplib
+            item: Nombre del item del literal (ej. b'RFC822')
             
-            # Limitar resultados si es necesario
-            if self.config.max_results and len(email_ids) > self.config.max_results:
-                email_ids = email_ids[-self.config.max_results:]
-                logger.info(f"📊 Limitando a los últimos {self.config.max_results} correos")
+        Yields:
+            Tupla (uid, contenido)
+        """
+        pending = None
+        for index, entry in enumerate(data):
+            if isinstance(entry, tuple):
+                meta, literal = entry
+                if item.upper() not in meta.upper():
+                    continue
+                data[index] = None
+                match = _UID_RE.search(meta)
+                if match:
+                    yield int(match.group(1)), literal
+                else:
+                    pending = literal
+            elif pending is not None and isinstance(entry, bytes):
+                match = _UID_RE.search(entry)
+                if match:
+                    yield int(match.group(1)), pending
+                pending = None
+    
+    def fetch_emails_two_phase(self,
+                               uids: List[bytes],
+                               senders: Optional[List[str]] = None,
+                               subject_filters: Optional[List[str]] = None,
+                               has_attachments: bool = True,
+                               attachment_filter: Optional[Callable[[str], bool]] = None,
+                               batch_size: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Descarga correos en dos fases para no bajar cuerpos innecesarios
+        
+        Fase 1: cabeceras (BODY.PEEK[HEADER.FIELDS]) y BODYSTRUCTURE de todo el
+        lote; se aplican los filtros de remitente/asunto y la regla de adjuntos.
+        Fase 2: solo se descargan (BODY.PEEK[n]) las partes de texto del cuerpo
+        y los adjuntos candidatos de los correos que pasaron el filtro.
+        
+        Args:
+            uids: UIDs a descargar
+            senders: Remitentes aceptados (vacío = todos)
+            subject_filters: Palabras clave del asunto (vacío = todas)
+            has_attachments: Omitir correos sin adjuntos candidatos
+            attachment_filter: Regla sobre el nombre de archivo del adjunto
+            batch_size: Correos por lote (por defecto config.fetch_batch_size)
             
-            # Procesar cada email
-            emails = []
-            for idx, email_id in enumerate(email_ids, 1):
-                if idx % 10 == 0:
-                    logger.info(f"  Procesando {idx}/{len(email_ids)}...")
-                
-                email_data = self._fetch_email(email_id)
-                if email_data:
-                    emails.append(email_data)
+        Yields:
+            Diccionario con los datos de cada email seleccionado, en orden de UID
+        """
+        total = len(set(uids))
+        
+        def worker(batch: List[int], connection: imaplib.IMAP4) -> Tuple[List[Dict[str, Any]], int, int, List[int]]:
+            return self._fetch_two_phase_batch(batch, connection, senders, subject_filters,
+                                               has_attachments, attachment_filter)
+        
+        for batch_num, batch, result, elapsed, done in self._run_batches(uids, batch_size, worker):
+            emails, downloaded, skipped, rejected = result or ([], 0, 0, [])
+            logger.info(
+                f"📦 Lote {batch_num} (dos fases): {len(emails)}/{len(batch)} correos, "
+                f"{downloaded / 1024:.0f} KB descargados, "
+                f"{skipped / 1024:.0f} KB omitidos en {elapsed:.2f}s "
+                f"({done}/{total})"
+            )
             
-            logger.info(f"✅ {len(emails)} correos procesados exitosamente")
-            return emails
+            # Los descartados por los filtros no quedan pendientes; solo los
+            # que fallaron al descargarse se reintentan en la próxima ejecución
+            self.mark_skipped(rejected)
+            yield from emails
+    
+    def _fetch_two_phase_batch(self,
+                               batch: List[int],
+                               connection: imaplib.IMAP4,
+                               senders: Optional[List[str]],
+                               subject_filters: Optional[List[str]],
+                               has_attachments: bool,
+                               attachment_filter: Optional[Callable[[str], bool]]) -> Tuple[List[Dict[str, Any]], int, int, List[int]]:
+        """
+        Ejecuta las dos fases sobre un lote en una misma sesión
+        
+        Returns:
+            Tupla (emails seleccionados, bytes descargados, bytes omitidos,
+            UIDs descartados por los filtros)
+        """
+        metadata, header_size = self._fetch_metadata_batch(batch, connection)
+        
+        selected = []
+        rejected = []
+        skipped_size = 0
+        for meta in metadata:
+            sections = self._select_parts(meta, senders, subject_filters,
+                                          has_attachments, attachment_filter)
+            wanted = {part['section'] for part in sections or []}
+            skipped_size += sum(part['size'] for part in meta['parts']
+                                if part['section'] not in wanted)
+            if sections is not None:
+                selected.append((meta, sections))
+            else:
+                rejected.append(meta['uid'])
+        
+        emails, body_size = self._fetch_parts_batch(selected, connection)
+        return emails, header_size + body_size, skipped_size, rejected
+    
+    def _fetch_metadata_batch(self,
+                              uids: List[int],
+                              connection: Optional[imaplib.IMAP4] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Fase 1: descarga cabeceras y BODYSTRUCTURE de un lote
+        
+        Args:
+            uids: UIDs ordenados del lote
+            connection: Sesión IMAP a usar (por defecto la principal)
             
+        Returns:
+            Tupla (metadatos por correo en orden de UID, bytes recibidos)
+        """
+        connection = connection or self.connection
+        message_set = compact_uid_set(uids)
+        query = f'(UID BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS ({_HEADER_FIELDS})])'
+        
+        try:
+            typ, data = connection.uid('FETCH', message_set, query)
+        except imaplib.IMAP4.abort:
+            raise
         except Exception as e:
-            logger.error(f"❌ Error buscando emails: {e}")
-            return []
+            logger.error(f"❌ Error descargando cabeceras del lote {message_set}: {e}")
+            return [], 0
+        
+        if typ != 'OK':
+            logger.error(f"❌ Error descargando cabeceras del lote {message_set}")
+            return [], 0
+        
+        metadata = {}
+        size = 0
+        for items in _parse_fetch_items(data):
+            try:
+                uid = int(items['UID'])
+                header_bytes = _find_section(items, 'BODY[HEADER') or b''
+                size += len(header_bytes)
+                metadata[uid] = {
+                    'uid': uid,
+                    'header_bytes': header_bytes,
+                    'headers': email.message_from_bytes(header_bytes),
+                    'parts': list(_walk_bodystructure(items.get('BODYSTRUCTURE') or []))
+                }
+            except Exception as e:
+                logger.error(f"❌ Error leyendo estructura de un email del lote: {e}")
+        
+        return [metadata[uid] for uid in uids if uid in metadata], size
+    
+    def _select_parts(self,
+                      meta: Dict[str, Any],
+                      senders: Optional[List[str]],
+                      subject_filters: Optional[List[str]],
+                      has_attachments: bool,
+                      attachment_filter: Optional[Callable[[str], bool]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Decide qué partes MIME de un correo hay que descargar
+        
+        Returns:
+            Partes a descargar, o None si el correo se descarta
+        """
+        headers = meta['headers']
+        
+        if senders:
+            sender = self._decode_header(headers.get('From', '')).lower()
+            if not any(s.lower() in sender for s in senders):
+                return None
+        
+        if subject_filters:
+            subject = self._decode_header(headers.get('Subject', '')).lower()
+            if not any(keyword.lower() in subject for keyword in subject_filters):
+                return None
+        
+        body_parts = []
+        attachment_parts = []
+        for part in meta['parts']:
+            if part['disposition'] == 'attachment':
+                if not part['filename']:
+                    continue
+                filename = self._decode_header(part['filename'])
+                if attachment_filter is None or attachment_filter(filename):
+                    attachment_parts.append(part)
+            elif part['type'] == 'text' and part['subtype'] in ('plain', 'html'):
+                body_parts.append(part)
+        
+        if has_attachments and not attachment_parts:
+            return None
+        
+        return body_parts + attachment_parts
+    
+    def _fetch_parts_batch(self,
+                           selected: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]],
+                           connection: Optional[imaplib.IMAP4] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Fase 2: descarga solo las partes seleccionadas de cada correo
+        
+        Los correos que piden las mismas secciones comparten un único UID FETCH.
+        
+        Args:
+            selected: Pares (metadatos, partes a descargar)
+            connection: Sesión IMAP a usar (por defecto la principal)
+            
+        Returns:
+            Tupla (emails parseados en orden de UID, bytes recibidos)
+        """
+        connection = connection or self.connection
+        groups: Dict[Tuple[str, ...], List[int]] = {}
+        for meta, parts in selected:
+            key = tuple(part['section'] for part in parts)
+            groups.setdefault(key, []).append(meta['uid'])
+        
+        contents: Dict[int, Dict[str, bytes]] = {}
+        size = 0
+        for sections, uids in groups.items():
+            if not sections:
+                continue
+            
+            message_set = compact_uid_set(uids)
+            query = '(UID ' + ' '.join(f'BODY.PEEK[{section}]' for section in sections) + ')'
+            
+            try:
+                typ, data = connection.uid('FETCH', message_set, query)
+            except imaplib.IMAP4.abort:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Error descargando partes del lote {message_set}: {e}")
+                continue
+            
+            if typ != 'OK':
+                logger.error(f"❌ Error descargando partes del lote {message_set}")
+                continue
+            
+            for items in _parse_fetch_items(data):
+                uid = int(items['UID'])
+                found = {}
+                for section in sections:
+                    value = items.get(f'BODY[{section}]') or b''
+                    if isinstance(value, str):
+                        value = value.encode('utf-8')
+                    size += len(value)
+                    found[section] = value
+                contents[uid] = found
+        
+        emails = []
+        for meta, parts in selected:
+            uid = meta['uid']
+            if parts and uid not in contents:
+                continue
+            try:
+                msg = self._build_partial_message(meta, parts, contents.get(uid, {}))
+                emails.append(self._build_email_data(str(uid), msg))
+            except Exception as e:
+                logger.error(f"❌ Error procesando email {uid}: {e}")
+        
+        # Marcar como leído si está configurado (BODY.PEEK no lo hace)
+        if self.config.mark_as_read and emails:
+            message_set = compact_uid_set(int(e['id']) for e in emails)
+            connection.uid('STORE', message_set, '+FLAGS', '\\Seen')
+        
+        return emails, size
+    
+    def _build_partial_message(self,
+                               meta: Dict[str, Any],
+                               parts: List[Dict[str, Any]],
+                               contents: Dict[str, bytes]) -> Message:
+        """
+        Reconstruye un mensaje con las cabeceras y solo las partes descargadas
+        
+        El resultado se procesa igual que un RFC822 completo en _build_email_data.
+        """
+        msg = email.message_from_bytes(meta['header_bytes'])
+        msg['Content-Type'] = 'multipart/mixed'
+        msg.set_payload(None)
+        
+        for info in parts:
+            part = Message()
+            part['Content-Type'] = f"{info['type']}/{info['subtype']}"
+            for key, value in info['params'].items():
+                part.set_param(key, value)
+            part['Content-Transfer-Encoding'] = info['encoding']
+            if info['disposition'] == 'attachment':
+                part.add_header('Content-Disposition', 'attachment', filename=info['filename'])
+            part.set_payload(contents.get(info['section'], b'').decode('ascii', 'surrogateescape'))
+            msg.attach(part)
+        
+        return msg
     
     def _build_search_criteria(self,
                                date_from: Optional[datetime],
@@ -293,106 +1297,123 @@ class EmailProcessor:
     
     def _fetch_email(self, email_id: bytes) -> Optional[Dict[str, Any]]:
         """
-        Obtiene los datos de un email específico
+        Descarga y parsea un email una única vez
+        
+        El diccionario resultante incluye cabeceras, cuerpo y adjuntos
+        (decodificados bajo demanda), y queda cacheado para que
+        get_attachments() y _get_email_body_by_id() no vuelvan a descargarlo.
         
         Args:
-            email_id: ID del email
+            email_id: UID del email
             
         Returns:
             Diccionario con los datos del email
         """
         try:
-            # Fetch email data
-            typ, data = self.connection.fetch(email_id, '(RFC822)')
-            
-            if typ != 'OK':
-                return None
-            
-            # Parse email
-            raw_email = data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            
-            # Extraer información básica
-            email_data = {
-                'id': email_id.decode(),
-                'subject': self._decode_header(msg.get('Subject', '')),
-                'sender': self._decode_header(msg.get('From', '')),
-                'date': self._parse_date(msg.get('Date', '')),
-                'to': self._decode_header(msg.get('To', '')),
-                'message_id': msg.get('Message-ID', ''),
-                'has_attachments': self._has_attachments(msg),
-                'body': self._get_email_body(msg),
-                'attachments': []
-            }
-            
-            # Marcar como leído si está configurado
-            if self.config.mark_as_read:
-                self.connection.store(email_id, '+FLAGS', '\\Seen')
-            
-            return email_data
+            emails, _ = self._fetch_batch([int(email_id)])
+            return emails[0] if emails else None
             
         except Exception as e:
             logger.error(f"❌ Error procesando email {email_id}: {e}")
             return None
     
-    def get_attachments(self, email_id: str) -> List[Dict[str, Any]]:
+    def _build_email_data(self, email_id: str, msg: Message) -> Dict[str, Any]:
         """
-        Obtiene los adjuntos de un email
+        Construye el diccionario de un email a partir del mensaje parseado
         
         Args:
             email_id: ID del email
+            msg: Mensaje ya parseado
             
         Returns:
-            Lista de adjuntos con su contenido
+            Diccionario con cabeceras, cuerpo y adjuntos
         """
-        if not self.connected:
-            if not self.connect():
-                return []
+        email_data = {
+            'id': email_id,
+            'subject': self._decode_header(msg.get('Subject', '')),
+            'sender': self._decode_header(msg.get('From', '')),
+            'date': self._parse_date(msg.get('Date', '')),
+            'to': self._decode_header(msg.get('To', '')),
+            'message_id': msg.get('Message-ID', ''),
+            'has_attachments': self._has_attachments(msg),
+            'body': self._get_email_body(msg),
+            'attachments': self._collect_attachments(msg)
+        }
         
-        try:
-            # Fetch email
-            typ, data = self.connection.fetch(email_id.encode(), '(RFC822)')
-            
-            if typ != 'OK':
-                return []
+        self._email_cache[email_id] = email_data
+        return email_data
+    
+    def _collect_attachments(self, msg: Message) -> List[EmailAttachment]:
+        """
+        Localiza los adjuntos del mensaje sin decodificar su contenido
+        
+        Args:
+            msg: Mensaje ya parseado
             
-            raw_email = data[0][1]
-            msg = email.message_from_bytes(raw_email)
+        Returns:
+            Lista de adjuntos con decodificación diferida
+        """
+        attachments = []
+        
+        for part in msg.walk():
+            # Skip non-attachment parts
+            if part.get_content_disposition() != 'attachment':
+                continue
             
-            attachments = []
+            # Get filename
+            filename = part.get_filename()
+            if not filename:
+                continue
             
-            # Procesar cada parte del mensaje
-            for part in msg.walk():
-                # Skip non-attachment parts
-                if part.get_content_disposition() != 'attachment':
-                    continue
-                
-                # Get filename
-                filename = part.get_filename()
-                if not filename:
-                    continue
-                
-                # Decode filename if needed
-                filename = self._decode_header(filename)
-                
-                # Get content
-                content = part.get_payload(decode=True)
-                
-                if content:
-                    attachments.append({
-                        'filename': filename,
-                        'content': content,
-                        'content_type': part.get_content_type(),
-                        'size': len(content)
-                    })
-                    
-                    logger.info(f"  📎 Adjunto extraído: {filename} ({len(content)} bytes)")
+            # Omitir partes vacías sin necesidad de decodificarlas
+            if not part.get_payload():
+                continue
             
-            return attachments
+            attachments.append(EmailAttachment(part, self._decode_header(filename), self.spool))
+            logger.debug(f"  📎 Adjunto localizado: {filename}")
+        
+        return attachments
+    
+    def get_attachments(self, email_id: str) -> List[Dict[str, Any]]:
+        """
+        Obtiene los adjuntos de un email
+        
+        Usa el email ya descargado por search_emails(); nunca vuelve a
+        descargarlo (un email liberado o no buscado no tiene adjuntos).
+        
+        Args:
+            email_id: ID del email
             
-        except Exception as e:
-            logger.error(f"❌ Error obteniendo adjuntos: {e}")
+        Returns:
+            Lista de adjuntos con su contenido
+        """
+        email_data = self._get_cached_email(email_id)
+        if not email_data:
             return []
+        
+        attachments = email_data['attachments']
+        for attachment in attachments:
+            logger.info(f"  📎 Adjunto extraído: {attachment['filename']} ({attachment['size']} bytes)")
+        
+        return attachments
+    
+    def _get_cached_email(self, email_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Devuelve los datos de un email descargado por search_emails()
+        
+        No se vuelve al servidor: si el email no está en caché (ya se liberó
+        con release_email o nunca se buscó) se avisa y se devuelve None.
+        
+        Args:
+            email_id: ID del email
+            
+        Returns:
+            Diccionario con los datos del email o None
+        """
+        email_data = self._email_cache.get(email_id)
+        if email_data is None:
+            logger.warning(f"⚠️ Email {email_id} no está en caché (liberado o sin buscar), no se descarga de nuevo")
+        return email_data
     
     def _decode_header(self, header: str) -> str:
         """Decodifica un header de email"""
@@ -493,20 +1514,8 @@ class EmailProcessor:
             if text_plain:
                 body = text_plain
             elif text_html:
-                # Si solo hay HTML, hacer limpieza básica
-                import re
-                # Remover scripts y estilos
-                body = re.sub(r'<script[^>]*>.*?</script>', '', text_html, flags=re.DOTALL)
-                body = re.sub(r'<style[^>]*>.*?</style>', '', body, flags=re.DOTALL)
-                # Convertir saltos de línea HTML
-                body = body.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
-                body = body.replace('</p>', '\n').replace('</div>', '\n')
-                # Remover todas las etiquetas HTML
-                body = re.sub(r'<[^>]+>', '', body)
-                # Decodificar entidades HTML básicas
-                body = body.replace('&nbsp;', ' ').replace('&amp;', '&')
-                body = body.replace('&lt;', '<').replace('&gt;', '>')
-                body = body.replace('&quot;', '"').replace('&#39;', "'")
+                # Si solo hay HTML, convertirlo a texto
+                body = html_to_text(text_html)
         else:
             # Email de una sola parte
             try:
@@ -550,28 +1559,29 @@ class EmailProcessor:
         Returns:
             Cuerpo del email como texto
         """
-        if not self.connected:
-            if not self.connect():
-                return ""
+        email_data = self._get_cached_email(email_id)
+        return email_data['body'] if email_data else ""
+    
+    def release_email(self, email_id: str):
+        """
+        Libera un correo ya procesado: sale de la caché y se cierran sus adjuntos
         
-        try:
-            # Fetch email
-            typ, data = self.connection.fetch(email_id.encode(), '(RFC822)')
-            
-            if typ != 'OK':
-                return ""
-            
-            raw_email = data[0][1]
-            msg = email.message_from_bytes(raw_email)
-            
-            # Usar el método existente para obtener el cuerpo
-            body = self._get_email_body(msg)
-            
-            return body
-            
-        except Exception as e:
-            logger.error(f"❌ Error obteniendo cuerpo del email: {e}")
-            return ""
+        Args:
+            email_id: ID del email
+        """
+        email_data = self._email_cache.pop(email_id, None)
+        for attachment in (email_data or {}).get('attachments') or []:
+            if isinstance(attachment, EmailAttachment):
+                attachment.close()
+    
+    def clear_cache(self):
+        """Libera los correos descargados que se mantienen en memoria"""
+        for email_id in list(self._email_cache):
+            self.release_email(email_id)
+        
+        if self.spool is not None and self.spool.spilled:
+            logger.info(f"💾 {self.spool.spilled} adjuntos decodificados a disco "
+                        f"por el presupuesto de memoria ({self.config.attachment_memory_mb} MB)")
     
     def send_notification(self, recipient: str, subject: str, body: str) -> bool:
         """
@@ -618,6 +1628,174 @@ class EmailProcessor:
             return False
 
 # Funciones de utilidad
+class _Literal(bytes):
+    """Literal IMAP ({n}) dentro de una respuesta tokenizada"""
+
+def _iter_imap_tokens(data: List[Any]) -> Iterator[Union[bytes, _Literal]]:
+    """Tokeniza una respuesta cruda de imaplib (bytes y tuplas con literales)"""
+    for entry in data:
+        if isinstance(entry, tuple):
+            text, literal = entry
+        else:
+            text, literal = entry, None
+        
+        for match in _TOKEN_RE.finditer(text or b''):
+            token = match.group(0)
+            if token.isspace():
+                continue
+            if token.startswith(b'{') and match.end() == len(text) and literal is not None:
+                yield _Literal(literal)
+            else:
+                yield token
+
+def _parse_imap_response(data: List[Any]) -> List[Any]:
+    """
+    Convierte una respuesta IMAP en listas anidadas
+    
+    Los átomos y strings se devuelven como str, NIL como None y los
+    literales como bytes.
+    """
+    stack: List[List[Any]] = [[]]
+    for token in _iter_imap_tokens(data):
+        if isinstance(token, _Literal):
+            stack[-1].append(bytes(token))
+        elif token == b'(':
+            child: List[Any] = []
+            stack[-1].append(child)
+            stack.append(child)
+        elif token == b')':
+            if len(stack) > 1:
+                stack.pop()
+        elif token.startswith(b'"'):
+            value = re.sub(rb'\\(.)', rb'\1', token[1:-1])
+            stack[-1].append(value.decode('utf-8', errors='replace'))
+        elif token.upper() == b'NIL':
+            stack[-1].append(None)
+        else:
+            stack[-1].append(token.decode('utf-8', errors='replace'))
+    return stack[0]
+
+def _parse_fetch_items(data: List[Any]) -> Iterator[Dict[str, Any]]:
+    """Devuelve los pares item/valor de cada mensaje de una respuesta FETCH"""
+    for entry in _parse_imap_response(data):
+        if not isinstance(entry, list):
+            continue
+        items = {}
+        for idx in range(0, len(entry) - 1, 2):
+            if isinstance(entry[idx], str):
+                items[entry[idx].upper()] = entry[idx + 1]
+        if 'UID' in items:
+            yield items
+
+def _find_section(items: Dict[str, Any], prefix: str) -> Optional[bytes]:
+    """Busca el valor de un item por prefijo (el servidor puede reformatearlo)"""
+    for key, value in items.items():
+        if key.startswith(prefix):
+            return value.encode('utf-8') if isinstance(value, str) else value
+    return None
+
+def _as_str(value: Any) -> str:
+    """Normaliza un valor de BODYSTRUCTURE a str"""
+    if value is None:
+        return ''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+def _param_dict(values: Any) -> Dict[str, str]:
+    """Convierte una lista de parámetros ("k" "v" ...) en diccionario"""
+    if not isinstance(values, list):
+        return {}
+    params = {}
+    for idx in range(0, len(values) - 1, 2):
+        key = _as_str(values[idx]).lower()
+        value = _as_str(values[idx + 1])
+        if key.endswith('*'):
+            key = key[:-1]
+            value = collapse_rfc2231_value(decode_rfc2231(value))
+        params[key] = value
+    return params
+
+def _walk_bodystructure(node: List[Any], prefix: str = '') -> Iterator[Dict[str, Any]]:
+    """
+    Recorre un BODYSTRUCTURE devolviendo las partes hoja con su sección IMAP
+    
+    Args:
+        node: BODYSTRUCTURE ya parseado
+        prefix: Sección del nodo padre
+        
+    Yields:
+        Diccionario con section, type, subtype, params, encoding, size,
+        disposition y filename de cada parte
+    """
+    if not node:
+        return
+    
+    # Multipart: hijos consecutivos seguidos del subtipo
+    if isinstance(node[0], list):
+        for idx, child in enumerate(node, 1):
+            if not isinstance(child, list):
+                break
+            yield from _walk_bodystructure(child, f"{prefix}.{idx}" if prefix else str(idx))
+        return
+    
+    main_type = _as_str(node[0]).lower()
+    subtype = _as_str(node[1]).lower() if len(node) > 1 else ''
+    params = _param_dict(node[2] if len(node) > 2 else None)
+    size = _as_str(node[6]) if len(node) > 6 else ''
+    
+    # La posición de la disposición depende del tipo de parte
+    if main_type == 'text':
+        md5_index = 8
+    elif main_type == 'message' and subtype == 'rfc822':
+        md5_index = 10
+    else:
+        md5_index = 7
+    disposition = node[md5_index + 1] if len(node) > md5_index + 1 else None
+    
+    disposition_type = ''
+    disposition_params: Dict[str, str] = {}
+    if isinstance(disposition, list) and disposition:
+        disposition_type = _as_str(disposition[0]).lower()
+        disposition_params = _param_dict(disposition[1] if len(disposition) > 1 else None)
+    
+    yield {
+        'section': prefix or '1',
+        'type': main_type,
+        'subtype': subtype,
+        'params': params,
+        'encoding': (_as_str(node[5]) if len(node) > 5 else '') or '7bit',
+        'size': int(size) if size.isdigit() else 0,
+        'disposition': disposition_type,
+        'filename': disposition_params.get('filename') or params.get('name', '')
+    }
+
+def compact_uid_set(uids: Iterable[int]) -> str:
+    """
+    Convierte una lista de UIDs en un conjunto IMAP compacto
+    
+    Args:
+        uids: UIDs (en cualquier orden, con o sin duplicados)
+        
+    Returns:
+        Conjunto de mensajes, ej. "1:50,73,90:120"
+    """
+    ordered = sorted({int(uid) for uid in uids})
+    if not ordered:
+        return ''
+    
+    ranges = []
+    start = prev = ordered[0]
+    for uid in ordered[1:]:
+        if uid == prev + 1:
+            prev = uid
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = uid
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    
+    return ','.join(ranges)
+
 def test_connection(config: Dict[str, Any]) -> bool:
     """
     Prueba la conexión con el servidor de email
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Extraction Pool - DOCUFIND
+Extracción de facturas en procesos separados (trabajo de CPU fuera del GIL)
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple, Union
+
+try:
+    from src.invoice_extractor import InvoiceExtractor, InvoiceData
+except ImportError:
+    from invoice_extractor import InvoiceExtractor, InvoiceData
+
+logger = logging.getLogger(__name__)
+
+# Extractor propio de cada proceso trabajador (creado en _init_worker)
+_worker_extractor: Optional[InvoiceExtractor] = None
+
+def _init_worker(config: Dict[str, Any]):
+    """Prepara el proceso: compila los patrones una sola vez por trabajador"""
+    global _worker_extractor
+    _worker_extractor = InvoiceExtractor(config)
+
+def _worker_ready() -> int:
+    """Tarea vacía para arrancar el proceso por adelantado"""
+    return os.getpid()
+
+def _worker_extract(content: Union[bytes, str]) -> Tuple[Optional[InvoiceData], Optional[Dict[str, Any]]]:
+    """Extrae los datos de factura (y el estado para la caché) en el proceso trabajador"""
+    return _worker_extractor.extract_with_state(content)
+
+class ExtractionPool:
+    """
+    Pool de procesos para InvoiceExtractor
+
+    Cada proceso crea su propio extractor al arrancar, de modo que entre
+    procesos solo viajan los bytes/texto del adjunto y el InvoiceData de
+    resultado. Si el pool falla, la extracción sigue en el proceso actual.
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, workers: Optional[int] = None):
+        """
+        Inicializa el pool (los procesos se arrancan con start)
+
+        Args:
+            config: Configuración del extractor (sección extraction)
+            workers: Número de procesos (por defecto, número de CPUs)
+        """
+        self.config = config or {}
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._fallback: Optional[InvoiceExtractor] = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Arranca y calienta los procesos trabajadores (también tras un shutdown)"""
+        with self._lock:
+            self._closed = False
+            self._start_locked()
+
+    def _start_locked(self):
+        """Arranca los procesos si no están en marcha (requiere tener el lock)"""
+        if self.executor is not None:
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.config,)
+        )
+
+        # Forzar el arranque de todos los procesos antes del primer correo
+        pids = {future.result() for future in
+                [executor.submit(_worker_ready) for _ in range(self.workers)]}
+        self.executor = executor
+        logger.info(f"🔥 Pool de extracción listo: {len(pids)} procesos")
+
+    def submit(self, content: Union[bytes, str]) -> Future:
+        """
+        Envía un contenido a extraer
+
+        Arranca el pool si hace falta. Se comprueba y se envía bajo el mismo
+        lock que shutdown(), así un envío nunca llega a un executor detenido.
+
+        Returns:
+            Future con la tupla (InvoiceData o None, estado) de extract_with_state
+
+        Raises:
+            RuntimeError: Si el pool ya se detuvo con shutdown()
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Pool de extracción detenido: no admite más contenidos")
+            self._start_locked()
+            return self.executor.submit(_worker_extract, content)
+
+    def extract(self, content: Union[bytes, str]) -> Optional[InvoiceData]:
+        """
+        Extrae datos de factura en un proceso trabajador
+
+        Args:
+            content: Contenido del adjunto (bytes o texto)
+
+        Returns:
+            InvoiceData con los datos extraídos o None
+        """
+        return self.extract_with_state(content)[0]
+
+    def extract_with_state(self, content: Union[bytes, str]) -> Tuple[Optional[InvoiceData], Optional[Dict[str, Any]]]:
+        """
+        Igual que extract, con el estado intermedio para la caché de extracciones
+
+        Returns:
+            Tupla (InvoiceData o None, estado) de InvoiceExtractor.extract_with_state
+        """
+        if self._fallback is not None:
+            return self._fallback.extract_with_state(content)
+
+        try:
+            return self.submit(content).result()
+        except RuntimeError:
+            # Otro hilo detuvo el pool al caerse: seguir con su extractor local
+            if self._fallback is None:
+                raise
+            return self._fallback.extract_with_state(content)
+        except BrokenProcessPool as e:
+            logger.warning(f"⚠️ Pool de extracción caído, se continúa en el proceso principal: {e}")
+            if self._fallback is None:
+                self._fallback = InvoiceExtractor(self.config)
+            self.shutdown()
+            return self._fallback.extract_with_state(content)
+
+    def shutdown(self):
+        """Detiene los procesos trabajadores; submit falla hasta un nuevo start()"""
+        with self._lock:
+            self._closed = True
+            if self.executor is not None:
+                self.executor.shutdown(wait=True, cancel_futures=True)
+                self.executor = None
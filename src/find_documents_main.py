@@ -5,10 +5,14 @@ Punto de entrada principal de la aplicación
 """
 
 import os
+import re
 import sys
 import json
+import mmap
 import logging
 import argparse
+import threading
+from itertools import islice
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import Dict, List, Optional, Any
@@ -19,14 +23,70 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 try:
     from src.email_processor import EmailProcessor
-    from src.google_drive_client import GoogleDriveClient
-    from src.invoice_extractor import InvoiceExtractor
+    from src.google_drive_client import GoogleDriveClient, SheetRowBuffer
+    from src.invoice_extractor import InvoiceExtractor, InvoiceData
     from src.config_manager import ConfigManager
+    from src.sync_state import SyncStateStore
+    from src.drive_cache import DriveIdCache
+    from src.pipeline import ConcurrentPipeline
+    from src.extraction_pool import ExtractionPool
+    from src.content_store import ContentStore, ExtractionCache, content_hash
+    from src.html_text import html_to_text, looks_like_html
+    from src.run_journal import RunJournal
 except ImportError as e:
     print(f"Error importando módulos: {e}")
     print("Asegúrate de ejecutar desde el directorio raíz del proyecto")
     sys.exit(1)
 
+# === Limpieza del concepto del email (patrones compilados una sola vez) ===
+
+# Restos de marcado: clases .custom-*, atributos style/class y etiquetas sueltas
+_CONCEPT_MARKUP_RE = re.compile(
+    r'\.custom-[a-z0-9]+\{[^}]*\}'
+    r'|(?:style|class)=(?:"[^"]*"|\'[^\']*\')'
+    r'|<[^>]+>'
+)
+
+# Entidades que pueden quedar en el asunto o en cuerpos sin HTML
+CONCEPT_HTML_ENTITIES = {
+    '&nbsp;': ' ', '&amp;': '&', '&lt;': '<', '&gt;': '>',
+    '&quot;': '"', '&#39;': "'", '&apos;': "'",
+    '&ndash;': '-', '&mdash;': '-', '&hellip;': '...',
+    '&copy;': '©', '&reg;': '®', '&trade;': '™'
+}
+
+# URLs y direcciones de email
+# (el lookbehind evita reintentar desde cada carácter de una misma palabra)
+_CONCEPT_LINKS_RE = re.compile(r'https?://[^\s]+|www\.[^\s]+|(?<![\w.-])[\w.-]+@[\w.-]+\.\w+')
+
+# Propiedades CSS (margin:20px; font-family:system-ui; ...)
+_CONCEPT_CSS_PROPERTY_RE = re.compile(
+    r'(?<![a-z-])[a-z-]+:\s*[^;]+;|(?<![a-z-])[a-z-]+:\s*[^,\s]+(?:,|\s)'
+)
+
+# Nombres de fuentes y valores CSS comunes
+CONCEPT_CSS_VALUES = [
+    'sans-serif', 'serif', 'monospace', 'Arial', 'Helvetica',
+    'system-ui', 'BlinkMacSystemFont', 'Segoe UI', 'Roboto',
+    'bold', 'italic', 'normal', 'underline', 'none',
+    'block', 'inline', 'flex', 'grid', 'absolute', 'relative',
+    'auto', 'inherit', 'initial', 'unset'
+]
+
+# Valores CSS sueltos: rgb()/rgba(), colores, medidas y las palabras anteriores
+_CONCEPT_CSS_VALUE_RE = re.compile(
+    r'rgba?\([^)]+\)|#[0-9a-fA-F]{3,6}\b'
+    r'|\b(?:\d+(?:px|em)\b|\d+%\b|(?i:' + '|'.join(re.escape(value) for value in
+                                          sorted(CONCEPT_CSS_VALUES, key=len, reverse=True)) + r')\b)'
+)
+
+_CONCEPT_SPECIAL_CHARS_RE = re.compile(r'[{}()\[\];:<>]')
+_CONCEPT_WHITESPACE_RE = re.compile(r'\s+')
+_CONCEPT_SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([.,!?])')
+_CONCEPT_SPACE_AFTER_PUNCT_RE = re.compile(r'([.,!?])\s+')
+_CONCEPT_REPEATED_PUNCT_RE = re.compile(r'[.,]{2,}')
+_CONCEPT_WORD_RE = re.compile(r'\b[A-Za-z0-9]+\b')
+
 # Configuración de logging
 def setup_logging(log_level: str = "INFO") -> logging.Logger:
     """Configura el sistema de logging"""
@@ -84,10 +144,12 @@ class DocuFindProcessor:
         self._initialize_components()
         
         # Estadísticas de procesamiento
+        self._stats_lock = threading.Lock()
         self.stats = {
             'emails_procesados': 0,
             'facturas_extraidas': 0,
             'archivos_subidos': 0,
+            'duplicados': 0,
             'errores': 0,
             'tiempo_inicio': None,
             'tiempo_fin': None
@@ -96,25 +158,78 @@ class DocuFindProcessor:
     def _initialize_components(self):
         """Inicializa los componentes del sistema"""
         try:
+            # Estado de sincronización incremental (filters.skip_processed)
+            filters_config = self.config.get('filters', {})
+            sync_state = None
+            if filters_config.get('skip_processed', True):
+                sync_state = SyncStateStore(
+                    filters_config.get('sync_state_path', 'config/sync_state.json')
+                )
+            
             # Procesador de emails
             self.email_processor = EmailProcessor(
-                self.config.get('email', {})
+                self.config.get('email', {}),
+                sync_state=sync_state
             )
             self.logger.info("📧 Procesador de emails inicializado")
             
-            # Cliente de Google Drive
+            # Cliente de Google Drive (con caché persistente de IDs)
+            drive_config = self.config.get('google_drive', {})
             self.drive_client = GoogleDriveClient(
-                credentials_path=self.config.get('google_drive', {}).get('credentials_path'),
-                token_path=self.config.get('google_drive', {}).get('token_path')
+                config={
+                    'credentials_path': drive_config.get('credentials_path', './config/credentials.json'),
+                    'token_path': drive_config.get('token_path', './config/token.json'),
+                    'resumable_threshold_mb': drive_config.get('resumable_threshold_mb', 5),
+                    'upload_chunk_mb': drive_config.get('upload_chunk_mb', 8),
+                    'upload_max_retries': drive_config.get('upload_max_retries', 5),
+                    'rate_limits': drive_config.get('rate_limits', {}),
+                    'api_max_retries': drive_config.get('api_max_retries', 5)
+                },
+                id_cache=DriveIdCache(drive_config.get('id_cache_path', 'config/drive_cache.json')),
+                upload_sessions=DriveIdCache(drive_config.get('upload_sessions_path', 'config/upload_sessions.json'))
             )
             self.logger.info("📁 Cliente de Google Drive inicializado")
             
+            # Buffers de filas por hoja de cálculo (escritura por lotes)
+            self.sheet_buffers: Dict[str, SheetRowBuffer] = {}
+            
             # Extractor de facturas
             self.invoice_extractor = InvoiceExtractor(
                 self.config.get('extraction', {})
             )
             self.logger.info("🤖 Extractor de facturas inicializado")
             
+            # Extracción en procesos separados (processing.parallel_processing)
+            processing_config = self.config.get('processing', {})
+            self.extraction_pool = None
+            if processing_config.get('parallel_processing', False):
+                self.extraction_pool = ExtractionPool(
+                    self.config.get('extraction', {}),
+                    processing_config.get('extraction_workers')
+                )
+                self.logger.info(f"⚙️ Extracción en paralelo con {self.extraction_pool.workers} procesos")
+            
+            # Adjuntos ya procesados, por hash de contenido (duplicados)
+            self.content_store = None
+            if processing_config.get('deduplicate', True):
+                self.content_store = ContentStore(
+                    processing_config.get('content_store_path', 'config/content_store.db')
+                )
+            
+            # Extracciones ya hechas, válidas mientras no cambie el extractor
+            self.extraction_cache = None
+            if processing_config.get('extraction_cache', True):
+                self.extraction_cache = ExtractionCache(
+                    processing_config.get('extraction_cache_path', 'config/extraction_cache.db')
+                )
+            
+            # Diario de ejecución: etapa de cada correo, para reanudar (--resume)
+            self.run_journal = None
+            if processing_config.get('run_journal', True):
+                self.run_journal = RunJournal(
+                    processing_config.get('run_journal_path', 'config/run_journal.db')
+                )
+            
         except Exception as e:
             self.logger.error(f"❌ Error inicializando componentes: {e}")
             raise
@@ -123,7 +238,11 @@ class DocuFindProcessor:
                       date_from: Optional[datetime] = None,
                       date_to: Optional[datetime] = None,
                       query: Optional[str] = None,
-                      limit: Optional[int] = None) -> Dict[str, Any]:
+                      limit: Optional[int] = None,
+                      full_sync: bool = False,
+                      pipeline: Optional[str] = None,
+                      workers: Optional[int] = None,
+                      resume: bool = False) -> Dict[str, Any]:
         """
         Procesa correos electrónicos según los filtros especificados
         
@@ -132,6 +251,10 @@ class DocuFindProcessor:
             date_to: Fecha final para buscar correos
             query: Query adicional para filtrar correos
             limit: Límite de correos a procesar
+            full_sync: Ignorar el estado incremental y revisar todo el periodo
+            pipeline: Modo de ejecución ('sequential' o 'concurrent')
+            workers: Hilos por etapa en modo concurrente
+            resume: Continuar la última ejecución interrumpida con sus parámetros
             
         Returns:
             Diccionario con resultados del procesamiento
@@ -141,6 +264,24 @@ class DocuFindProcessor:
         self.logger.info("📬 INICIANDO PROCESAMIENTO DE CORREOS")
         self.logger.info("=" * 60)
         
+        # Correos con la fila ya escrita en la ejecución que se reanuda, y los
+        # que empezaron sin terminar (se reintentan aunque estén bajo el cursor)
+        recorded_ids = set()
+        pending_ids = set()
+        resumed = self._resume_run() if resume else None
+        if resumed:
+            params = resumed['params']
+            date_from = datetime.fromisoformat(params['date_from']) if params.get('date_from') else None
+            date_to = datetime.fromisoformat(params['date_to']) if params.get('date_to') else None
+            query = params.get('query')
+            # El reinicio del estado incremental ya se hizo al empezar
+            full_sync = False
+            recorded_ids = self.run_journal.recorded_ids()
+            pending_ids = self.run_journal.pending_ids()
+            limit = params.get('limit')
+            if limit:
+                limit = max(limit - len(recorded_ids), 0)
+        
         # Configurar fechas por defecto
         if not date_from:
             date_from = datetime.now() - timedelta(days=30)
@@ -155,27 +296,77 @@ class DocuFindProcessor:
             'summary': {}
         }
         
+        processing_config = self.config.get('processing', {})
+        pipeline = pipeline or processing_config.get('pipeline', 'sequential')
+        workers = workers or processing_config.get('pipeline_workers', 4)
+        
+        completed = False
         try:
-            # Paso 1: Buscar correos
-            self.logger.info("\n📧 PASO 1: Buscando correos...")
-            search_params = self._build_search_params(date_from, date_to, query)
-            emails = self.email_processor.search_emails(**search_params)
+            # El pool se detiene al terminar cada ejecución: arrancarlo de nuevo
+            if self.extraction_pool is not None:
+                self.extraction_pool.start()
             
-            if not emails:
-                self.logger.warning("⚠️ No se encontraron correos con los criterios especificados")
-                return results
+            if not resumed and self.run_journal is not None:
+                self.run_journal.start_run({
+                    'date_from': date_from.isoformat(),
+                    'date_to': date_to.isoformat(),
+                    'query': query,
+                    'limit': limit,
+                    'full_sync': full_sync
+                })
+            
+            if full_sync:
+                self.email_processor.reset_sync_state()
             
-            self.logger.info(f"✅ Se encontraron {len(emails)} correos")
+            if resumed and limit == 0:
+                self.logger.info("✅ La ejecución reanudada ya había registrado todos sus correos")
+                completed = True
+                return results
             
-            # Aplicar límite si se especificó
-            if limit and limit > 0:
-                emails = emails[:limit]
-                self.logger.info(f"📊 Procesando los primeros {limit} correos")
+            search_params = self._build_search_params(date_from, date_to, query)
+            if recorded_ids:
+                search_params['exclude_uids'] = recorded_ids
+            if pending_ids:
+                search_params['include_uids'] = pending_ids
+            self._precreate_drive_folders(date_from, date_to)
             
-            # Paso 2: Procesar cada correo
-            self.logger.info("\n🔄 PASO 2: Procesando correos...")
-            for idx, email in enumerate(emails, 1):
-                self._process_single_email(email, idx, len(emails), results)
+            if pipeline == 'concurrent':
+                # Pasos 1 y 2 solapados: descarga, extracción y subida en paralelo
+                self.logger.info(f"\n🔀 PASOS 1-2: Pipeline concurrente ({workers} hilos por etapa)...")
+                emails = self.email_processor.iter_emails(**search_params)
+                if limit and limit > 0:
+                    emails = islice(emails, limit)
+                    self.logger.info(f"📊 Procesando como máximo {limit} correos")
+                
+                processed = ConcurrentPipeline(self, workers).run(emails, results)
+                
+                if not processed:
+                    self.logger.warning("⚠️ No se encontraron correos con los criterios especificados")
+                    completed = True
+                    return results
+                
+                self.logger.info(f"✅ Se procesaron {processed} correos")
+            else:
+                # Paso 1: Buscar correos
+                self.logger.info("\n📧 PASO 1: Buscando correos...")
+                emails = self.email_processor.search_emails(**search_params)
+                
+                if not emails:
+                    self.logger.warning("⚠️ No se encontraron correos con los criterios especificados")
+                    completed = True
+                    return results
+                
+                self.logger.info(f"✅ Se encontraron {len(emails)} correos")
+                
+                # Aplicar límite si se especificó
+                if limit and limit > 0:
+                    emails = emails[:limit]
+                    self.logger.info(f"📊 Procesando los primeros {limit} correos")
+                
+                # Paso 2: Procesar cada correo
+                self.logger.info("\n🔄 PASO 2: Procesando correos...")
+                for idx, email in enumerate(emails, 1):
+                    self._process_single_email(email, idx, len(emails), results)
             
             # Paso 3: Generar reporte
             self.logger.info("\n📊 PASO 3: Generando reporte...")
@@ -186,16 +377,73 @@ class DocuFindProcessor:
                 self.logger.info("\n📬 PASO 4: Enviando notificación...")
                 self._send_notification(results)
             
+            completed = True
+            
         except Exception as e:
             self.logger.error(f"❌ Error durante el procesamiento: {e}")
             self.stats['errores'] += 1
             raise
         finally:
+            if self.extraction_pool is not None:
+                self.extraction_pool.shutdown()
+            self._flush_sheet_buffers()
+            if self.run_journal is not None:
+                # Filas sin escribir: la ejecución queda pendiente de reanudar
+                pending_rows = any(buffer.rows for buffer in self.sheet_buffers.values())
+                self.run_journal.finish_run('completed' if completed and not pending_rows else 'interrupted')
+            self.email_processor.clear_cache()
+            self.email_processor.disconnect()
             self.stats['tiempo_fin'] = datetime.now()
             self._print_summary()
         
         return results
     
+    def _resume_run(self) -> Optional[Dict[str, Any]]:
+        """
+        Retoma del diario la última ejecución interrumpida
+        
+        Returns:
+            Datos de la ejecución (ver RunJournal.resume_run), o None si no
+            hay diario o ninguna ejecución pendiente
+        """
+        if self.run_journal is None:
+            self.logger.warning("⚠️ --resume requiere processing.run_journal; se inicia una ejecución nueva")
+            return None
+        
+        resumed = self.run_journal.resume_run()
+        if not resumed:
+            self.logger.info("📓 No hay ejecuciones interrumpidas; se inicia una nueva")
+            return None
+        
+        stages = resumed['stages']
+        self.logger.info(f"⏯️ Reanudando ejecución #{resumed['run_id']} del {resumed['started_at'][:19]}: "
+                         f"{stages['recorded']} correos ya registrados, "
+                         f"{stages['uploaded']} subidos pendientes de registrar")
+        return resumed
+    
+    def _precreate_drive_folders(self, date_from: datetime, date_to: datetime):
+        """
+        Crea por adelantado, en lotes, las carpetas año/mes/categoría del periodo
+        
+        Así las subidas encuentran su carpeta en caché en vez de buscarla
+        (y crearla) una a una.
+        """
+        if not self.config.get('google_drive', {}).get('precreate_folders', True):
+            return
+        
+        paths = []
+        month = datetime(date_from.year, date_from.month, 1)
+        while month <= date_to:
+            for category in ('Facturas', 'Otros'):
+                paths.append(f"DOCUFIND/{month.year}/{month.strftime('%m-%B')}/{category}")
+            month = datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+        
+        try:
+            created = self.drive_client.create_folder_tree(paths)
+            self.logger.info(f"📁 Estructura de carpetas lista: {len(created)}/{len(paths)} rutas")
+        except Exception as e:
+            self.logger.warning(f"⚠️ No se pudo preparar la estructura de carpetas: {e}")
+    
     def _build_search_params(self, date_from: datetime, date_to: datetime, query: Optional[str]) -> Dict:
         """Construye los parámetros de búsqueda para correos"""
         params = {
@@ -216,113 +464,316 @@ class DocuFindProcessor:
         if 'has_attachments' in email_config:
             params['has_attachments'] = email_config['has_attachments']
         
+        # En modo de dos fases solo se descargan los adjuntos que parecen facturas
+        params['attachment_filter'] = self._is_invoice
+        
         return params
     
     
-    def _process_single_email(self, email: Dict, idx: int, total: int, results: Dict):
+    def _process_single_email(self, email: Dict, idx: int, total: Optional[int], results: Dict):
         """Procesa un correo individual - TODOS los emails se registran en la hoja"""
+        job = self._extract_stage(email, idx, total)
+        job = self._upload_stage(job)
+        self._record_stage(job, results)
+    
+    def _extract_stage(self, email: Dict, idx: int, total: Optional[int]) -> Dict[str, Any]:
+        """
+        Etapa 1: localiza adjuntos y extrae datos de la primera factura
+        
+        Args:
+            email: Datos del correo
+            idx: Posición del correo en la ejecución
+            total: Total de correos (None si aún no se conoce)
+            
+        Returns:
+            Trabajo con el correo, sus adjuntos y los datos extraídos
+        """
+        job = {
+            'email': email,
+            'attachments': [],
+            'invoice_attachment': None,
+            'invoice_data': None,
+            'content_hash': None,
+            'existing_file_id': None,
+            'file_id': None,
+            'error': None
+        }
+        
         try:
-            self.logger.info(f"\\n[{idx}/{total}] Procesando: {email.get('subject', 'Sin asunto')}")
+            position = f"{idx}/{total}" if total else str(idx)
+            self.logger.info(f"\n[{position}] Procesando: {email.get('subject', 'Sin asunto')}")
             self.logger.info(f"  De: {email.get('sender', 'Desconocido')}")
             self.logger.info(f"  Fecha: {email.get('date', 'Sin fecha')}")
             
-            self.stats['emails_procesados'] += 1
-            
-            # IMPORTANTE: Guardar contexto del email actual
-            self.current_email = email
-            
-            # Agregar el cuerpo del email al contexto si no está
-            if 'body' not in email and hasattr(self.email_processor, '_get_email_body'):
-                # Intentar obtener el cuerpo del email
-                try:
-                    # Este método ya debería existir en email_processor
-                    email['body'] = self.email_processor._get_email_body_by_id(email['id'])
-                except:
-                    email['body'] = email.get('subject', '')  # Usar asunto como fallback
+            self._increment_stat('emails_procesados')
+            self._journal(email, 'fetched')
             
-            # Extraer adjuntos
-            attachments = self.email_processor.get_attachments(email['id'])
+            # El cuerpo y los adjuntos ya vienen del único FETCH de search_emails
+            if 'body' not in email:
+                email['body'] = email.get('subject', '')  # Usar asunto como fallback
             
-            # Guardar contexto de adjuntos
-            self.current_attachments = attachments
+            # Adjuntos (el contenido se decodifica al usarlo)
+            attachments = email.get('attachments')
+            if attachments is None:
+                attachments = self.email_processor.get_attachments(email['id'])
+            job['attachments'] = attachments or []
             
             if not attachments:
                 self.logger.info("  ⚠️ No se encontraron adjuntos")
-                # IMPORTANTE: Registrar TODOS los emails, incluso sin adjuntos
-                self._update_spreadsheet({}, None)
-            else:
-                self.logger.info(f"  📎 {len(attachments)} adjuntos encontrados")
-                
-                # Variable para rastrear si se procesó alguna factura
-                invoice_processed = False
-                
-                # Procesar cada adjunto
-                for attachment in attachments:
-                    if self._is_invoice(attachment.get('filename', '')):
-                        # Intentar extraer datos de factura
-                        invoice_data = self.invoice_extractor.extract(attachment['content'])
-                        if invoice_data:
-                            # Organizar en Drive y actualizar spreadsheet
-                            self._organize_in_drive(email, attachment, invoice_data)
-                            invoice_processed = True
-                            break  # Solo procesar la primera factura encontrada
-                        
-                # Si no se procesó ninguna factura pero hay adjuntos
-                if not invoice_processed:
-                    # Subir primer adjunto a Drive sin datos de factura
-                    if attachments:
-                        first_attachment = attachments[0]
-                        try:
-                            # Subir a Drive en carpeta "Otros"
-                            date_str = email.get('date', '')
-                            if ' ' in date_str:
-                                date_str = date_str.split(' ')[0]
-                            
-                            try:
-                                date = datetime.strptime(date_str, '%Y-%m-%d')
-                            except:
-                                date = datetime.now()
-                            
-                            folder_path = f"DOCUFIND/{date.year}/{date.strftime('%m-%B')}/Otros"
-                            folder_id = self.drive_client.create_folder_path(folder_path)
-                            
-                            file_id = self.drive_client.upload_file(
-                                first_attachment['content'],
-                                first_attachment['filename'],
-                                folder_id
-                            )
-                            
-                            # Actualizar spreadsheet con archivo pero sin datos de factura
-                            self._update_spreadsheet({}, file_id)
-                        except Exception as e:
-                            self.logger.error(f"  ❌ Error subiendo adjunto: {e}")
-                            # Aún así registrar en spreadsheet
-                            self._update_spreadsheet({}, None)
+                return job
             
-            # Agregar a resultados exitosos
-            results['success'].append({
-                'email_id': email['id'],
-                'subject': email.get('subject'),
-                'sender': email.get('sender'),
-                'date': email.get('date'),
-                'attachments_processed': len(attachments) if attachments else 0
-            })
+            self.logger.info(f"  📎 {len(attachments)} adjuntos encontrados")
+            
+            # Solo procesar la primera factura encontrada
+            for attachment in attachments:
+                if self._is_invoice(attachment.get('filename', '')):
+                    sha256 = self._content_hash(attachment['content'])
+                    invoice_data = self._extract_invoice_data(attachment['content'], sha256)
+                    
+                    if invoice_data:
+                        # Misma factura ya recibida: se enlazará su archivo
+                        known = self._find_duplicate(sha256)
+                        if known and known['drive_file_id']:
+                            self.logger.info(f"  ♻️ Contenido ya subido: {attachment.get('filename', '')}")
+                            job['existing_file_id'] = known['drive_file_id']
+                        
+                        job['invoice_attachment'] = attachment
+                        job['invoice_data'] = invoice_data
+                        job['content_hash'] = sha256
+                        break
             
         except Exception as e:
             self.logger.error(f"  ❌ Error procesando correo: {e}")
-            self.stats['errores'] += 1
+            job['error'] = e
+        
+        if job['error'] is None:
+            self._journal(email, 'extracted', content_hash=job['content_hash'])
+        else:
+            self._journal(email, 'fetched', error=str(job['error']))
+        
+        return job
+    
+    def _extract_invoice_data(self, content: Any, sha256: Optional[str] = None) -> Optional[InvoiceData]:
+        """
+        Extrae datos de factura, en el pool de procesos si está activo
+        
+        Con la caché de extracciones activa, un contenido ya visto devuelve el
+        resultado guardado; si solo cambiaron algunos grupos del extractor
+        (p. ej. las categorías) se rehace únicamente esa parte.
+        Los adjuntos que el spool dejó en disco (mmap) se extraen en este
+        proceso para no copiarlos enteros a memoria al enviarlos al pool.
+        
+        Args:
+            content: Contenido del adjunto
+            sha256: Hash del contenido (None para no usar la caché)
+        """
+        extractor = self.invoice_extractor
+        use_cache = self.extraction_cache is not None and sha256 is not None
+        
+        if use_cache:
+            entry = self.extraction_cache.get(sha256)
+            if entry:
+                stale = extractor.stale_groups(entry['fingerprints'])
+                if not stale:
+                    self.logger.info("  ⚡ Datos de factura recuperados de la caché")
+                    return entry['invoice_data']
+                
+                # Solo cambiaron algunos grupos: rehacerlos sobre el estado guardado
+                invoice_data = extractor.refresh(entry['state'], stale) if entry['state'] else None
+                if invoice_data:
+                    self.logger.info(f"  ⚡ Caché actualizada ({', '.join(sorted(stale))})")
+                    self.extraction_cache.put(sha256, extractor.fingerprints, invoice_data, entry['state'])
+                    return invoice_data
+        
+        if self.extraction_pool is not None and isinstance(content, (bytes, str)):
+            invoice_data, state = self.extraction_pool.extract_with_state(content)
+        else:
+            invoice_data, state = extractor.extract_with_state(content)
+        
+        if invoice_data and use_cache:
+            self.extraction_cache.put(sha256, extractor.fingerprints, invoice_data, state)
+        
+        return invoice_data
+    
+    def _upload_stage(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Etapa 2: sube a Drive la factura o, si no hay, el primer adjunto
+        
+        Args:
+            job: Trabajo devuelto por _extract_stage
+            
+        Returns:
+            El mismo trabajo con file_id (o error)
+        """
+        if job['error'] is not None or not job['attachments']:
+            return job
+        
+        email = job['email']
+        
+        # Ya subido antes de cortarse la ejecución reanudada: no repetir la subida
+        journaled = self.run_journal.get(email.get('id')) if self.run_journal is not None else None
+        if journaled and journaled['file_id']:
+            self.logger.info(f"  ⏯️ Archivo ya subido en esta ejecución (ID: {journaled['file_id']})")
+            job['file_id'] = journaled['file_id']
+            return job
+        
+        try:
+            return self._upload_job(job)
+        finally:
+            if job['file_id']:
+                self._journal(email, 'uploaded', file_id=job['file_id'])
+    
+    def _upload_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Sube el archivo del trabajo (ver _upload_stage)"""
+        email = job['email']
+        
+        if job['invoice_data']:
+            if job['existing_file_id']:
+                job['file_id'] = self._link_duplicate(job['existing_file_id'])
+                return job
             
-            # Incluso con error, intentar registrar en spreadsheet
             try:
-                self._update_spreadsheet({}, None)
-            except:
-                pass
+                job['file_id'] = self._organize_in_drive(
+                    email, job['invoice_attachment'], job['invoice_data'], update_sheet=False
+                )
+                if job['file_id']:
+                    self._remember_upload(job['content_hash'], job['invoice_attachment'], job['file_id'])
+            except Exception as e:
+                job['error'] = e
+            return job
+        
+        # Si no se procesó ninguna factura, subir el primer adjunto a "Otros"
+        first_attachment = job['attachments'][0]
+        try:
+            sha256 = self._content_hash(first_attachment['content'])
+            known = self._find_duplicate(sha256)
+            if known and known['drive_file_id']:
+                job['file_id'] = self._link_duplicate(known['drive_file_id'])
+                return job
+            
+            date = self._parse_email_date(email)
+            folder_path = f"DOCUFIND/{date.year}/{date.strftime('%m-%B')}/Otros"
+            folder_id = self.drive_client.create_folder_path(folder_path)
+            
+            job['file_id'] = self.drive_client.upload_file(
+                first_attachment['content'],
+                first_attachment['filename'],
+                folder_id
+            )
+            if job['file_id']:
+                self._remember_upload(sha256, first_attachment, job['file_id'])
+        except Exception as e:
+            # Aún así se registrará en el spreadsheet, sin enlace
+            self.logger.error(f"  ❌ Error subiendo adjunto: {e}")
+        
+        return job
+    
+    def _content_hash(self, content: Any) -> Optional[str]:
+        """Hash del adjunto, o None si no hay almacén ni caché que lo usen"""
+        if self.content_store is None and self.extraction_cache is None:
+            return None
+        if not isinstance(content, (bytes, str, mmap.mmap)):
+            return None
+        return content_hash(content)
+    
+    def _find_duplicate(self, sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Registro de un adjunto ya subido con el mismo contenido, o None"""
+        if self.content_store is None or sha256 is None:
+            return None
+        return self.content_store.get(sha256)
+    
+    def _remember_upload(self, sha256: Optional[str], attachment: Dict[str, Any], file_id: str):
+        """Registra el archivo subido para enlazar futuros duplicados"""
+        if self.content_store is not None and sha256 is not None:
+            self.content_store.put(sha256, attachment.get('filename'), drive_file_id=file_id)
+    
+    def _link_duplicate(self, file_id: str) -> str:
+        """Reutiliza el archivo ya subido de un adjunto duplicado"""
+        self.logger.info(f"  ♻️ Duplicado: se enlaza el archivo existente (ID: {file_id})")
+        self._increment_stat('duplicados')
+        return file_id
+    
+    def _record_stage(self, job: Dict[str, Any], results: Dict):
+        """
+        Etapa 3: registra el correo en la hoja y en los resultados
+        
+        Args:
+            job: Trabajo devuelto por _upload_stage
+            results: Resultados acumulados de la ejecución
+        """
+        email = job['email']
+        attachments = job['attachments']
+        
+        if job['error'] is not None:
+            self._increment_stat('errores')
+            
+            # El correo queda pendiente para reintentarlo (hasta max_email_retries)
+            attempts = self.email_processor.mark_failed(email.get('id'))
+            
+            # Registrar el error en la hoja solo en el primer fallo: los
+            # reintentos no añaden más filas de error del mismo correo
+            if attempts <= 1:
+                try:
+                    self._update_spreadsheet({}, None, email, attachments, completed=False)
+                except:
+                    pass
+            else:
+                self.logger.info(f"  🔁 Fallo {attempts} del correo {email.get('id')}: fila de error ya registrada")
             
             results['failed'].append({
                 'email_id': email.get('id'),
                 'subject': email.get('subject'),
-                'error': str(e)
+                'error': str(job['error'])
+            })
+        else:
+            # IMPORTANTE: Registrar TODOS los emails, incluso sin adjuntos
+            self._update_spreadsheet(job['invoice_data'], job['file_id'], email, attachments)
+            
+            # Agregar a resultados exitosos
+            results['success'].append({
+                'email_id': email['id'],
+                'subject': email.get('subject'),
+                'sender': email.get('sender'),
+                'date': email.get('date'),
+                'attachments_processed': len(attachments)
             })
+        
+        # Correo registrado: liberar sus adjuntos (memoria o archivos en temp/)
+        self.email_processor.release_email(email.get('id'))
+    
+    def _increment_stat(self, key: str, amount: int = 1):
+        """Incrementa una estadística (seguro entre hilos)"""
+        with self._stats_lock:
+            self.stats[key] += amount
+    
+    def _journal(self, email: Dict, stage: str, **fields):
+        """Registra en el diario de ejecución la etapa alcanzada por un correo"""
+        if self.run_journal is not None:
+            self.run_journal.mark(email.get('id'), stage, **fields)
+    
+    def _on_rows_written(self, email_ids: List[str]):
+        """
+        Filas ya escritas en la hoja: los correos quedan registrados
+        
+        El estado incremental también avanza aquí y no al encolar la fila,
+        así un corte con filas aún en el buffer no las da por procesadas.
+        """
+        if self.run_journal is not None:
+            self.run_journal.mark_recorded(email_ids)
+        for email_id in email_ids:
+            self.email_processor.mark_processed(email_id)
+    
+    def _parse_email_date(self, email: Dict) -> datetime:
+        """Obtiene la fecha del email como datetime (fecha actual si no se puede)"""
+        date_str = email.get('date', '')
+        if ' ' in date_str:
+            date_str = date_str.split(' ')[0]
+        
+        try:
+            return datetime.strptime(date_str, '%Y-%m-%d')
+        except ValueError:
+            self.logger.warning(f"⚠️ No se pudo parsear fecha: {email.get('date', '')}, usando fecha actual")
+            return datetime.now()
             
     def _process_attachment(self, email: Dict, attachment: Dict, results: Dict):
         """Procesa un adjunto individual"""
@@ -341,11 +792,6 @@ class DocuFindProcessor:
                 invoice_data = self.invoice_extractor.extract(attachment['content'])
                 
                 if invoice_data:
-                    # Agregar info del email a los datos
-                    invoice_data['email_date'] = email.get('date', '')
-                    invoice_data['email_sender'] = email.get('sender', '')
-                    invoice_data['email_subject'] = email.get('subject', '')
-                    
                     self._organize_in_drive(email, attachment, invoice_data)
         except Exception as e:
             self.logger.error(f"    ❌ Error procesando adjunto: {e}")
@@ -395,24 +841,22 @@ class DocuFindProcessor:
     
     
  
-    def _organize_in_drive(self, email: Dict, attachment: Dict, invoice_data: Dict):
-        """Organiza una factura en Google Drive"""
-        try:
-            # Corregir el parseo de fecha - manejar fecha con hora
-            date_str = email.get('date', '')
-            
-            # Si la fecha tiene formato "YYYY-MM-DD HH:MM:SS", tomar solo la parte de fecha
-            if ' ' in date_str:
-                date_str = date_str.split(' ')[0]  # Tomar solo "YYYY-MM-DD"
+    def _organize_in_drive(self, email: Dict, attachment: Dict, invoice_data: InvoiceData,
+                           update_sheet: bool = True) -> Optional[str]:
+        """
+        Organiza una factura en Google Drive
+        
+        Args:
+            email: Datos del correo
+            attachment: Adjunto de la factura
+            invoice_data: Datos extraídos
+            update_sheet: Registrar también la fila en la hoja de cálculo
             
-            # Ahora parsear la fecha
-            try:
-                from datetime import datetime
-                date = datetime.strptime(date_str, '%Y-%m-%d')
-            except ValueError:
-                # Si falla, usar fecha actual
-                date = datetime.now()
-                self.logger.warning(f"⚠️ No se pudo parsear fecha: {email.get('date', '')}, usando fecha actual")
+        Returns:
+            ID del archivo subido
+        """
+        try:
+            date = self._parse_email_date(email)
             
             # Crear estructura de carpetas basada en fecha
             folder_path = f"DOCUFIND/{date.year}/{date.strftime('%m-%B')}/Facturas"
@@ -427,15 +871,18 @@ class DocuFindProcessor:
                 attachment['content'],
                 new_filename,
                 folder_id,
-                invoice_data
+                invoice_data.to_dict()
             )
             
             if file_id:
                 self.logger.info(f"      ✅ Subido a Drive: {new_filename}")
-                self.stats['archivos_subidos'] += 1
+                self._increment_stat('archivos_subidos')
                 
                 # Actualizar hoja de cálculo
-                self._update_spreadsheet(invoice_data, file_id)
+                if update_sheet:
+                    self._update_spreadsheet(invoice_data, file_id, email)
+            
+            return file_id
             
         except Exception as e:
            self.logger.error(f"      ❌ Error organizando en Drive: {e}")
@@ -466,25 +913,25 @@ class DocuFindProcessor:
             self.logger.error(f"      ❌ Error subiendo a Drive: {e}")
             raise
     
-    def _generate_filename(self, invoice_data: Dict, original_filename: str) -> str:
+    def _generate_filename(self, invoice_data: InvoiceData, original_filename: str) -> str:
         """Genera un nombre de archivo descriptivo para la factura"""
         parts = []
         
         # Fecha
-        if invoice_data.get('date'):
-            parts.append(invoice_data['date'].replace('/', '-'))
+        if invoice_data.invoice_date:
+            parts.append(invoice_data.invoice_date.replace('/', '-'))
         
         # Proveedor
-        if invoice_data.get('vendor'):
-            parts.append(invoice_data['vendor'].replace(' ', '_')[:20])
+        if invoice_data.vendor:
+            parts.append(invoice_data.vendor.replace(' ', '_')[:20])
         
         # Número de factura
-        if invoice_data.get('invoice_number'):
-            parts.append(f"F{invoice_data['invoice_number']}")
+        if invoice_data.invoice_number:
+            parts.append(f"F{invoice_data.invoice_number}")
         
         # Total
-        if invoice_data.get('total'):
-            parts.append(f"${invoice_data['total']}")
+        if invoice_data.amount:
+            parts.append(f"${invoice_data.amount}")
         
         # Si no hay datos, usar nombre original
         if not parts:
@@ -499,14 +946,26 @@ class DocuFindProcessor:
     
 
 
-    def _update_spreadsheet(self, invoice_data: Dict, file_id: str):
-        """Actualiza la hoja de cálculo con los datos de la factura y email"""
+    def _update_spreadsheet(self, invoice_data: Optional[InvoiceData], file_id: Optional[str],
+                            email: Optional[Dict] = None,
+                            attachments: Optional[List] = None,
+                            completed: bool = True):
+        """
+        Actualiza la hoja de cálculo con los datos de la factura y email
+        
+        Args:
+            invoice_data: Datos extraídos de la factura (None si no hay)
+            file_id: ID del archivo en Drive
+            email: Datos del correo (por defecto el correo actual)
+            attachments: Adjuntos del correo (por defecto los del correo actual)
+            completed: Si la fila da el correo por procesado (False en filas de error)
+        """
         try:
             # Buscar o crear hoja de cálculo
             spreadsheet_name = f"DOCUFIND_Facturas_{datetime.now().year}"
             
-            # Primero crear carpeta DOCUFIND si no existe
-            root_folder_id = self.drive_client.create_folder("DOCUFIND")
+            # Primero crear carpeta DOCUFIND si no existe (resuelta una vez por ejecución)
+            root_folder_id = self.drive_client.get_root_folder_id()
             if not root_folder_id:
                 self.logger.error("❌ No se pudo crear carpeta DOCUFIND")
                 return
@@ -522,8 +981,13 @@ class DocuFindProcessor:
                 return
             
             # Obtener información del email SIEMPRE disponible
-            email_info = getattr(self, 'current_email', {})
-            attachments_info = getattr(self, 'current_attachments', [])
+            email_info = email if email is not None else getattr(self, 'current_email', {})
+            if attachments is not None:
+                attachments_info = attachments
+            elif email is not None:
+                attachments_info = email.get('attachments') or []
+            else:
+                attachments_info = getattr(self, 'current_attachments', [])
             
             # === CORRECCIÓN 1: Fecha Factura ===
             # Siempre usar la fecha del email como fecha de factura
@@ -551,80 +1015,23 @@ class DocuFindProcessor:
                     else:
                         attachment_names.append(str(att))
             
-            # IMPORTANTE: Preparar exactamente 20 campos en orden
-            row_data = [
-                # 1. Fecha Procesamiento
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                
-                # 2. Fecha Email
-                email_date.split(' ')[0] if ' ' in email_date else email_date,
-                
-                # 3. Remitente (completo)
-                self._clean_text(sender)[:200],
-                
-                # 4. Asunto
-                self._clean_text(email_info.get('subject', ''))[:200],
-                
-                # 5. Tiene Adjuntos
-                'Sí' if attachments_info else 'No',
-                
-                # 6. Cantidad Adjuntos
-                str(len(attachments_info)) if attachments_info else '0',
-                
-                # 7. Nombres Adjuntos
-                ', '.join(attachment_names)[:1000] if attachment_names else '',
-                
-                # 8. Fecha Factura (SIEMPRE la fecha del email)
-                fecha_factura,
-                
-                # 9. Proveedor (SIEMPRE el dominio del remitente)
-                proveedor,
-                
-                # 10. Número Factura
-                str(invoice_data.get('invoice_number', ''))[:50] if invoice_data else '',
-                
-                # 11. Concepto (SIEMPRE primeros 500 caracteres del email)
-                concepto,
-                
-                # 12. Subtotal
-                str(invoice_data.get('subtotal', '')) if invoice_data else '',
-                
-                # 13. Impuestos
-                str(invoice_data.get('tax_amount', invoice_data.get('tax', ''))) if invoice_data else '',
-                
-                # 14. Total
-                str(invoice_data.get('amount', invoice_data.get('total', ''))) if invoice_data else '',
-                
-                # 15. Moneda
-                invoice_data.get('currency', 'N/A') if invoice_data else 'N/A',
-                
-                # 16. Método Pago
-                invoice_data.get('payment_method', '') if invoice_data else '',
-                
-                # 17. Categoría
-                invoice_data.get('category', 'Email') if invoice_data else 'Email',
-                
-                # 18. Estado
-                'Procesado',
-                
-                # 19. Confianza
-                f"{invoice_data.get('confidence', 0):.1%}" if invoice_data and invoice_data.get('confidence') else 'N/A',
-                
-                # 20. Link Archivo
-                f"https://drive.google.com/file/d/{file_id}/view" if file_id else ''
-            ]
-               
-            # Verificar que tenemos exactamente 20 campos
-            if len(row_data) != 20:
-                self.logger.warning(f"⚠️ Número de campos incorrecto: {len(row_data)}, esperado: 20")
-                # Ajustar a 20 campos
-                while len(row_data) < 20:
-                    row_data.append('')
-                row_data = row_data[:20]
-            
-            # Agregar fila a la hoja
-            if self.drive_client.append_to_spreadsheet(spreadsheet_id, row_data):
-                self.logger.info(f"        ✅ Datos agregados a hoja de cálculo")
+            # Las 20 columnas en orden; las de la factura las aporta InvoiceData
+            email_columns = {
+                'processed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'email_date': fecha_factura,
+                'sender': self._clean_text(sender)[:200],
+                'subject': self._clean_text(email_info.get('subject', ''))[:200],
+                'attachment_names': attachment_names,
+                'invoice_date': fecha_factura,  # SIEMPRE la fecha del email
+                'vendor': proveedor,            # SIEMPRE el dominio del remitente
+                'concept': concepto             # SIEMPRE primeros 500 caracteres del email
+            }
+            row_data = (invoice_data or InvoiceData()).to_row(email_columns, file_id)
+            
+            # Agregar fila al buffer de la hoja (se escribe por lotes)
+            buffer = self._get_sheet_buffer(spreadsheet_name, spreadsheet_id)
+            if buffer.add(row_data, tag=email_info.get('id') if completed else None):
+                self.logger.info(f"        ✅ Datos agregados al buffer de la hoja de cálculo")
             else:
                 self.logger.error(f"        ❌ Error agregando datos a hoja")
                 
@@ -635,6 +1042,40 @@ class DocuFindProcessor:
             
             
             
+    def _get_sheet_buffer(self, spreadsheet_name: str, spreadsheet_id: str) -> SheetRowBuffer:
+        """
+        Obtiene (o crea) el buffer de filas de una hoja de cálculo
+        
+        Los buffers se indexan por nombre: si el ID en caché deja de ser
+        válido y la hoja se vuelve a resolver, las filas pendientes se
+        envían a la nueva hoja.
+        """
+        buffer = self.sheet_buffers.get(spreadsheet_name)
+        if buffer is not None:
+            buffer.spreadsheet_id = spreadsheet_id
+        else:
+            drive_config = self.config.get('google_drive', {})
+            buffer = SheetRowBuffer(
+                self.drive_client,
+                spreadsheet_id,
+                max_rows=drive_config.get('sheet_batch_rows', 50),
+                max_seconds=drive_config.get('sheet_flush_seconds', 30),
+                on_written=self._on_rows_written
+            )
+            self.sheet_buffers[spreadsheet_name] = buffer
+        return buffer
+    
+    def _flush_sheet_buffers(self):
+        """Escribe las filas pendientes de todas las hojas"""
+        for buffer in self.sheet_buffers.values():
+            # Fin de la ejecución: sin más envíos por tiempo en segundo plano
+            buffer.close()
+            pending = len(buffer.rows)
+            if pending and buffer.flush():
+                self.logger.info(f"📊 {pending} filas pendientes escritas en la hoja de cálculo")
+            elif pending:
+                self.stats['errores'] += 1
+    
     def _extract_clean_domain(self, sender: str) -> str:
         """
         Extrae y limpia el dominio del remitente
@@ -688,32 +1129,6 @@ class DocuFindProcessor:
         Returns:
             Concepto de máximo 1000 caracteres sin HTML/CSS
         """
-        import re
-        from html.parser import HTMLParser
-        
-        class HTMLTextExtractor(HTMLParser):
-            """Parser para extraer solo texto de HTML"""
-            def __init__(self):
-                super().__init__()
-                self.text_parts = []
-                self.skip_tags = {'script', 'style', 'meta', 'link'}
-                self.current_tag = None
-                
-            def handle_starttag(self, tag, attrs):
-                self.current_tag = tag.lower()
-                
-            def handle_endtag(self, tag):
-                self.current_tag = None
-                
-            def handle_data(self, data):
-                if self.current_tag not in self.skip_tags:
-                    text = data.strip()
-                    if text:
-                        self.text_parts.append(text)
-            
-            def get_text(self):
-                return ' '.join(self.text_parts)
-        
         # Prioridad 1: Asunto del email (limpio)
         subject = email_info.get('subject', '')
         
@@ -721,106 +1136,60 @@ class DocuFindProcessor:
         body = email_info.get('body', '')
         
         # Si el cuerpo parece tener HTML, extraer solo el texto
-        if '<' in body and '>' in body:
-            try:
-                # Usar el parser HTML para extraer texto
-                parser = HTMLTextExtractor()
-                parser.feed(body)
-                body_text = parser.get_text()
-            except:
-                # Si falla el parser, usar método de respaldo
-                body_text = body
-        else:
-            body_text = body
+        body_text = html_to_text(body) if looks_like_html(body) else body
         
         # Combinar asunto y cuerpo
         full_text = f"{subject}. {body_text}"
         
         # === LIMPIEZA PROFUNDA ===
         
-        # 1. Remover estilos CSS inline y clases
-        full_text = re.sub(r'\.custom-[a-z0-9]+\{[^}]*\}', '', full_text)
-        full_text = re.sub(r'style="[^"]*"', '', full_text)
-        full_text = re.sub(r'style=\'[^\']*\'', '', full_text)
-        full_text = re.sub(r'class="[^"]*"', '', full_text)
-        full_text = re.sub(r'class=\'[^\']*\'', '', full_text)
-        
-        # 2. Remover todas las etiquetas HTML restantes
-        full_text = re.sub(r'<script[^>]*>.*?</script>', '', full_text, flags=re.DOTALL)
-        full_text = re.sub(r'<style[^>]*>.*?</style>', '', full_text, flags=re.DOTALL)
-        full_text = re.sub(r'<[^>]+>', '', full_text)
-        
-        # 3. Decodificar entidades HTML
-        html_entities = {
-            '&nbsp;': ' ', '&amp;': '&', '&lt;': '<', '&gt;': '>',
-            '&quot;': '"', '&#39;': "'", '&apos;': "'",
-            '&ndash;': '-', '&mdash;': '-', '&hellip;': '...',
-            '&copy;': '©', '&reg;': '®', '&trade;': '™'
-        }
-        for entity, char in html_entities.items():
-            full_text = full_text.replace(entity, char)
-        
-        # 4. Remover URLs
-        full_text = re.sub(r'https?://[^\s]+', '', full_text)
-        full_text = re.sub(r'www\.[^\s]+', '', full_text)
-        
-        # 5. Remover emails
-        full_text = re.sub(r'[\w\.-]+@[\w\.-]+\.\w+', '', full_text)
-        
-        # 6. Remover selectores CSS y propiedades
-        # Patrones como: margin:20px; font-family:system-ui; etc.
-        full_text = re.sub(r'[a-z-]+:\s*[^;]+;', '', full_text)
-        full_text = re.sub(r'[a-z-]+:\s*[^,\s]+(?:,|\s)', '', full_text)
-        
-        # 7. Remover valores CSS sueltos
-        # Patrones como: rgb(51, 51, 51), #027eff, 20px, etc.
-        full_text = re.sub(r'rgb\([^)]+\)', '', full_text)
-        full_text = re.sub(r'rgba\([^)]+\)', '', full_text)
-        full_text = re.sub(r'#[0-9a-fA-F]{3,6}\b', '', full_text)
-        full_text = re.sub(r'\b\d+px\b', '', full_text)
-        full_text = re.sub(r'\b\d+em\b', '', full_text)
-        full_text = re.sub(r'\b\d+%\b', '', full_text)
-        
-        # 8. Remover nombres de fuentes y valores CSS comunes
-        css_values = [
-            'sans-serif', 'serif', 'monospace', 'Arial', 'Helvetica',
-            'system-ui', 'BlinkMacSystemFont', 'Segoe UI', 'Roboto',
-            'bold', 'italic', 'normal', 'underline', 'none',
-            'block', 'inline', 'flex', 'grid', 'absolute', 'relative',
-            'auto', 'inherit', 'initial', 'unset'
-        ]
-        for value in css_values:
-            full_text = re.sub(r'\b' + re.escape(value) + r'\b', '', full_text, flags=re.IGNORECASE)
-        
-        # 9. Remover caracteres especiales de programación/markup
-        full_text = re.sub(r'[{}()\[\];:<>]', ' ', full_text)
-        
-        # 10. Remover múltiples espacios, tabs y saltos de línea
-        full_text = re.sub(r'\s+', ' ', full_text)
-        
-        # 11. Remover espacios alrededor de puntuación
-        full_text = re.sub(r'\s+([.,!?])', r'\1', full_text)
-        full_text = re.sub(r'([.,!?])\s+', r'\1 ', full_text)
-        
-        # 12. Limpiar principio y final
+        # 1. Remover estilos CSS inline, clases y etiquetas HTML restantes
+        full_text = _CONCEPT_MARKUP_RE.sub('', full_text)
+        
+        # 2. Decodificar entidades HTML
+        if '&' in full_text:
+            for entity, char in CONCEPT_HTML_ENTITIES.items():
+                full_text = full_text.replace(entity, char)
+        
+        # 3. Remover URLs y emails
+        full_text = _CONCEPT_LINKS_RE.sub('', full_text)
+        
+        # 4. Remover selectores CSS y propiedades
+        full_text = _CONCEPT_CSS_PROPERTY_RE.sub('', full_text)
+        
+        # 5. Remover valores CSS sueltos, nombres de fuentes y valores comunes
+        full_text = _CONCEPT_CSS_VALUE_RE.sub('', full_text)
+        
+        # 6. Remover caracteres especiales de programación/markup
+        full_text = _CONCEPT_SPECIAL_CHARS_RE.sub(' ', full_text)
+        
+        # 7. Remover múltiples espacios, tabs y saltos de línea
+        full_text = _CONCEPT_WHITESPACE_RE.sub(' ', full_text)
+        
+        # 8. Remover espacios alrededor de puntuación
+        full_text = _CONCEPT_SPACE_BEFORE_PUNCT_RE.sub(r'\1', full_text)
+        full_text = _CONCEPT_SPACE_AFTER_PUNCT_RE.sub(r'\1 ', full_text)
+        
+        # 9. Limpiar principio y final
         full_text = full_text.strip()
         
-        # 13. Remover puntos y comas consecutivos
-        full_text = re.sub(r'[.,]{2,}', '.', full_text)
+        # 10. Remover puntos y comas consecutivos
+        full_text = _CONCEPT_REPEATED_PUNCT_RE.sub('.', full_text)
         
-        # 14. Si después de toda la limpieza queda muy poco texto, intentar método alternativo
+        # 11. Si después de toda la limpieza queda muy poco texto, intentar método alternativo
         if len(full_text) < 50:
             # Intentar extraer solo el asunto y las primeras palabras del body original
             simple_text = subject
             if body:
                 # Tomar solo texto alfanumérico del body
-                body_words = re.findall(r'\b[A-Za-z0-9]+\b', body)
+                body_words = _CONCEPT_WORD_RE.findall(body)
                 if body_words:
                     simple_text += '. ' + ' '.join(body_words[:100])
             full_text = simple_text
         
-        # 15. Asegurar que no hay caracteres no imprimibles
-        full_text = ''.join(char for char in full_text if char.isprintable() or char == ' ')
+        # 12. Asegurar que no hay caracteres no imprimibles
+        if not full_text.isprintable():
+            full_text = ''.join(char for char in full_text if char.isprintable() or char == ' ')
         
         # Tomar primeros 1000 caracteres (aumentado de 500)
         concept = full_text[:1000]
@@ -969,7 +1338,16 @@ class DocuFindProcessor:
         self.logger.info(f"📧 Correos procesados: {self.stats['emails_procesados']}")
         self.logger.info(f"📄 Facturas extraídas: {self.stats['facturas_extraidas']}")
         self.logger.info(f"☁️ Archivos subidos: {self.stats['archivos_subidos']}")
+        self.logger.info(f"♻️ Duplicados enlazados: {self.stats['duplicados']}")
         self.logger.info(f"❌ Errores encontrados: {self.stats['errores']}")
+        
+        # Tiempo cedido a la cuota de las APIs de Google
+        drive_client = getattr(self, 'drive_client', None)
+        if drive_client is not None:
+            quota = drive_client.rate_limiter.stats()
+            self.logger.info(f"🚦 Espera por cuota de Google: {quota['wait_seconds']:.1f}s "
+                             f"+ {quota['backoff_seconds']:.1f}s de backoff ({quota['retries']} reintentos)")
+        
         self.logger.info(f"⏱️ Duración: {self._calculate_duration()}")
         self.logger.info("=" * 60)
         
@@ -990,6 +1368,9 @@ Ejemplos de uso:
   python find_documents_main.py --from 2024-01-01 --to 2024-01-31
   python find_documents_main.py --query "factura"   # Buscar correos con "factura"
   python find_documents_main.py --limit 10          # Procesar solo 10 correos
+  python find_documents_main.py --full-sync         # Ignorar estado incremental
+  python find_documents_main.py --pipeline concurrent --workers 8
+  python find_documents_main.py --resume            # Continuar la última ejecución cortada
   python find_documents_main.py --test              # Modo de prueba
         """
     )
@@ -1007,6 +1388,16 @@ Ejemplos de uso:
                        help='Query de búsqueda adicional')
     parser.add_argument('--limit', '-l', type=int,
                        help='Límite de correos a procesar')
+    parser.add_argument('--full-sync', action='store_true',
+                       help='Ignorar el último UID procesado y revisar todo el periodo')
+    
+    # Argumentos de ejecución
+    parser.add_argument('--pipeline', choices=['sequential', 'concurrent'],
+                       help='Modo de ejecución (por defecto el de la configuración)')
+    parser.add_argument('--workers', '-w', type=int,
+                       help='Hilos por etapa en modo concurrente')
+    parser.add_argument('--resume', action='store_true',
+                       help='Continuar la última ejecución interrumpida con sus mismos parámetros')
     
     # Argumentos de configuración
     parser.add_argument('--config', '-c', default='config/config.json',
@@ -1051,7 +1442,11 @@ Ejemplos de uso:
             date_from=date_from,
             date_to=date_to,
             query=args.query,
-            limit=args.limit
+            limit=args.limit,
+            full_sync=args.full_sync,
+            pipeline=args.pipeline,
+            workers=args.workers,
+            resume=args.resume
         )
         
         # Código de salida basado en errores
@@ -7,9 +7,13 @@ Cliente para interactuar con Google Drive y Sheets
 import os
 import io
 import json
+import mmap
+import hashlib
 import logging
+import threading
+import time
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Union
+from typing import Dict, List, Any, Optional, Union, Tuple, Callable
 from datetime import datetime
 
 # Google API imports
@@ -19,14 +23,26 @@ try:
     from google_auth_oauthlib.flow import InstalledAppFlow
     from googleapiclient.discovery import build
     from googleapiclient.errors import HttpError
-    from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload
+    from googleapiclient.http import HttpRequest, MediaFileUpload, MediaIoBaseUpload
+    import google_auth_httplib2
+    import httplib2
 except ImportError:
     print("❌ Error: Librerías de Google no instaladas")
     print("Ejecuta: pip install google-auth google-auth-oauthlib google-auth-httplib2 google-api-python-client")
     raise
 
+try:
+    from src.drive_cache import DriveIdCache
+    from src.rate_limiter import ApiRateLimiter, parse_rate_limits, is_retryable_error
+except ImportError:
+    from drive_cache import DriveIdCache
+    from rate_limiter import ApiRateLimiter, parse_rate_limits, is_retryable_error
+
 logger = logging.getLogger(__name__)
 
+# Las subidas reanudables avanzan en múltiplos de 256 KB
+UPLOAD_CHUNK_ALIGNMENT = 256 * 1024
+
 class GoogleServicesConfig:
     """Configuración para los servicios de Google"""
     
@@ -48,6 +64,166 @@ class GoogleServicesConfig:
         self.create_year_folders = config_dict.get('create_year_folders', True)
         self.create_month_folders = config_dict.get('create_month_folders', True)
         self.upload_reports = config_dict.get('upload_reports', True)
+        self.resumable_threshold_mb = config_dict.get('resumable_threshold_mb', 5)
+        self.upload_chunk_mb = config_dict.get('upload_chunk_mb', 8)
+        self.upload_max_retries = config_dict.get('upload_max_retries', 5)
+        self.rate_limits = config_dict.get('rate_limits', {})
+        self.api_max_retries = config_dict.get('api_max_retries', 5)
+
+class RateLimitedRequest(HttpRequest):
+    """
+    HttpRequest que pasa por el limitador de cuota compartido
+    
+    execute() espera turno en el bucket de su API (Drive/Sheets) y tipo
+    (lectura/escritura) y reintenta con backoff ante cuota agotada o, solo
+    las lecturas, ante 5xx. next_chunk() solo espera turno: la subida reanudable ya retoma cada
+    bloque por su cuenta.
+    """
+    
+    def __init__(self, limiter: ApiRateLimiter, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.limiter = limiter
+        
+        service = (self.methodId or '').split('.', 1)[0]
+        if service not in ('drive', 'sheets'):
+            service = 'sheets' if 'sheets.googleapis.com' in self.uri else 'drive'
+        self.api = service
+        self.kind = 'read' if self.method.upper() == 'GET' else 'write'
+    
+    def execute(self, http=None, num_retries=0):
+        parent_execute = super().execute
+        return self.limiter.call(self.api, self.kind,
+                                 lambda: parent_execute(http=http, num_retries=num_retries))
+    
+    def next_chunk(self, http=None, num_retries=0):
+        self.limiter.acquire(self.api, self.kind)
+        return super().next_chunk(http=http, num_retries=num_retries)
+
+class SheetRowBuffer:
+    """
+    Buffer de filas para Google Sheets
+    
+    Acumula filas y las envía en una sola llamada values().append cuando se
+    alcanza el tamaño máximo, cuando pasa el intervalo máximo o al finalizar.
+    El intervalo lo vigila un temporizador, así las filas se escriben a tiempo
+    aunque no lleguen más (p. ej. con el pipeline parado en una subida larga).
+    Ante un fallo inesperado solo se pierde, como mucho, un buffer de filas.
+    Cada fila puede llevar una etiqueta (el UID del correo): tras un envío
+    correcto se notifican a on_written las etiquetas de las filas escritas.
+    """
+    
+    def __init__(self, client: 'GoogleDriveClient', spreadsheet_id: str,
+                 max_rows: int = 50, max_seconds: float = 30.0,
+                 on_written: Optional[Callable[[List[Any]], None]] = None):
+        """
+        Inicializa el buffer
+        
+        Args:
+            client: Cliente de Google Drive que realiza las escrituras
+            spreadsheet_id: ID de la hoja destino
+            max_rows: Filas acumuladas que provocan un envío
+            max_seconds: Segundos máximos que una fila espera en el buffer
+            on_written: Función que recibe las etiquetas de las filas ya escritas
+        """
+        self.client = client
+        self.spreadsheet_id = spreadsheet_id
+        self.max_rows = max(1, int(max_rows))
+        self.max_seconds = max_seconds
+        self.on_written = on_written
+        
+        self.rows: List[List[Any]] = []
+        self.tags: List[Any] = []
+        self._first_row_at: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+    
+    def add(self, row_data: List[Any], tag: Any = None) -> bool:
+        """
+        Agrega una fila y envía el buffer si está lleno o es antiguo
+        
+        Args:
+            row_data: Valores de la fila
+            tag: Etiqueta de la fila para on_written (opcional)
+        
+        Returns:
+            False si hubo un envío y falló
+        """
+        with self._lock:
+            self.rows.append(row_data)
+            self.tags.append(tag)
+            if self._first_row_at is None:
+                self._first_row_at = time.monotonic()
+            
+            expired = time.monotonic() - self._first_row_at >= self.max_seconds
+            if len(self.rows) >= self.max_rows or expired:
+                return self._flush_locked()
+            
+            if self._timer is None:
+                self._schedule_locked(self.max_seconds - (time.monotonic() - self._first_row_at))
+        return True
+    
+    def flush(self) -> bool:
+        """
+        Envía las filas pendientes
+        
+        Returns:
+            True si no quedan filas pendientes
+        """
+        with self._lock:
+            return self._flush_locked()
+    
+    def close(self):
+        """Detiene el envío por tiempo (las filas pendientes se conservan)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+    
+    def _schedule_locked(self, delay: float):
+        """Programa el envío por tiempo del buffer (requiere tener el lock)"""
+        self._timer = threading.Timer(max(0.0, delay), self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+    
+    def _on_timer(self):
+        """Envía el buffer cuando vence el intervalo, aunque no lleguen filas nuevas"""
+        with self._lock:
+            if self._timer is None or threading.current_thread() is not self._timer:
+                # Cancelado o reemplazado mientras esperaba el lock
+                return
+            self._timer = None
+            
+            if self.rows:
+                logger.debug(f"⏱️ Intervalo de la hoja vencido, enviando {len(self.rows)} filas")
+                self._flush_locked()
+            if self.rows and self._timer is None:
+                # El envío falló: se reintenta en el siguiente intervalo
+                self._schedule_locked(self.max_seconds)
+    
+    def _flush_locked(self) -> bool:
+        """Envía el buffer (requiere tener el lock)"""
+        if not self.rows:
+            return True
+        
+        if not self.client.append_rows_to_spreadsheet(self.spreadsheet_id, self.rows):
+            # Conservar las filas para reintentarlas en el próximo envío
+            logger.error(f"❌ No se pudieron escribir {len(self.rows)} filas, se reintentará")
+            return False
+        
+        written = [tag for tag in self.tags if tag is not None]
+        self.rows = []
+        self.tags = []
+        self._first_row_at = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        if written and self.on_written is not None:
+            try:
+                self.on_written(written)
+            except Exception as e:
+                logger.warning(f"⚠️ Error registrando filas escritas: {e}")
+        return True
 
 class GoogleDriveClient:
     """Cliente para interactuar con Google Drive"""
@@ -58,10 +234,16 @@ class GoogleDriveClient:
         'https://www.googleapis.com/auth/spreadsheets'
     ]
     
+    # Máximo de peticiones por lote HTTP que admite la API de Drive
+    BATCH_LIMIT = 100
+    
     def __init__(self, 
                  credentials_path: Optional[str] = None,
                  token_path: Optional[str] = None,
-                 config: Optional[Union[Dict[str, Any], GoogleServicesConfig]] = None):
+                 config: Optional[Union[Dict[str, Any], GoogleServicesConfig]] = None,
+                 id_cache: Optional[DriveIdCache] = None,
+                 upload_sessions: Optional[DriveIdCache] = None,
+                 rate_limiter: Optional[ApiRateLimiter] = None):
         """
         Inicializa el cliente de Google Drive
         
@@ -69,6 +251,9 @@ class GoogleDriveClient:
             credentials_path: Ruta al archivo credentials.json
             token_path: Ruta al archivo token.json
             config: Configuración completa (dict o GoogleServicesConfig)
+            id_cache: Caché persistente de IDs (por defecto solo en memoria)
+            upload_sessions: URIs de subidas reanudables en curso (por defecto solo en memoria)
+            rate_limiter: Limitador de cuota compartido (por defecto uno según config.rate_limits)
         """
         # Si se pasa config, usarla
         if config:
@@ -91,8 +276,29 @@ class GoogleDriveClient:
         self.drive_service = None
         self.sheets_service = None
         
-        # Cache de carpetas
-        self.folder_cache = {}
+        # Cache de carpetas: ruta completa → ID (solo en memoria)
+        self.folder_cache: Dict[str, str] = {}
+        
+        # IDs ya resueltos (carpetas por padre + nombre, hojas de cálculo)
+        self.id_cache = id_cache or DriveIdCache(None)
+        self._invalidations = 0
+        
+        # Subidas por tamaño: multipart hasta el umbral, reanudable por bloques después
+        self.resumable_threshold = int(float(self.config.resumable_threshold_mb) * 1024 * 1024)
+        chunk_bytes = int(float(self.config.upload_chunk_mb) * 1024 * 1024)
+        self.upload_chunk_size = max(1, chunk_bytes // UPLOAD_CHUNK_ALIGNMENT) * UPLOAD_CHUNK_ALIGNMENT
+        self.upload_max_retries = max(0, int(self.config.upload_max_retries))
+        self.upload_sessions = upload_sessions or DriveIdCache(None)
+        
+        # Cuota de las APIs: todas las peticiones de todos los hilos pasan por aquí
+        self.rate_limiter = rate_limiter or ApiRateLimiter(
+            parse_rate_limits(self.config.rate_limits),
+            max_retries=self.config.api_max_retries
+        )
+        
+        # httplib2 no es thread-safe: cada hilo usa su propio transporte
+        self._local = threading.local()
+        self._folder_lock = threading.RLock()
         
         logger.info("📁 GoogleDriveClient inicializado")
     
@@ -182,8 +388,10 @@ class GoogleDriveClient:
                     logger.info(f"💾 Token guardado en: {self.token_path}")
             
             # Construir servicios
-            self.drive_service = build('drive', 'v3', credentials=self.creds)
-            self.sheets_service = build('sheets', 'v4', credentials=self.creds)
+            self.drive_service = build('drive', 'v3', credentials=self.creds,
+                                       requestBuilder=self._build_request)
+            self.sheets_service = build('sheets', 'v4', credentials=self.creds,
+                                        requestBuilder=self._build_request)
             
             # Verificar que los servicios funcionan
             try:
@@ -209,6 +417,19 @@ class GoogleDriveClient:
             
             return False
     
+    def _build_request(self, http, *args, **kwargs) -> HttpRequest:
+        """
+        Construye cada petición con el transporte HTTP del hilo actual
+        
+        Permite usar los servicios desde los hilos del pipeline concurrente.
+        Las peticiones salen limitadas por rate_limiter (ver RateLimitedRequest).
+        """
+        authorized_http = getattr(self._local, 'http', None)
+        if authorized_http is None:
+            authorized_http = google_auth_httplib2.AuthorizedHttp(self.creds, http=httplib2.Http())
+            self._local.http = authorized_http
+        return RateLimitedRequest(self.rate_limiter, authorized_http, *args, **kwargs)
+    
     def create_folder(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
         """
         Crea una carpeta en Google Drive
@@ -220,6 +441,12 @@ class GoogleDriveClient:
         Returns:
             ID de la carpeta creada
         """
+        # Consultar la caché antes de cualquier llamada a la API
+        cache_key = f"folder:{parent_id or 'root'}/{folder_name}"
+        cached_id = self.id_cache.get(cache_key)
+        if cached_id:
+            return cached_id
+        
         if not self.drive_service:
             if not self.authenticate():
                 return None
@@ -229,6 +456,7 @@ class GoogleDriveClient:
             existing = self._find_folder(folder_name, parent_id)
             if existing:
                 logger.info(f"📁 Carpeta ya existe: {folder_name}")
+                self.id_cache.set(cache_key, existing)
                 return existing
             
             # Crear metadata de la carpeta
@@ -250,38 +478,63 @@ class GoogleDriveClient:
             logger.info(f"✅ Carpeta creada: {folder_name} (ID: {folder_id})")
             
             # Cachear
-            self.folder_cache[folder_name] = folder_id
+            self.id_cache.set(cache_key, folder_id)
             
             return folder_id
             
         except HttpError as e:
             logger.error(f"❌ Error creando carpeta: {e}")
+            if parent_id and self._is_not_found(e):
+                self._invalidate_folder(parent_id)
             return None
     
+    def get_root_folder_id(self) -> Optional[str]:
+        """
+        Obtiene el ID de la carpeta raíz, resolviéndolo una sola vez
+        
+        Returns:
+            ID de la carpeta raíz (DOCUFIND por defecto)
+        """
+        return self.create_folder(self.config.root_folder or "DOCUFIND")
+    
     def create_folder_path(self, path: str) -> Optional[str]:
         """
         Crea una ruta completa de carpetas
         
+        Las rutas ya resueltas se sirven desde caché sin llamar a la API.
+        Si un ID en caché resultó no existir, la ruta se resuelve de nuevo.
+        
         Args:
             path: Ruta de carpetas separadas por /
             
         Returns:
             ID de la última carpeta creada
         """
-        if not self.drive_service:
-            if not self.authenticate():
-                return None
+        parts = [part for part in path.split('/') if part]
+        full_path = '/'.join(parts)
+        
+        cached_id = self.folder_cache.get(full_path)
+        if cached_id:
+            return cached_id
         
         try:
-            parts = path.split('/')
-            parent_id = None
-            
-            for part in parts:
-                if part:
-                    parent_id = self.create_folder(part, parent_id)
-                    if not parent_id:
-                        return None
+            # Serializar para que dos hilos no creen la misma carpeta dos veces
+            with self._folder_lock:
+                # Cada intento fallido descubre al menos un nivel borrado
+                for attempt in range(len(parts) + 1):
+                    invalidations = self._invalidations
+                    parent_id = None
+                    
+                    for part in parts:
+                        parent_id = self.create_folder(part, parent_id)
+                        if not parent_id:
+                            break
+                    
+                    if parent_id or self._invalidations == invalidations:
+                        break
             
+            if parent_id:
+                self.folder_cache[full_path] = parent_id
             return parent_id
             
         except Exception as e:
@@ -289,18 +542,28 @@ class GoogleDriveClient:
             return None
     
     def upload_file(self, 
-                   content: Union[bytes, str],
+                   content: Union[bytes, str, mmap.mmap],
                    filename: str,
                    folder_id: Optional[str] = None,
-                   metadata: Optional[Dict] = None) -> Optional[str]:
+                   metadata: Optional[Dict] = None,
+                   retry_missing_folder: bool = True) -> Optional[str]:
         """
         Sube un archivo a Google Drive
         
+        Los archivos de hasta resumable_threshold_mb se envían en una sola
+        petición multipart. Los mayores usan una subida reanudable por bloques
+        de upload_chunk_mb cuya sesión se guarda: tras un error transitorio o
+        un reinicio del proceso se continúa desde el último bloque confirmado.
+        
+        Si la carpeta destino ya no existe (404), se olvida junto con sus
+        subcarpetas en caché, se vuelve a crear su ruta y se reintenta una vez.
+        
         Args:
-            content: Contenido del archivo (bytes o path)
+            content: Contenido del archivo (bytes, mmap de un adjunto en disco o path)
             filename: Nombre del archivo
             folder_id: ID de la carpeta destino
             metadata: Metadata adicional
+            retry_missing_folder: Recrear la carpeta y reintentar tras un 404
             
         Returns:
             ID del archivo subido
@@ -351,27 +614,51 @@ class GoogleDriveClient:
             # Determinar tipo MIME
             mime_type = self._get_mime_type(filename)
             
+            # Tamaño del contenido para elegir el tipo de subida
+            if isinstance(content, (bytes, mmap.mmap)):
+                size = len(content)
+            else:
+                size = os.path.getsize(content)
+            resumable = size > self.resumable_threshold
+            
             # Crear media upload
             if isinstance(content, bytes):
                 media = MediaIoBaseUpload(
                     io.BytesIO(content),
                     mimetype=mime_type,
-                    resumable=True
+                    chunksize=self.upload_chunk_size,
+                    resumable=resumable
+                )
+            elif isinstance(content, mmap.mmap):
+                # Adjunto en disco: se sube leyendo del mmap, sin copiarlo
+                content.seek(0)
+                media = MediaIoBaseUpload(
+                    content,
+                    mimetype=mime_type,
+                    chunksize=self.upload_chunk_size,
+                    resumable=resumable
                 )
             else:
                 # Si es un path
                 media = MediaFileUpload(
                     content,
                     mimetype=mime_type,
-                    resumable=True
+                    chunksize=self.upload_chunk_size,
+                    resumable=resumable
                 )
             
             # Subir archivo
-            file = self.drive_service.files().create(
+            request = self.drive_service.files().create(
                 body=file_metadata,
                 media_body=media,
                 fields='id'
-            ).execute()
+            )
+            
+            if resumable:
+                session_key = self._upload_session_key(content, filename, folder_id)
+                file = self._execute_resumable(request, session_key, size, filename)
+            else:
+                file = request.execute()
             
             file_id = file.get('id')
             logger.info(f"✅ Archivo subido: {filename} (ID: {file_id})")
@@ -380,10 +667,133 @@ class GoogleDriveClient:
             
         except HttpError as e:
             logger.error(f"❌ Error subiendo archivo: {e}")
+            if folder_id and self._is_not_found(e):
+                folder_path = self.id_cache.folder_path(folder_id)
+                self._invalidate_folder(folder_id)
+                
+                if retry_missing_folder and folder_path:
+                    new_folder_id = self.create_folder_path(folder_path)
+                    if new_folder_id and new_folder_id != folder_id:
+                        logger.info(f"🔄 Carpeta {folder_path} recreada, se reintenta la subida de {filename}")
+                        return self.upload_file(content, filename, new_folder_id, metadata,
+                                                retry_missing_folder=False)
             return None
     
     
     
+    def _upload_session_key(self, content: Union[bytes, str, mmap.mmap],
+                            filename: str, folder_id: Optional[str]) -> str:
+        """
+        Clave estable de una subida para encontrar su sesión tras un reinicio
+        
+        Combina destino, nombre y el SHA-256 del contenido (o ruta, tamaño y
+        fecha de modificación si el contenido es un archivo local).
+        """
+        if isinstance(content, (bytes, mmap.mmap)):
+            digest = hashlib.sha256(content).hexdigest()
+        else:
+            stat = os.stat(content)
+            digest = f"{os.path.abspath(content)}:{stat.st_size}:{int(stat.st_mtime)}"
+        return f"{folder_id or 'root'}/{filename}:{digest}"
+    
+    def _execute_resumable(self, request, session_key: str, size: int, filename: str) -> Dict[str, Any]:
+        """
+        Ejecuta una subida reanudable bloque a bloque con next_chunk
+        
+        La URI de la sesión se guarda en cuanto existe. Si ya había una sesión
+        guardada para el mismo contenido, se pregunta a Drive cuántos bytes
+        recibió y se continúa desde ahí; si caducó, se empieza de cero.
+        
+        Args:
+            request: Petición files().create con media reanudable
+            session_key: Clave de la subida (ver _upload_session_key)
+            size: Tamaño total en bytes
+            filename: Nombre del archivo (para los logs)
+            
+        Returns:
+            Respuesta de Drive con el ID del archivo
+        """
+        session_uri = self.upload_sessions.get(session_key)
+        if session_uri:
+            response = self._resume_upload_session(request, session_uri, size)
+            if response is not None:
+                self.upload_sessions.delete(session_key)
+                return response
+        
+        response = None
+        failures = 0
+        while response is None:
+            try:
+                status, response = request.next_chunk()
+            except HttpError as e:
+                code = getattr(e.resp, 'status', None)
+                # Un 5xx sí se reintenta: el siguiente next_chunk consulta antes a
+                # Drive lo recibido, así que un bloque ya aplicado no se duplica
+                if not is_retryable_error(e) or failures >= self.upload_max_retries:
+                    if code in (404, 410):
+                        # Sesión caducada o inexistente: no tiene sentido reanudarla
+                        self.upload_sessions.delete(session_key)
+                    raise
+                error = e
+            except (OSError, httplib2.HttpLib2Error) as e:
+                if failures >= self.upload_max_retries:
+                    raise
+                error = e
+            else:
+                failures = 0
+                if request.resumable_uri:
+                    self.upload_sessions.set(session_key, request.resumable_uri)
+                if status:
+                    logger.debug(f"⏫ {filename}: {status.resumable_progress / 1024 / 1024:.1f}"
+                                 f"/{size / 1024 / 1024:.1f} MB")
+                continue
+            
+            # Error transitorio: la siguiente llamada consulta el progreso y sigue
+            if request.resumable_uri:
+                self.upload_sessions.set(session_key, request.resumable_uri)
+            failures += 1
+            self.rate_limiter.wait_retry('drive', 'write', failures, error,
+                                         description=f"Subida de {filename} interrumpida")
+        
+        self.upload_sessions.delete(session_key)
+        return response
+    
+    def _resume_upload_session(self, request, session_uri: str, size: int) -> Optional[Dict[str, Any]]:
+        """
+        Retoma una sesión de subida guardada en una ejecución anterior
+        
+        Returns:
+            Respuesta de Drive si la subida ya estaba completa; None si hay que
+            seguir subiendo (request queda apuntando a la sesión y al offset
+            confirmado, o sin sesión si caducó)
+        """
+        # La consulta del progreso es una petición más de escritura en Drive
+        self.rate_limiter.acquire('drive', 'write')
+        try:
+            resp, content = request.http.request(
+                session_uri, 'PUT',
+                headers={'Content-Length': '0', 'Content-Range': f'bytes */{size}'}
+            )
+        except (OSError, httplib2.HttpLib2Error) as e:
+            logger.warning(f"⚠️ No se pudo consultar la subida pendiente, se reinicia: {e}")
+            return None
+        
+        if resp.status in (200, 201):
+            logger.info("♻️ Subida pendiente ya completada en una ejecución anterior")
+            return request.postproc(resp, content)
+        
+        if resp.status == 308:
+            # Range: bytes=0-N con lo último recibido (sin cabecera: nada recibido)
+            received = int(resp['range'].split('-')[1]) + 1 if 'range' in resp else 0
+            request.resumable_uri = session_uri
+            request.resumable_progress = received
+            logger.info(f"⏫ Subida reanudada desde {received / 1024 / 1024:.1f} "
+                        f"de {size / 1024 / 1024:.1f} MB")
+            return None
+        
+        logger.info(f"🔄 Sesión de subida caducada ({resp.status}), se empieza de nuevo")
+        return None
+    
     def get_or_create_spreadsheet(self, name: str, folder_id: Optional[str] = None) -> Optional[str]:
         """
         Obtiene o crea una hoja de cálculo dentro de la carpeta DOCUFIND
@@ -402,15 +812,17 @@ class GoogleDriveClient:
         try:
             # Si no se especifica folder_id, crear/obtener carpeta raíz DOCUFIND
             if not folder_id:
-                # Crear carpeta DOCUFIND si no existe
-                root_folder_name = self.config.root_folder or "DOCUFIND"
-                folder_id = self.create_folder(root_folder_name)
+                folder_id = self.get_root_folder_id()
                 
                 if not folder_id:
                     logger.error("❌ No se pudo crear carpeta raíz DOCUFIND")
                     return None
-                    
-                logger.info(f"📁 Usando carpeta raíz: {root_folder_name}")
+            
+            # ID ya resuelto en esta u otra ejecución
+            cache_key = f"spreadsheet:{folder_id}/{name}"
+            cached_id = self.id_cache.get(cache_key)
+            if cached_id:
+                return cached_id
             
             # Buscar si la hoja ya existe en la carpeta
             query = f"name='{name}' and mimeType='application/vnd.google-apps.spreadsheet'"
@@ -428,6 +840,7 @@ class GoogleDriveClient:
             if files:
                 spreadsheet_id = files[0]['id']
                 logger.info(f"📊 Hoja existente encontrada: {name}")
+                self.id_cache.set(cache_key, spreadsheet_id)
                 return spreadsheet_id
             
             # Crear nueva hoja
@@ -478,6 +891,7 @@ class GoogleDriveClient:
             self._add_spreadsheet_headers(spreadsheet_id)
             
             logger.info(f"✅ Hoja de cálculo creada: {name} (ID: {spreadsheet_id})")
+            self.id_cache.set(cache_key, spreadsheet_id)
             return spreadsheet_id
             
         except HttpError as e:
@@ -497,30 +911,29 @@ class GoogleDriveClient:
         Returns:
             True si se agregó exitosamente
         """
+        return self.append_rows_to_spreadsheet(spreadsheet_id, [row_data])
+    
+    def append_rows_to_spreadsheet(self, spreadsheet_id: str, rows: List[List[Any]]) -> bool:
+        """
+        Agrega varias filas a la hoja de cálculo en una sola llamada a la API
+        
+        Args:
+            spreadsheet_id: ID de la hoja
+            rows: Lista de filas
+            
+        Returns:
+            True si se agregaron exitosamente
+        """
+        if not rows:
+            return True
+        
         if not self.sheets_service:
             if not self.authenticate():
                 return False
         
         try:
             # IMPORTANTE: Limpiar datos para evitar caracteres especiales problemáticos
-            cleaned_data = []
-            for item in row_data:
-                if item is None:
-                    cleaned_data.append('')
-                elif isinstance(item, str):
-                    # Limpiar caracteres especiales
-                    clean_item = item.encode('utf-8', 'ignore').decode('utf-8')
-                    # Reemplazar saltos de línea
-                    clean_item = clean_item.replace('\\n', ' ').replace('\\r', ' ')
-                    # Limitar longitud
-                    if len(clean_item) > 500:
-                        clean_item = clean_item[:497] + '...'
-                    cleaned_data.append(clean_item)
-                else:
-                    cleaned_data.append(str(item))
-            
-            # Preparar body para la API
-            body = {'values': [cleaned_data]}
+            body = {'values': [self._clean_row(row) for row in rows]}
             
             # IMPORTANTE: Usar A:T para 20 columnas exactas
             result = self.sheets_service.spreadsheets().values().append(
@@ -531,16 +944,41 @@ class GoogleDriveClient:
                 body=body
             ).execute()
             
-            logger.info(f"✅ Fila agregada en posición {result.get('updates', {}).get('updatedRange', 'desconocida')}")
+            updated_range = result.get('updates', {}).get('updatedRange', 'desconocida')
+            if len(rows) == 1:
+                logger.info(f"✅ Fila agregada en posición {updated_range}")
+            else:
+                logger.info(f"✅ {len(rows)} filas agregadas en {updated_range}")
             return True
             
         except HttpError as e:
-            logger.error(f"❌ Error agregando fila: {e}")
+            logger.error(f"❌ Error agregando filas: {e}")
+            if self._is_not_found(e):
+                self.id_cache.invalidate(spreadsheet_id)
             return False
         except Exception as e:
             logger.error(f"❌ Error inesperado: {e}")
             return False
     
+    def _clean_row(self, row_data: List[Any]) -> List[str]:
+        """Limpia los valores de una fila antes de enviarla a Sheets"""
+        cleaned_data = []
+        for item in row_data:
+            if item is None:
+                cleaned_data.append('')
+            elif isinstance(item, str):
+                # Limpiar caracteres especiales
+                clean_item = item.encode('utf-8', 'ignore').decode('utf-8')
+                # Reemplazar saltos de línea
+                clean_item = clean_item.replace('\\n', ' ').replace('\\r', ' ')
+                # Limitar longitud
+                if len(clean_item) > 500:
+                    clean_item = clean_item[:497] + '...'
+                cleaned_data.append(clean_item)
+            else:
+                cleaned_data.append(str(item))
+        return cleaned_data
+    
     def list_files_in_folder(self, folder_id: str, mime_type: Optional[str] = None) -> List[Dict[str, str]]:
         """
         Lista archivos en una carpeta
@@ -617,6 +1055,7 @@ class GoogleDriveClient:
         
         try:
             self.drive_service.files().delete(fileId=file_id).execute()
+            self._invalidate_folder(file_id)
             logger.info(f"✅ Archivo/carpeta eliminado")
             return True
             
@@ -624,18 +1063,217 @@ class GoogleDriveClient:
             logger.error(f"❌ Error eliminando: {e}")
             return False
     
-    def _find_folder(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
-        """Busca una carpeta por nombre"""
-        try:
-            query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
+    def execute_batch(self, requests: List[Tuple[str, Any]]) -> Dict[str, Any]:
+        """
+        Ejecuta peticiones independientes de Drive agrupadas en lotes HTTP
+        
+        Cada lote lleva como máximo BATCH_LIMIT peticiones y viaja en una sola
+        llamada HTTP. Cada lote consume del limitador tantos tokens como
+        peticiones lleva, y las peticiones rechazadas por cuota (o las lecturas
+        con 5xx) se reenvían juntas en un nuevo lote tras el backoff.
+        
+        Args:
+            requests: Lista de (id de petición, petición sin ejecutar)
             
-            if parent_id:
-                query += f" and '{parent_id}' in parents"
+        Returns:
+            Diccionario id → respuesta, o la excepción si esa petición falló
+        """
+        if not requests:
+            return {}
+        
+        if not self.drive_service:
+            if not self.authenticate():
+                return {}
+        
+        responses: Dict[str, Any] = {}
+        
+        def callback(request_id, response, exception):
+            responses[request_id] = exception if exception is not None else response
+        
+        pending = list(requests)
+        attempt = 0
+        while True:
+            # Lotes que fallaron enteros (call ya agotó sus reintentos)
+            failed_batches = set()
+            
+            for start in range(0, len(pending), self.BATCH_LIMIT):
+                chunk = pending[start:start + self.BATCH_LIMIT]
+                batch = self.drive_service.new_batch_http_request(callback=callback)
+                for request_id, request in chunk:
+                    batch.add(request, request_id=request_id)
+                try:
+                    self.rate_limiter.call('drive', self._batch_kind(chunk), batch.execute,
+                                           tokens=len(chunk))
+                except HttpError as e:
+                    logger.error(f"❌ Error ejecutando lote de peticiones: {e}")
+                    for request_id, _ in chunk:
+                        responses[request_id] = e
+                        failed_batches.add(request_id)
+            
+            # Peticiones del lote rechazadas por cuota (o lecturas con 5xx): se reintentan juntas
+            retry = [(request_id, request) for request_id, request in pending
+                     if request_id not in failed_batches
+                     and isinstance(responses.get(request_id), HttpError)
+                     and is_retryable_error(responses[request_id],
+                                            write=self._batch_kind([(request_id, request)]) == 'write')]
+            if not retry or attempt >= self.rate_limiter.max_retries:
+                break
+            
+            attempt += 1
+            self.rate_limiter.wait_retry('drive', self._batch_kind(retry), attempt,
+                                         responses[retry[0][0]],
+                                         description=f"Lote con {len(retry)} peticiones rechazadas")
+            pending = retry
+        
+        return responses
+    
+    @staticmethod
+    def _batch_kind(requests: List[Tuple[str, Any]]) -> str:
+        """Tipo de cuota de un lote: 'write' si alguna petición no es GET"""
+        if all(getattr(request, 'method', 'GET').upper() == 'GET' for _, request in requests):
+            return 'read'
+        return 'write'
+    
+    def create_folder_tree(self, paths: List[str]) -> Dict[str, str]:
+        """
+        Crea de una vez un árbol de carpetas usando peticiones por lotes
+        
+        Las carpetas se resuelven nivel a nivel (un hijo necesita el ID de su
+        padre): por cada nivel, un lote de búsquedas y otro de creaciones para
+        las que no existen. Las carpetas ya en caché no generan peticiones.
+        
+        Args:
+            paths: Rutas completas de carpetas separadas por /
             
-            query += " and trashed=false"  # No buscar en papelera
+        Returns:
+            Diccionario ruta → ID de las rutas resueltas
+        """
+        # Autenticar antes de construir las peticiones de los lotes
+        if not self.drive_service:
+            if not self.authenticate():
+                return {}
+        
+        split_paths = [[part for part in path.split('/') if part] for path in paths]
+        depth = max((len(parts) for parts in split_paths), default=0)
+        resolved: Dict[str, str] = {}
+        created_ids = set()
+        
+        with self._folder_lock:
+            for level in range(1, depth + 1):
+                # Carpetas de este nivel cuyo padre ya está resuelto
+                pending = []
+                missing = []
+                seen = set()
+                for parts in split_paths:
+                    if len(parts) < level:
+                        continue
+                    prefix = '/'.join(parts[:level])
+                    if prefix in seen:
+                        continue
+                    seen.add(prefix)
+                    
+                    parent_id = resolved.get('/'.join(parts[:level - 1])) if level > 1 else None
+                    if level > 1 and not parent_id:
+                        continue
+                    
+                    name = parts[level - 1]
+                    cached_id = self.id_cache.get(f"folder:{parent_id or 'root'}/{name}")
+                    if cached_id:
+                        resolved[prefix] = cached_id
+                    elif parent_id in created_ids:
+                        # Una carpeta recién creada no puede tener hijas
+                        missing.append((prefix, parent_id, name))
+                    else:
+                        pending.append((prefix, parent_id, name))
+                
+                # Lote 1: buscar las que ya existen en Drive
+                lookups = self.execute_batch([
+                    (str(i), self.drive_service.files().list(
+                        q=self._folder_query(name, parent_id),
+                        fields="files(id, name)"
+                    ))
+                    for i, (_, parent_id, name) in enumerate(pending)
+                ])
+                
+                for i, (prefix, parent_id, name) in enumerate(pending):
+                    response = lookups.get(str(i))
+                    if isinstance(response, Exception) or response is None:
+                        logger.warning(f"⚠️ No se pudo buscar la carpeta {prefix}: {response}")
+                        continue
+                    files = response.get('files', [])
+                    if files:
+                        resolved[prefix] = files[0]['id']
+                        self.id_cache.set(f"folder:{parent_id or 'root'}/{name}", files[0]['id'])
+                    else:
+                        missing.append((prefix, parent_id, name))
+                
+                # Lote 2: crear las que faltan
+                creations = self.execute_batch([
+                    (str(i), self.drive_service.files().create(
+                        body={
+                            'name': name,
+                            'mimeType': 'application/vnd.google-apps.folder',
+                            **({'parents': [parent_id]} if parent_id else {})
+                        },
+                        fields='id'
+                    ))
+                    for i, (_, parent_id, name) in enumerate(missing)
+                ])
+                
+                for i, (prefix, parent_id, name) in enumerate(missing):
+                    response = creations.get(str(i))
+                    if isinstance(response, Exception) or response is None:
+                        logger.warning(f"⚠️ No se pudo crear la carpeta {prefix}: {response}")
+                        continue
+                    resolved[prefix] = response['id']
+                    created_ids.add(response['id'])
+                    self.id_cache.set(f"folder:{parent_id or 'root'}/{name}", response['id'])
+                    logger.info(f"✅ Carpeta creada: {prefix} (ID: {response['id']})")
+        
+        result = {}
+        for parts in split_paths:
+            full_path = '/'.join(parts)
+            if full_path in resolved:
+                self.folder_cache[full_path] = resolved[full_path]
+                result[full_path] = resolved[full_path]
+        
+        return result
+    
+    def delete_files(self, file_ids: List[str]) -> int:
+        """
+        Elimina varios archivos o carpetas usando peticiones por lotes
+        
+        Args:
+            file_ids: IDs de los archivos o carpetas
             
+        Returns:
+            Número de elementos eliminados
+        """
+        if not self.drive_service:
+            if not self.authenticate():
+                return 0
+        
+        responses = self.execute_batch([
+            (file_id, self.drive_service.files().delete(fileId=file_id))
+            for file_id in dict.fromkeys(file_ids)
+        ])
+        
+        deleted = 0
+        for file_id, response in responses.items():
+            if isinstance(response, Exception):
+                logger.error(f"❌ Error eliminando {file_id}: {response}")
+                continue
+            deleted += 1
+            self._invalidate_folder(file_id)
+        
+        logger.info(f"🗑️ {deleted}/{len(responses)} archivos/carpetas eliminados")
+        return deleted
+    
+    def _find_folder(self, folder_name: str, parent_id: Optional[str] = None) -> Optional[str]:
+        """Busca una carpeta por nombre"""
+        try:
             results = self.drive_service.files().list(
-                q=query,
+                q=self._folder_query(folder_name, parent_id),
                 fields="files(id, name)"
             ).execute()
             
@@ -650,6 +1288,30 @@ class GoogleDriveClient:
             logger.error(f"❌ Error buscando carpeta: {e}")
             return None
     
+    def _folder_query(self, folder_name: str, parent_id: Optional[str] = None) -> str:
+        """Construye la consulta de búsqueda de una carpeta"""
+        query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder'"
+        
+        if parent_id:
+            query += f" and '{parent_id}' in parents"
+        
+        query += " and trashed=false"  # No buscar en papelera
+        return query
+    
+    def _invalidate_folder(self, folder_id: str):
+        """Olvida un ID de carpeta que Drive ya no reconoce (404) o que se eliminó, con sus subcarpetas"""
+        removed = self.id_cache.invalidate_tree(folder_id)
+        if removed or folder_id in self.folder_cache.values():
+            # Las rutas en memoria pueden pasar por esa carpeta: se reconstruyen
+            self.folder_cache.clear()
+            self._invalidations += 1
+    
+    @staticmethod
+    def _is_not_found(error: HttpError) -> bool:
+        """Indica si un error de la API es un 404 (ID inexistente o sin acceso)"""
+        resp = getattr(error, 'resp', None)
+        return getattr(resp, 'status', None) == 404
+    
     def _get_mime_type(self, filename: str) -> str:
         """Determina el tipo MIME basado en la extensión"""
         extension = os.path.splitext(filename)[1].lower()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+HTML Text - DOCUFIND
+Conversión de HTML de correos a texto plano en una sola pasada
+"""
+
+import re
+import logging
+from html import unescape
+
+logger = logging.getLogger(__name__)
+
+# Un token por coincidencia: comentario, bloque script/style completo o etiqueta.
+# Los bloques se descartan enteros (con su CSS/JS) en la misma pasada.
+_TOKEN_RE = re.compile(
+    r'<!--.*?(?:-->|$)'
+    r'|<(script|style)\b[^>]*>.*?(?:</\1\s*>|$)'
+    r'|<(/?)([a-zA-Z][a-zA-Z0-9:-]*)[^>]*>',
+    re.DOTALL | re.IGNORECASE
+)
+
+# Etiquetas que separan líneas y celdas
+BLOCK_TAGS = frozenset({
+    'br', 'p', 'div', 'tr', 'li', 'ul', 'ol', 'table', 'tbody', 'thead',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'hr', 'section',
+    'article', 'header', 'footer', 'title'
+})
+CELL_TAGS = frozenset({'td', 'th'})
+
+# Texto que sustituye a cada etiqueta (las no listadas desaparecen)
+_TAG_TEXT = dict.fromkeys(BLOCK_TAGS, '\n')
+_TAG_TEXT.update(dict.fromkeys(CELL_TAGS, ' '))
+
+# Solo tabuladores sueltos o rachas de espacios: los espacios simples no se tocan
+_SPACES_RE = re.compile(r'[ \t\r\f\v\xa0]{2,}|[\t\r\f\v\xa0]')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n\s*(?:\n\s*)+')
+
+def _replace_token(match: re.Match) -> str:
+    """Texto que sustituye a un token HTML"""
+    tag = match.group(3)
+    if tag is None:
+        # Comentario o bloque script/style
+        return ''
+
+    return _TAG_TEXT.get(tag.lower(), '')
+
+def html_to_text(html: str) -> str:
+    """
+    Convierte HTML a texto legible
+
+    Elimina comentarios, scripts y estilos, convierte las etiquetas de bloque
+    en saltos de línea y decodifica las entidades, todo con una expresión
+    precompilada y un único recorrido del documento.
+
+    Args:
+        html: Documento o fragmento HTML
+
+    Returns:
+        Texto plano con espacios normalizados
+    """
+    if not html:
+        return ''
+
+    text = _TOKEN_RE.sub(_replace_token, html)
+    if '&' in text:
+        text = unescape(text)
+
+    text = _SPACES_RE.sub(' ', text)
+    text = _BLANK_LINES_RE.sub('\n\n', text)
+    return '\n'.join(line.strip() for line in text.split('\n')).strip()
+
+def looks_like_html(text: str) -> bool:
+    """Indica si un texto contiene marcado HTML"""
+    return '<' in text and '>' in text
@@ -6,16 +6,94 @@ Extrae datos inteligentes de facturas de emails y adjuntos
 """
 
 import re
+import io
+import mmap
 import base64
 import json
+import time
+import hashlib
 import logging
 from datetime import datetime
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterable, Iterator, Set
+from dataclasses import dataclass, fields
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# PyPDF2 es opcional: sin él los PDFs se omiten en lugar de leerse como texto
+try:
+    from PyPDF2 import PdfReader
+except ImportError:
+    PdfReader = None
+
+# pandas es opcional: solo lo usa invoices_to_dataframe (backfills grandes)
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    from src.xml_invoice_extractor import XMLInvoiceExtractor, looks_like_invoice_xml
+    from src.keyword_matcher import KeywordMatcher
+except ImportError:
+    from xml_invoice_extractor import XMLInvoiceExtractor, looks_like_invoice_xml
+    from keyword_matcher import KeywordMatcher
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Línea del total final de una factura (frase específica seguida de un importe):
+# al encontrarla se deja de leer el PDF. Un "Total" suelto no basta, suele ser
+# la cabecera de una columna o un subtotal de la primera página.
+_TOTALS_RE = re.compile(
+    r'^[^\S\n]*(?:total\s+a\s+pagar|importe\s+total|valor\s+total|total\s+factura|'
+    r'grand\s+total|amount\s+due|total\s+due|balance\s+due)\b[^\d\n]{0,20}\d[\d.,]*',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Versión de la lógica de extracción: subirla cuando cambie el resultado
+# para el mismo contenido (invalida la caché de extracciones)
+EXTRACTOR_VERSION = 5
+
+# Campos que, si faltan en las ventanas, obligan a escanear el texto completo
+WINDOW_REQUIRED_FIELDS = ('amount', 'invoice_number')
+
+# Palabras clave de método de pago (en orden de prioridad)
+PAYMENT_METHOD_KEYWORDS = {
+    'credit_card': ['tarjeta', 'card', 'visa', 'mastercard', 'amex'],
+    'transfer': ['transferencia', 'transfer', 'wire', 'banco'],
+    'cash': ['efectivo', 'cash', 'contado'],
+    'paypal': ['paypal'],
+    'check': ['cheque', 'check']
+}
+
+# Palabras para detectar el idioma
+SPANISH_WORDS = ['factura', 'importe', 'fecha', 'proveedor', 'concepto', 'pagar']
+ENGLISH_WORDS = ['invoice', 'amount', 'date', 'vendor', 'concept', 'payment']
+
+# Detección de moneda: símbolos, códigos y nombres (en orden de prioridad)
+CURRENCY_SYMBOL_CHECKS = [
+    ('$', 'USD'),
+    ('\u20AC', 'EUR'),  # Euro
+    ('\u00A3', 'GBP'),  # Libra
+    ('\u00A5', 'JPY'),  # Yen
+]
+CURRENCY_CODES = ['USD', 'EUR', 'GBP', 'COP', 'MXN', 'ARS', 'PEN', 'CLP']
+# Códigos como palabra completa ("COP", no "copia")
+CURRENCY_CODE_RE = re.compile(r'\b(' + '|'.join(CURRENCY_CODES) + r')\b', re.IGNORECASE)
+PESO_WORDS = ['peso', 'pesos']
+PESO_COUNTRY_HINTS = [
+    ('COP', ['colombia', 'cop']),
+    ('MXN', ['mexico', 'mx']),
+    ('ARS', ['argentina', 'arg'])
+]
+CURRENCY_NAMES = [
+    ('USD', ['dollar', 'dollars', 'd\u00f3lar', 'd\u00f3lares']),
+    ('EUR', ['euro', 'euros'])
+]
+
+@dataclass(slots=True)
 class InvoiceData:
     """Datos extraídos de una factura"""
     amount: Optional[float] = None
@@ -25,11 +103,79 @@ class InvoiceData:
     invoice_number: Optional[str] = None
     invoice_date: Optional[str] = None
     due_date: Optional[str] = None
-    tax_amount: Optional[float] = None
+    subtotal: Optional[float] = None
+    tax_amount: Optional[Union[float, str]] = None
     tax_id: Optional[str] = None
+    payment_method: Optional[str] = None
+    language: Optional[str] = None
+    category: Optional[str] = None
     confidence: float = 0.0
     extraction_method: str = ""
-    raw_matches: Dict[str, Any] = field(default_factory=dict)
+    match_windows: Optional[Dict[str, str]] = None
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], extraction_method: str = "") -> 'InvoiceData':
+        """
+        Crea los datos a partir de un diccionario de extracción
+        
+        Args:
+            data: Campos extraídos ('tax' se acepta como tax_amount)
+            extraction_method: Método usado si el diccionario no lo indica
+        """
+        values = {key: value for key, value in data.items() if key in _INVOICE_FIELDS}
+        if 'tax' in data and 'tax_amount' not in values:
+            values['tax_amount'] = data['tax']
+        if extraction_method:
+            values.setdefault('extraction_method', extraction_method)
+        return cls(**values)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Campos con valor (caché JSON, propiedades de Drive, depuración)"""
+        return {name: getattr(self, name) for name in _INVOICE_FIELDS
+                if getattr(self, name) is not None}
+    
+    def to_row(self, email_columns: Dict[str, Any], file_id: Optional[str] = None) -> List[str]:
+        """
+        Genera la fila de 20 columnas de la hoja de cálculo
+        
+        Args:
+            email_columns: Columnas que salen del correo: processed_at, email_date,
+                sender, subject, attachment_names, invoice_date, vendor, concept
+            file_id: ID del archivo en Drive (para el enlace)
+            
+        Returns:
+            Lista de 20 valores en el orden de los encabezados
+        """
+        attachment_names = email_columns.get('attachment_names') or []
+        
+        return [
+            email_columns.get('processed_at', ''),                      # 1. Fecha Procesamiento
+            email_columns.get('email_date', ''),                        # 2. Fecha Email
+            email_columns.get('sender', ''),                            # 3. Remitente
+            email_columns.get('subject', ''),                           # 4. Asunto
+            'Sí' if attachment_names else 'No',                         # 5. Tiene Adjuntos
+            str(len(attachment_names)),                                 # 6. Cantidad Adjuntos
+            ', '.join(attachment_names)[:1000],                         # 7. Nombres Adjuntos
+            email_columns.get('invoice_date', ''),                      # 8. Fecha Factura
+            email_columns.get('vendor', ''),                            # 9. Proveedor
+            _cell(self.invoice_number)[:50],                            # 10. Número Factura
+            email_columns.get('concept', ''),                           # 11. Concepto
+            _cell(self.subtotal),                                       # 12. Subtotal
+            _cell(self.tax_amount),                                     # 13. Impuestos
+            _cell(self.amount),                                         # 14. Total
+            self.currency or 'N/A',                                     # 15. Moneda
+            self.payment_method or '',                                  # 16. Método Pago
+            self.category or 'Email',                                   # 17. Categoría
+            'Procesado',                                                # 18. Estado
+            f"{self.confidence:.1%}" if self.confidence else 'N/A',    # 19. Confianza
+            f"https://drive.google.com/file/d/{file_id}/view" if file_id else ''  # 20. Link Archivo
+        ]
+
+_INVOICE_FIELDS = tuple(item.name for item in fields(InvoiceData))
+
+def _cell(value: Any) -> str:
+    """Valor de celda: vacío para datos ausentes"""
+    return '' if value is None else str(value)
 
 class InvoiceExtractor:
     """Extractor inteligente de datos de facturas"""
@@ -43,12 +189,34 @@ class InvoiceExtractor:
         """
         self.config = config or {}
         
+        # Límites de lectura de PDFs
+        self.pdf_max_pages = self.config.get('pdf_max_pages', 5)
+        self.pdf_max_chars = self.config.get('pdf_max_chars', 100000)
+        
+        # Ventanas de escaneo en textos largos ('head_tail' o 'full')
+        self.window_mode = self.config.get('window_mode', 'head_tail')
+        self.window_head_chars = self.config.get('window_head_chars', 8192)
+        self.window_tail_chars = self.config.get('window_tail_chars', 4096)
+        
         # Patrones de regex para diferentes tipos de datos
         self.patterns = self._initialize_patterns()
         
+        # Patrones compilados una sola vez, con sus palabras clave obligatorias
+        self.compiled_patterns = self._compile_patterns(self.patterns)
+        self.pattern_keywords = {
+            data_type: [required_literals(pattern) for pattern in patterns]
+            for data_type, patterns in self.compiled_patterns.items()
+        }
+        
         # Palabras clave para categorización
         self.category_keywords = self._initialize_categories()
         
+        # Un solo autómata para categoría, método de pago, idioma y moneda
+        self.keyword_matcher = self._build_keyword_matcher()
+        
+        # Facturas electrónicas XML (CFDI / UBL)
+        self.xml_extractor = XMLInvoiceExtractor()
+        
         # Configuración de monedas - usando códigos ASCII y Unicode escapados
         self.currency_symbols = {
             '$': 'USD',
@@ -62,6 +230,10 @@ class InvoiceExtractor:
             'CLP': 'CLP'
         }
         
+        # Huellas por grupo (texto, cada juego de patrones, contexto, categorías):
+        # la caché de extracciones solo rehace la parte cuya huella cambió
+        self.fingerprints = self._compute_fingerprints()
+        
         logger.info("🤖 InvoiceExtractor inicializado")
     
     def _initialize_patterns(self) -> Dict[str, List[str]]:
@@ -157,6 +329,18 @@ class InvoiceExtractor:
             ]
         }
     
+    def _compile_patterns(self, patterns: Dict[str, List[str]]) -> Dict[str, List[re.Pattern]]:
+        """Compila los patrones de cada campo, descartando los inválidos"""
+        compiled = {}
+        for data_type, field_patterns in patterns.items():
+            compiled[data_type] = []
+            for pattern in field_patterns:
+                try:
+                    compiled[data_type].append(re.compile(pattern, re.IGNORECASE | re.MULTILINE))
+                except re.error as e:
+                    logger.debug(f"Error en patrón regex: {e}")
+        return compiled
+    
     def _initialize_categories(self) -> Dict[str, List[str]]:
         """Inicializa palabras clave para categorización"""
         return {
@@ -174,53 +358,298 @@ class InvoiceExtractor:
             'miscellaneous': ['otros', 'other', 'misc', 'general']
         }
     
-    def extract(self, content: Any) -> Optional[Dict[str, Any]]:
+    def _build_keyword_matcher(self) -> KeywordMatcher:
+        """Reúne las palabras clave de todos los detectores en un autómata"""
+        keywords = [keyword for words in self.category_keywords.values() for keyword in words]
+        keywords += [keyword for words in PAYMENT_METHOD_KEYWORDS.values() for keyword in words]
+        keywords += SPANISH_WORDS + ENGLISH_WORDS
+        keywords += [symbol for symbol, _ in CURRENCY_SYMBOL_CHECKS]
+        keywords += [code.lower() for code in CURRENCY_CODES]
+        keywords += PESO_WORDS
+        keywords += [hint for _, hints in PESO_COUNTRY_HINTS for hint in hints]
+        keywords += [name for _, names in CURRENCY_NAMES for name in names]
+        return KeywordMatcher(keywords)
+    
+    def _keyword_hits(self, text: str) -> Dict[str, List[int]]:
+        """Palabras clave presentes en el texto (en minúsculas), con posiciones"""
+        return self.keyword_matcher.find_all(text.lower())
+    
+    def _compute_fingerprints(self) -> Dict[str, str]:
+        """
+        Calcula la huella de cada grupo que determina el resultado de extract
+        
+        Grupos:
+            text: límites del PDF y ventanas (cambian el texto analizado)
+            patterns.<campo>: patrones de cada campo
+            context: palabras de método de pago, idioma y moneda
+            category: palabras clave de categorías
+        
+        Returns:
+            Grupo → hash hexadecimal (todos cambian con EXTRACTOR_VERSION)
+        """
+        groups = {
+            'text': {
+                'pdf_max_pages': self.pdf_max_pages,
+                'pdf_max_chars': self.pdf_max_chars,
+                'window_mode': self.window_mode,
+                'window_head_chars': self.window_head_chars,
+                'window_tail_chars': self.window_tail_chars
+            },
+            'context': {
+                'payment': PAYMENT_METHOD_KEYWORDS,
+                'language': [SPANISH_WORDS, ENGLISH_WORDS],
+                'currency': [CURRENCY_SYMBOL_CHECKS, CURRENCY_CODES, PESO_WORDS,
+                             PESO_COUNTRY_HINTS, CURRENCY_NAMES]
+            },
+            'category': self.category_keywords
+        }
+        for data_type, patterns in self.patterns.items():
+            groups[f'patterns.{data_type}'] = patterns
+        
+        fingerprints = {}
+        for group, definition in groups.items():
+            serialized = json.dumps([EXTRACTOR_VERSION, definition], sort_keys=True, ensure_ascii=False)
+            fingerprints[group] = hashlib.sha256(serialized.encode('utf-8')).hexdigest()[:16]
+        return fingerprints
+    
+    def stale_groups(self, fingerprints: Dict[str, str]) -> Set[str]:
+        """
+        Grupos cuya huella no coincide con la actual
+        
+        Args:
+            fingerprints: Huellas guardadas con una extracción
+            
+        Returns:
+            Grupos cambiados, añadidos o eliminados (vacío si todo coincide)
+        """
+        groups = set(self.fingerprints) | set(fingerprints)
+        return {group for group in groups if self.fingerprints.get(group) != fingerprints.get(group)}
+    
+    def extract(self, content: Any) -> Optional[InvoiceData]:
         """
         Extrae datos de factura del contenido
         
         Args:
-            content: Contenido a procesar (texto, bytes, o dict)
+            content: Contenido a procesar (texto, bytes, mmap o dict)
             
         Returns:
-            Diccionario con datos extraídos o None
+            InvoiceData con los datos extraídos o None
+        """
+        return self.extract_with_state(content)[0]
+    
+    def extract_with_state(self, content: Any) -> Tuple[Optional[InvoiceData], Optional[Dict[str, Any]]]:
+        """
+        Igual que extract, devolviendo también el estado intermedio
+        
+        El estado (ventanas de texto y campos en bruto, o los datos del XML)
+        se guarda en la caché de extracciones para que refresh rehaga solo los
+        grupos cuya huella cambie, sin volver a leer el documento.
+        
+        Returns:
+            Tupla (InvoiceData o None, estado serializable en JSON o None)
         """
         try:
-            # Convertir contenido a texto si es necesario
-            text = self._content_to_text(content)
-            
-            if not text:
-                logger.warning("⚠️ No se pudo obtener texto del contenido")
-                return None
+            state = self._extract_state(content)
+            invoice = self._finish(state) if state is not None else None
+        except Exception as e:
+            logger.error(f"❌ Error extrayendo datos: {e}")
+            return None, None
+        
+        if invoice is None:
+            logger.warning("⚠️ No se pudo obtener texto del contenido")
+        else:
+            logger.info(f"✅ Datos extraídos con {invoice.confidence:.0%} de confianza "
+                        f"({invoice.extraction_method})")
+        return invoice, state
+    
+    def refresh(self, state: Dict[str, Any], stale: Set[str]) -> Optional[InvoiceData]:
+        """
+        Rehace una extracción guardada tras cambiar algunos grupos
+        
+        Solo se vuelven a ejecutar los patrones de los campos cambiados, sobre
+        las ventanas guardadas; el análisis de contexto, la confianza y la
+        categoría se recalculan siempre (son baratos). El estado se actualiza.
+        
+        Args:
+            state: Estado devuelto por extract_with_state
+            stale: Grupos cambiados (ver stale_groups)
             
-            # Extraer datos usando patrones
-            extracted_data = self._extract_with_patterns(text)
+        Returns:
+            InvoiceData actualizado, o None si hace falta extraer el documento
+            entero (cambió el texto o un campo obligatorio requiere el texto completo)
+        """
+        if 'text' in stale:
+            return None
+        
+        if 'windows' in state:
+            windows = state['windows']
+            fields = state['fields']
+            match_windows = state['match_windows']
             
-            # Mejorar datos con análisis contextual
-            enhanced_data = self._enhance_with_context(extracted_data, text)
+            stale_types = [group.split('.', 1)[1] for group in stale if group.startswith('patterns.')]
+            for data_type in stale_types:
+                fields.pop(data_type, None)
+                match_windows.pop(data_type, None)
             
-            # Calcular confianza
-            enhanced_data['confidence'] = self._calculate_confidence(enhanced_data)
+            rerun = [data_type for data_type in stale_types if data_type in self.compiled_patterns]
+            if rerun:
+                new_fields, new_windows = self._extract_with_patterns(windows, rerun)
+                fields.update(new_fields)
+                match_windows.update(new_windows)
             
-            # Categorizar
-            enhanced_data['category'] = self._categorize_invoice(enhanced_data, text)
+            if 'full' not in windows:
+                # Un campo obligatorio ausente ya se buscó en el texto completo; ese
+                # resultado sigue valiendo salvo que cambiaran sus propios patrones
+                full_scan = set(state.get('full_scan', ()))
+                for field in WINDOW_REQUIRED_FIELDS:
+                    if field not in fields and (field in stale_types or field not in full_scan):
+                        # Sin el texto completo no se puede repetir el escaneo de respaldo
+                        return None
+        
+        try:
+            return self._finish(state)
+        except Exception as e:
+            logger.debug(f"No se pudo actualizar la extracción guardada: {e}")
+            return None
+    
+    def extract_many(self, contents: Iterable[Any], batch_size: int = 100) -> Iterator[Optional[InvoiceData]]:
+        """
+        Extrae datos de muchos documentos, como generador
+        
+        Consume la entrada en streaming con el mismo estado compilado (patrones,
+        autómata de palabras clave) y, en lugar de una línea de log por
+        documento, registra un resumen cada batch_size documentos.
+        
+        Args:
+            contents: Contenidos a procesar (cualquier iterable)
+            batch_size: Documentos por resumen de log
             
-            logger.info(f"✅ Datos extraídos con {enhanced_data['confidence']:.0%} de confianza")
+        Yields:
+            InvoiceData o None por cada contenido, en el mismo orden
+        """
+        batch_size = max(1, int(batch_size))
+        empty_batch = {'documentos': 0, 'facturas': 0, 'sin_texto': 0, 'errores': 0, 'confianza': 0.0}
+        batch = dict(empty_batch)
+        batch_number = 0
+        batch_start = time.perf_counter()
+        
+        for content in contents:
+            try:
+                state = self._extract_state(content)
+                invoice = self._finish(state) if state is not None else None
+            except Exception as e:
+                logger.debug(f"Error extrayendo documento del lote {batch_number + 1}: {e}")
+                batch['errores'] += 1
+                invoice = None
+            else:
+                if invoice is None:
+                    batch['sin_texto'] += 1
+                else:
+                    batch['facturas'] += 1
+                    batch['confianza'] += invoice.confidence
             
-            return enhanced_data
+            batch['documentos'] += 1
+            yield invoice
             
-        except Exception as e:
-            logger.error(f"❌ Error extrayendo datos: {e}")
+            if batch['documentos'] >= batch_size:
+                batch_number += 1
+                self._log_batch(batch_number, batch, time.perf_counter() - batch_start)
+                batch = dict(empty_batch)
+                batch_start = time.perf_counter()
+        
+        if batch['documentos']:
+            self._log_batch(batch_number + 1, batch, time.perf_counter() - batch_start)
+    
+    def _log_batch(self, batch_number: int, batch: Dict[str, Any], elapsed: float):
+        """Registra el resumen de un lote de extract_many"""
+        average = batch['confianza'] / batch['facturas'] if batch['facturas'] else 0.0
+        logger.info(
+            f"📦 Lote {batch_number}: {batch['documentos']} documentos, {batch['facturas']} facturas "
+            f"(confianza media {average:.0%}), {batch['sin_texto']} sin texto, "
+            f"{batch['errores']} errores en {elapsed:.2f}s"
+        )
+    
+    def _extract_state(self, content: Any) -> Optional[Dict[str, Any]]:
+        """
+        Parte costosa de la extracción: lectura del documento y patrones
+        
+        Returns:
+            {'xml': datos del esquema} o {'windows', 'fields', 'match_windows',
+            'full_scan'} (campos buscados también en el texto completo), o None
+            si el contenido no tiene texto
+        """
+        # Facturas electrónicas: datos exactos del esquema, sin regex
+        if isinstance(content, (bytes, str, mmap.mmap)) and looks_like_invoice_xml(content):
+            xml_data = self.xml_extractor.extract(content)
+            if xml_data:
+                return {'xml': xml_data}
+        
+        # Convertir contenido a texto si es necesario
+        text = self._content_to_text(content)
+        
+        if not text:
             return None
+        
+        # Extraer datos usando patrones, primero en cabecera y cola
+        windows = self._scan_windows(text)
+        extracted_data, match_windows = self._extract_with_patterns(windows)
+        
+        missing = [field for field in WINDOW_REQUIRED_FIELDS if field not in extracted_data]
+        full_scan = []
+        if missing and 'full' not in windows:
+            logger.debug(f"Campos fuera de las ventanas ({', '.join(missing)}), escaneando texto completo")
+            full_data, full_windows = self._extract_with_patterns({'full': text}, missing)
+            extracted_data.update(full_data)
+            match_windows.update(full_windows)
+            full_scan = missing
+        
+        return {'windows': windows, 'fields': extracted_data, 'match_windows': match_windows,
+                'full_scan': full_scan}
+    
+    def _finish(self, state: Dict[str, Any]) -> InvoiceData:
+        """
+        Parte barata de la extracción: contexto, confianza y categoría
+        
+        Args:
+            state: Estado de _extract_state (no se modifica)
+        """
+        if 'xml' in state:
+            xml_data = dict(state['xml'])
+            xml_data['category'] = self._categorize_invoice(xml_data, xml_data.get('concept', ''))
+            return InvoiceData.from_dict(xml_data)
+        
+        # El análisis contextual usa el mismo texto acotado
+        scan_text = '\n'.join(state['windows'].values())
+        
+        # Palabras clave de todos los detectores, en una sola pasada
+        hits = self._keyword_hits(scan_text)
+        enhanced_data = self._enhance_with_context(state['fields'], scan_text, hits)
+        enhanced_data['match_windows'] = dict(state['match_windows'])
+        
+        # Calcular confianza
+        enhanced_data['confidence'] = self._calculate_confidence(enhanced_data)
+        
+        # Categorizar
+        enhanced_data['category'] = self._categorize_invoice(enhanced_data, scan_text, hits)
+        
+        return InvoiceData.from_dict(enhanced_data, extraction_method='patterns')
     
     def _content_to_text(self, content: Any) -> str:
         """Convierte diferentes tipos de contenido a texto"""
         if isinstance(content, str):
             return content
-        elif isinstance(content, bytes):
+        elif isinstance(content, (bytes, mmap.mmap)):
+            head = content[:1024]
+            if b'%PDF-' in head:
+                return self.extract_pdf_text(content)
+            if b'\x00' in head:
+                # Binario sin capa de texto (imágenes, xlsx, etc.): no escanear
+                logger.debug("Contenido binario no soportado, se omite")
+                return ''
             try:
-                return content.decode('utf-8', errors='ignore')
+                return str(content, 'utf-8', errors='ignore')
             except:
-                return content.decode('latin-1', errors='ignore')
+                return str(content, 'latin-1', errors='ignore')
         elif isinstance(content, dict):
             # Si es un dict, buscar campos relevantes
             text_parts = []
@@ -231,25 +660,138 @@ class InvoiceExtractor:
         else:
             return str(content)
     
-    def _extract_with_patterns(self, text: str) -> Dict[str, Any]:
-        """Extrae datos usando patrones regex"""
+    def extract_pdf_text(self, content: bytes) -> str:
+        """
+        Extrae el texto de un PDF página a página
+        
+        Se detiene al encontrar el área de totales, al agotar el presupuesto
+        de páginas (pdf_max_pages) o al alcanzar pdf_max_chars caracteres.
+        
+        Args:
+            content: Bytes del PDF (o mmap de un adjunto en disco)
+            
+        Returns:
+            Texto extraído (vacío si no se pudo leer)
+        """
+        if PdfReader is None:
+            logger.warning("⚠️ PyPDF2 no instalado: no se puede leer el PDF (pip install PyPDF2)")
+            return ''
+        
+        try:
+            # Un mmap ya es un flujo con seek/read: se lee sin copiarlo
+            if isinstance(content, mmap.mmap):
+                content.seek(0)
+                stream = content
+            else:
+                stream = io.BytesIO(content)
+            
+            reader = PdfReader(stream)
+            if reader.is_encrypted:
+                reader.decrypt('')
+            
+            pages_text = []
+            total_chars = 0
+            pages_read = 0
+            
+            for page in reader.pages:
+                if pages_read >= self.pdf_max_pages:
+                    break
+                pages_read += 1
+                
+                page_text = page.extract_text() or ''
+                pages_text.append(page_text)
+                total_chars += len(page_text)
+                
+                if total_chars >= self.pdf_max_chars or _TOTALS_RE.search(page_text):
+                    break
+            
+            text = '\n'.join(pages_text)[:self.pdf_max_chars]
+            logger.debug(f"PDF: {pages_read}/{len(reader.pages)} páginas leídas, {len(text)} caracteres")
+            return text
+            
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo leer el PDF: {e}")
+            return ''
+    
+    def _scan_windows(self, text: str) -> Dict[str, str]:
+        """
+        Divide un texto largo en ventanas de cabecera y cola
+        
+        Los números de factura suelen estar al principio y los totales al final;
+        el historial citado de un correo o las páginas de un extracto quedan en
+        medio. Los cortes se ajustan a saltos de línea cercanos.
+        
+        Returns:
+            {'head': ..., 'tail': ...} o {'full': text} si el texto es corto
+            o window_mode es 'full'
+        """
+        head_chars = self.window_head_chars
+        tail_chars = self.window_tail_chars
+        
+        if self.window_mode != 'head_tail' or len(text) <= head_chars + tail_chars:
+            return {'full': text}
+        
+        head_end = text.rfind('\n', 0, head_chars)
+        if head_end < head_chars // 2:
+            head_end = head_chars
+        
+        tail_start = text.find('\n', len(text) - tail_chars)
+        if tail_start < 0 or tail_start > len(text) - tail_chars // 2:
+            tail_start = len(text) - tail_chars
+        
+        return {'head': text[:head_end], 'tail': text[tail_start:]}
+    
+    def _extract_with_patterns(self, windows: Dict[str, str],
+                               data_types: Optional[List[str]] = None) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Extrae datos usando patrones regex
+        
+        Cada patrón se prueba en todas las ventanas antes de pasar al
+        siguiente, así se respeta la prioridad de los patrones igual que con
+        el texto completo.
+        
+        Args:
+            windows: Ventanas de texto por nombre (head/tail o full)
+            data_types: Campos a extraer (por defecto todos)
+            
+        Returns:
+            (datos extraídos, ventana de la que salió cada campo)
+        """
         extracted = {}
+        sources = {}
         
-        for data_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                try:
-                    matches = re.findall(pattern, text, re.IGNORECASE | re.MULTILINE)
-                    if matches:
-                        # Seleccionar el mejor match
-                        best_match = self._select_best_match(matches, data_type)
-                        if best_match:
-                            extracted[data_type] = best_match
-                            break  # Usar el primer patrón que funcione
-                except re.error as e:
-                    logger.debug(f"Error en patrón regex: {e}")
-                    continue
+        # Una sola pasada de normalización; los patrones cuyas palabras clave
+        # no aparecen en el texto no pueden coincidir y no se ejecutan
+        folded = {name: fold_for_keywords(window) for name, window in windows.items()}
         
-        return extracted
+        for data_type, patterns in self.compiled_patterns.items():
+            if data_types is not None and data_type not in data_types:
+                continue
+            
+            keywords = self.pattern_keywords[data_type]
+            for pattern, required in zip(patterns, keywords):
+                window_matches = {}
+                for name, window in windows.items():
+                    if required and not any(keyword in folded[name] for keyword in required):
+                        continue
+                    found = pattern.findall(window)
+                    if found:
+                        window_matches[name] = found
+                
+                if window_matches:
+                    # Seleccionar el mejor match entre todas las ventanas
+                    matches = [match for found in window_matches.values() for match in found]
+                    best_match = self._select_best_match(matches, data_type)
+                    if best_match:
+                        extracted[data_type] = best_match
+                        sources[data_type] = next(
+                            (name for name, found in window_matches.items()
+                             if self._select_best_match(found, data_type) == best_match),
+                            next(iter(window_matches))
+                        )
+                        break  # Usar el primer patrón que funcione
+        
+        return extracted, sources
     
     def _select_best_match(self, matches: List[str], data_type: str) -> Optional[str]:
         """Selecciona el mejor match de una lista"""
@@ -264,19 +806,14 @@ class InvoiceExtractor:
         
         # Lógica específica por tipo de dato
         if data_type == 'amount':
-            # Para montos, seleccionar el más grande (probablemente el total)
-            amounts = []
-            for match in matches:
-                try:
-                    clean_amount = re.sub(r'[^\d.,]', '', match)
-                    if clean_amount:
-                        amounts.append(float(clean_amount.replace(',', '')))
-                except ValueError:
-                    continue
+            # Para montos, seleccionar el más grande (probablemente el total).
+            # Se devuelve el texto original: _parse_amount necesita el formato
+            # (1.234,56 / 1,234.56) para saber cuál es el separador decimal
+            amounts = [(value, match) for match in matches
+                       for value in [parse_amount_text(match)] if value is not None]
             
             if amounts:
-                max_amount = max(amounts)
-                return str(max_amount)
+                return max(amounts, key=lambda item: item[0])[1]
         
         elif data_type == 'vendor':
             # Para proveedor, seleccionar el más específico (no email genérico)
@@ -293,14 +830,17 @@ class InvoiceExtractor:
         # Por defecto, devolver el primer match válido
         return matches[0] if matches else None
     
-    def _enhance_with_context(self, data: Dict[str, Any], text: str) -> Dict[str, Any]:
+    def _enhance_with_context(self, data: Dict[str, Any], text: str,
+                              hits: Optional[Dict[str, List[int]]] = None) -> Dict[str, Any]:
         """Mejora los datos extraídos con análisis contextual"""
         enhanced = data.copy()
+        if hits is None:
+            hits = self._keyword_hits(text)
         
         # Mejorar extracción de monto
         if 'amount' in enhanced:
             enhanced['amount'] = self._parse_amount(enhanced['amount'])
-            enhanced['currency'] = self._detect_currency(text)
+            enhanced['currency'] = self._detect_currency(text, hits)
         
         # Mejorar vendor
         if 'vendor' in enhanced:
@@ -316,80 +856,53 @@ class InvoiceExtractor:
                 enhanced['concept'] = inferred_concept
         
         # Detectar información adicional
-        enhanced['payment_method'] = self._detect_payment_method(text)
-        enhanced['language'] = self._detect_language(text)
+        enhanced['payment_method'] = self._detect_payment_method(text, hits)
+        enhanced['language'] = self._detect_language(text, hits)
         
         return enhanced
     
     def _parse_amount(self, amount_str: str) -> float:
         """Parsea y limpia un monto"""
-        try:
-            # Remover caracteres no numéricos excepto puntos y comas
-            clean_amount = re.sub(r'[^\d.,]', '', str(amount_str))
-            
-            # Manejar diferentes formatos de números
-            if ',' in clean_amount and '.' in clean_amount:
-                # Formato: 1,234.56 o 1.234,56
-                if clean_amount.rfind(',') > clean_amount.rfind('.'):
-                    # Formato: 1.234,56
-                    clean_amount = clean_amount.replace('.', '').replace(',', '.')
-                else:
-                    # Formato: 1,234.56
-                    clean_amount = clean_amount.replace(',', '')
-            elif ',' in clean_amount:
-                # Solo comas - podría ser separador de miles o decimal
-                comma_pos = clean_amount.rfind(',')
-                if len(clean_amount) - comma_pos <= 3:
-                    # Probablemente decimal: 1234,56
-                    clean_amount = clean_amount.replace(',', '.')
-                else:
-                    # Probablemente miles: 1,234
-                    clean_amount = clean_amount.replace(',', '')
-            
-            return float(clean_amount)
-            
-        except (ValueError, TypeError):
+        amount = parse_amount_text(amount_str)
+        if amount is None:
             logger.warning(f"⚠️ No se pudo parsear monto: {amount_str}")
             return 0.0
+        return amount
     
-    def _detect_currency(self, text: str) -> str:
+    def _detect_currency(self, text: str, hits: Optional[Dict[str, List[int]]] = None) -> str:
         """Detecta la moneda del texto"""
-        # Buscar símbolos de moneda usando Unicode escapado
-        currency_checks = [
-            ('$', 'USD'),
-            ('\u20AC', 'EUR'),  # Euro
-            ('\u00A3', 'GBP'),  # Libra
-            ('\u00A5', 'JPY'),  # Yen
-        ]
+        if hits is None:
+            hits = self._keyword_hits(text)
         
-        for symbol, currency in currency_checks:
-            if symbol in text:
-                return currency
+        # Un código explícito manda sobre el símbolo ("$1.234,56 COP" es COP)
+        if any(code.lower() in hits for code in CURRENCY_CODES):
+            code = CURRENCY_CODE_RE.search(text)
+            if code:
+                return code.group(1).upper()
         
-        # Buscar códigos de moneda
-        currency_codes = ['USD', 'EUR', 'GBP', 'COP', 'MXN', 'ARS', 'PEN', 'CLP']
-        text_upper = text.upper()
-        for code in currency_codes:
-            if code in text_upper:
-                return code
+        # Buscar símbolos de moneda ('$' se deja para después: también es el de los pesos)
+        for symbol, currency in CURRENCY_SYMBOL_CHECKS:
+            if symbol != '$' and symbol in hits:
+                return currency
         
         # Detectar por palabras clave
-        if any(word in text.lower() for word in ['peso', 'pesos']):
+        if any(word in hits for word in PESO_WORDS):
             # Determinar qué tipo de peso
-            if 'colombia' in text.lower() or 'cop' in text.upper():
-                return 'COP'
-            elif 'mexico' in text.lower() or 'mx' in text.lower():
-                return 'MXN'
-            elif 'argentina' in text.lower() or 'arg' in text.lower():
-                return 'ARS'
+            for currency, country_hints in PESO_COUNTRY_HINTS:
+                if any(hint in hits for hint in country_hints):
+                    return currency
             return 'COP'  # Default para pesos
-        elif any(word in text.lower() for word in ['dollar', 'dollars', 'dólar', 'dólares']):
+        
+        if '$' in hits:
             return 'USD'
-        elif any(word in text.lower() for word in ['euro', 'euros']):
-            return 'EUR'
+        
+        for currency, names in CURRENCY_NAMES:
+            if any(name in hits for name in names):
+                return currency
         
         return 'USD'  # Default
     
+
     def _clean_vendor_name(self, vendor: str) -> str:
         """Limpia y normaliza el nombre del proveedor"""
         if not vendor:
@@ -438,31 +951,25 @@ class InvoiceExtractor:
         
         return None
     
-    def _detect_payment_method(self, text: str) -> Optional[str]:
+    def _detect_payment_method(self, text: str, hits: Optional[Dict[str, List[int]]] = None) -> Optional[str]:
         """Detecta el método de pago"""
-        methods = {
-            'credit_card': ['tarjeta', 'card', 'visa', 'mastercard', 'amex'],
-            'transfer': ['transferencia', 'transfer', 'wire', 'banco'],
-            'cash': ['efectivo', 'cash', 'contado'],
-            'paypal': ['paypal'],
-            'check': ['cheque', 'check']
-        }
+        if hits is None:
+            hits = self._keyword_hits(text)
         
-        text_lower = text.lower()
-        for method, keywords in methods.items():
-            if any(keyword in text_lower for keyword in keywords):
+        for method, keywords in PAYMENT_METHOD_KEYWORDS.items():
+            if any(keyword in hits for keyword in keywords):
                 return method
         
         return None
     
-    def _detect_language(self, text: str) -> str:
+
+    def _detect_language(self, text: str, hits: Optional[Dict[str, List[int]]] = None) -> str:
         """Detecta el idioma del texto"""
-        spanish_words = ['factura', 'importe', 'fecha', 'proveedor', 'concepto', 'pagar']
-        english_words = ['invoice', 'amount', 'date', 'vendor', 'concept', 'payment']
+        if hits is None:
+            hits = self._keyword_hits(text)
         
-        text_lower = text.lower()
-        spanish_count = sum(1 for word in spanish_words if word in text_lower)
-        english_count = sum(1 for word in english_words if word in text_lower)
+        spanish_count = sum(1 for word in SPANISH_WORDS if word in hits)
+        english_count = sum(1 for word in ENGLISH_WORDS if word in hits)
         
         if spanish_count > english_count:
             return 'es'
@@ -471,6 +978,7 @@ class InvoiceExtractor:
         else:
             return 'unknown'
     
+
     def _calculate_confidence(self, data: Dict[str, Any]) -> float:
         """Calcula la confianza de la extracción"""
         confidence = 0.0
@@ -491,40 +999,46 @@ class InvoiceExtractor:
         
         return min(confidence, 1.0)
     
-    def _categorize_invoice(self, data: Dict[str, Any], text: str) -> str:
+    def _categorize_invoice(self, data: Dict[str, Any], text: str,
+                            hits: Optional[Dict[str, List[int]]] = None) -> str:
         """Categoriza la factura basándose en el contenido"""
-        text_lower = text.lower()
-        vendor_lower = str(data.get('vendor', '')).lower()
-        concept_lower = str(data.get('concept', '')).lower()
+        if hits is None:
+            hits = self._keyword_hits(text)
+        
+        # Proveedor y concepto se revisan aparte (pueden venir limpiados)
+        fields_text = f"{data.get('vendor', '')}\n{data.get('concept', '')}"
+        field_hits = self._keyword_hits(fields_text)
         
         # Buscar categoría por palabras clave
         for category, keywords in self.category_keywords.items():
             for keyword in keywords:
-                if keyword in text_lower or keyword in vendor_lower or keyword in concept_lower:
+                if keyword in hits or keyword in field_hits:
                     return category
         
         return 'miscellaneous'
     
-    def extract_from_attachment(self, attachment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+
+    def extract_from_attachment(self, attachment: Dict[str, Any]) -> Optional[InvoiceData]:
         """Extrae datos de un adjunto"""
         try:
             filename = attachment.get('filename', '').lower()
             content_type = attachment.get('content_type', '')
             
-            # Solo procesar archivos de texto por ahora
+            # El contenido puede venir ya decodificado o en base64
+            content = attachment['content']
+            if isinstance(content, str):
+                content = base64.b64decode(content)
+            
             if content_type.startswith('text/') or filename.endswith(('.txt', '.csv')):
-                content = base64.b64decode(attachment['content'])
                 return self.extract(content)
             
-            elif filename.endswith('.pdf'):
-                # Para PDFs necesitaríamos PyPDF2 o similar
-                logger.info(f"📄 PDF detectado: {filename} (extracción de PDF no implementada)")
-                return None
+            elif filename.endswith('.pdf') or content_type == 'application/pdf':
+                logger.info(f"📄 PDF detectado: {filename}")
+                return self.extract(content)
             
             elif filename.endswith(('.xml', '.cfdi')):
-                # Para XML/CFDI necesitaríamos xml.etree
-                logger.info(f"📄 XML/CFDI detectado: {filename} (extracción XML no implementada)")
-                return None
+                logger.info(f"📄 XML/CFDI detectado: {filename}")
+                return self.extract(content)
             
             elif filename.endswith(('.doc', '.docx')):
                 # Para Word necesitaríamos python-docx
@@ -539,14 +1053,14 @@ class InvoiceExtractor:
             logger.warning(f"⚠️ Error extrayendo datos de adjunto: {e}")
             return None
     
-    def validate_extracted_data(self, data: Dict[str, Any]) -> List[str]:
+    def validate_extracted_data(self, data: InvoiceData) -> List[str]:
         """Valida los datos extraídos"""
         warnings = []
         
         # Validar monto
-        if 'amount' in data:
+        if data.amount is not None:
             try:
-                amount = float(data['amount'])
+                amount = float(data.amount)
                 if amount <= 0:
                     warnings.append("Monto debe ser mayor a 0")
                 elif amount > 10000000:
@@ -555,8 +1069,8 @@ class InvoiceExtractor:
                 warnings.append("Monto no es un número válido")
         
         # Validar vendor
-        if 'vendor' in data:
-            vendor = str(data['vendor'])
+        if data.vendor is not None:
+            vendor = str(data.vendor)
             if len(vendor) < 2:
                 warnings.append("Nombre de proveedor muy corto")
             elif len(vendor) > 200:
@@ -564,10 +1078,11 @@ class InvoiceExtractor:
         
         # Validar fechas
         for date_field in ['invoice_date', 'due_date']:
-            if date_field in data:
+            value = getattr(data, date_field)
+            if value is not None:
                 try:
                     # Intentar parsear la fecha
-                    date_str = str(data[date_field])
+                    date_str = str(value)
                     # Aquí podrías agregar validación de fecha más específica
                     if len(date_str) < 8:
                         warnings.append(f"{date_field} parece incompleta")
@@ -588,6 +1103,8 @@ class InvoiceExtractor:
             'extraction_capabilities': [
                 'email_content',
                 'text_attachments',
+                'pdf_text_layer' if PdfReader is not None else 'pdf_unavailable',
+                'cfdi_ubl_xml',
                 'pattern_matching',
                 'contextual_analysis',
                 'automatic_categorization'
@@ -595,6 +1112,165 @@ class InvoiceExtractor:
         }
 
 # Funciones de utilidad
+
+def invoices_to_dataframe(invoices: Iterable[Optional[InvoiceData]],
+                          default_currency: str = 'USD') -> 'pd.DataFrame':
+    """
+    Reúne resultados de extracción en un DataFrame normalizado por columnas
+    
+    Pensado para backfills grandes con extract_many: importes y monedas se
+    normalizan en operaciones vectorizadas en lugar de documento a documento.
+    
+    Args:
+        invoices: Resultados de extract/extract_many (None = sin factura)
+        default_currency: Moneda para filas con importe pero sin moneda
+        
+    Returns:
+        DataFrame con una fila por documento, en el orden de entrada
+    """
+    if pd is None:
+        raise ImportError("pandas no está instalado (pip install pandas)")
+    
+    frame = pd.DataFrame(
+        [invoice.to_dict() if invoice is not None else {} for invoice in invoices],
+        columns=list(_INVOICE_FIELDS)
+    )
+    
+    for column in ('amount', 'subtotal', 'tax_amount'):
+        frame[column] = _normalize_amount_column(frame[column])
+    
+    currency = frame['currency'].astype('string').str.strip().str.upper()
+    currency = currency.replace(dict(CURRENCY_SYMBOL_CHECKS))
+    frame['currency'] = currency.mask(currency.isna() & frame['amount'].notna(), default_currency)
+    
+    return frame
+
+def _normalize_amount_column(column: 'pd.Series') -> 'pd.Series':
+    """Convierte importes (1,234.56 / 1.234,56 / números) a float, NaN si no son válidos"""
+    # Los números ya vienen parseados por el extractor: solo se normalizan textos
+    is_text = column.map(lambda value: isinstance(value, str))
+    numbers = pd.to_numeric(column.where(~is_text), errors='coerce')
+    if not is_text.any():
+        return numbers
+    
+    text = column[is_text].str.replace(r'[^\d.,]', '', regex=True)
+    
+    # Coma decimal (1.234,56): quitar puntos de miles y usar punto decimal
+    decimal_comma = text.str.contains(r',\d{1,2}$', regex=True)
+    european = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    text = text.where(~decimal_comma, european).where(decimal_comma, text.str.replace(',', '', regex=False))
+    
+    return numbers.where(~is_text, pd.to_numeric(text, errors='coerce').reindex(column.index))
+
+# Caracteres no ASCII que re.IGNORECASE empareja con letras ASCII
+_ASCII_FOLD_CHARS = '\u0130\u0131\u017f\u212a'
+_ASCII_FOLD = str.maketrans(_ASCII_FOLD_CHARS, 'iisk')
+
+def fold_for_keywords(text: str) -> str:
+    """Normaliza el texto para buscar palabras clave como lo haría re.IGNORECASE"""
+    if not text.isascii() and any(char in text for char in _ASCII_FOLD_CHARS):
+        text = text.translate(_ASCII_FOLD)
+    return text.lower()
+
+def required_literals(pattern: re.Pattern) -> Optional[Tuple[str, ...]]:
+    """
+    Obtiene textos de los que al menos uno aparece en cualquier coincidencia
+    
+    Recorre el árbol del patrón buscando secuencias de literales ASCII
+    obligatorias (o alternativas de ellas) y devuelve la más selectiva.
+    
+    Args:
+        pattern: Patrón compilado
+        
+    Returns:
+        Tupla de palabras clave en minúsculas, o None si no se pueden deducir
+    """
+    try:
+        parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    
+    candidates = _required_in_sequence(list(parsed))
+    if not candidates:
+        return None
+    
+    # Preferir el conjunto cuya palabra más corta sea más larga
+    best = max(candidates, key=lambda keywords: min(len(k) for k in keywords))
+    return tuple(sorted(best))
+
+def _required_in_sequence(items: List[Tuple[Any, Any]]) -> List[set]:
+    """Conjuntos de literales obligatorios de una secuencia del árbol de sre"""
+    candidates = []
+    run = ''
+    
+    for op, av in items:
+        if op is sre_parse.LITERAL and av < 128:
+            run += chr(av).lower()
+            continue
+        
+        if run:
+            candidates.append({run})
+            run = ''
+        
+        if op is sre_parse.SUBPATTERN:
+            candidates.extend(_required_in_sequence(list(av[-1])))
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[0] >= 1:
+            candidates.extend(_required_in_sequence(list(av[2])))
+        elif op is sre_parse.BRANCH:
+            union = set()
+            for branch in av[1]:
+                branch_candidates = _required_in_sequence(list(branch))
+                if not branch_candidates:
+                    union = None
+                    break
+                union |= max(branch_candidates, key=lambda keywords: min(len(k) for k in keywords))
+            if union:
+                candidates.append(union)
+    
+    if run:
+        candidates.append({run})
+    
+    return candidates
+
+def parse_amount_text(amount_str: Any) -> Optional[float]:
+    """
+    Convierte el texto de un monto en float según su formato
+    
+    Admite 1,234.56, 1.234,56, 1234,56, 1,234 y 1.234.567.
+    
+    Returns:
+        Valor del monto, o None si no es un número
+    """
+    # Remover caracteres no numéricos excepto puntos y comas
+    clean_amount = re.sub(r'[^\d.,]', '', str(amount_str))
+    
+    # Manejar diferentes formatos de números
+    if ',' in clean_amount and '.' in clean_amount:
+        # Formato: 1,234.56 o 1.234,56
+        if clean_amount.rfind(',') > clean_amount.rfind('.'):
+            # Formato: 1.234,56
+            clean_amount = clean_amount.replace('.', '').replace(',', '.')
+        else:
+            # Formato: 1,234.56
+            clean_amount = clean_amount.replace(',', '')
+    elif ',' in clean_amount:
+        # Solo comas - podría ser separador de miles o decimal
+        comma_pos = clean_amount.rfind(',')
+        if len(clean_amount) - comma_pos <= 3 and clean_amount.count(',') == 1:
+            # Probablemente decimal: 1234,56
+            clean_amount = clean_amount.replace(',', '.')
+        else:
+            # Probablemente miles: 1,234
+            clean_amount = clean_amount.replace(',', '')
+    elif clean_amount.count('.') > 1:
+        # Varios puntos solo pueden ser de miles: 1.234.567
+        clean_amount = clean_amount.replace('.', '')
+    
+    try:
+        return float(clean_amount)
+    except ValueError:
+        return None
+
 def clean_currency_amount(amount_str: str) -> Tuple[Optional[float], Optional[str]]:
     """Limpia un string de monto y extrae valor y moneda"""
     if not amount_str:
@@ -756,8 +1432,8 @@ class InvoiceExtractorTester:
             result = self.extractor.extract(sample['content'])
             
             if result:
-                print(f"  📊 Resultado: {json.dumps(result, indent=2, ensure_ascii=False)}")
-                print(f"  🎯 Confianza: {result.get('confidence', 0):.0%}")
+                print(f"  📊 Resultado: {json.dumps(result.to_dict(), indent=2, ensure_ascii=False)}")
+                print(f"  🎯 Confianza: {result.confidence:.0%}")
             else:
                 print("  ❌ No se pudieron extraer datos")
             
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher - DOCUFIND
+Búsqueda de muchas palabras clave en una sola pasada sobre el texto
+"""
+
+import re
+import logging
+from typing import Dict, List, Iterable
+
+logger = logging.getLogger(__name__)
+
+def _trie_pattern(node: Dict[str, Dict]) -> str:
+    """
+    Convierte un trie de caracteres en una expresión regular equivalente
+
+    Las palabras que comparten prefijo comparten rama, así en cada posición
+    el motor de regex solo sigue el camino del trie que coincide con el texto.
+    """
+    branches = [re.escape(char) + _trie_pattern(child)
+                for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ''
+
+    is_word_end = '' in node
+    if len(branches) == 1 and not is_word_end:
+        return branches[0]
+
+    group = '(?:' + '|'.join(branches) + ')'
+    return group + '?' if is_word_end else group
+
+class KeywordMatcher:
+    """
+    Autómata multipatrón (trie de palabras clave) estilo Aho–Corasick
+
+    Se construye una vez y devuelve todas las apariciones de todas las palabras
+    clave con su posición, incluidas las solapadas ("transfer" dentro de
+    "transferencia", "app" dentro de "whatsapp"). El recorrido lo hace el
+    motor de regex en C, que en CPython es más rápido que un autómata en Python.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """
+        Construye el autómata
+
+        Args:
+            keywords: Palabras clave (se buscan tal cual; el texto debe venir
+                normalizado igual, p. ej. en minúsculas)
+        """
+        self.keywords = sorted({keyword for keyword in keywords if keyword})
+
+        trie: Dict[str, Dict] = {}
+        for keyword in self.keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+
+        # Una coincidencia por posición: la palabra más larga que empieza ahí
+        self._pattern = re.compile(_trie_pattern(trie)) if self.keywords else None
+
+        # Palabras clave que también coinciden en la misma posición (prefijos)
+        self._prefixes = {
+            keyword: tuple(other for other in self.keywords if keyword.startswith(other))
+            for keyword in self.keywords
+        }
+
+        logger.debug(f"🔎 KeywordMatcher con {len(self.keywords)} palabras clave")
+
+    def find_all(self, text: str) -> Dict[str, List[int]]:
+        """
+        Busca todas las palabras clave en una sola pasada
+
+        Args:
+            text: Texto ya normalizado
+
+        Returns:
+            Diccionario palabra clave → posiciones de inicio (solo las encontradas)
+        """
+        hits: Dict[str, List[int]] = {}
+        if self._pattern is None or not text:
+            return hits
+
+        prefixes = self._prefixes
+        search = self._pattern.search
+        match = search(text)
+
+        while match is not None:
+            start = match.start()
+            for keyword in prefixes[match.group()]:
+                hits.setdefault(keyword, []).append(start)
+            # Seguir desde el carácter siguiente para no perder solapamientos
+            match = search(text, start + 1)
+
+        return hits
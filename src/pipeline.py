@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Pipeline - DOCUFIND
+Procesamiento concurrente por etapas con colas acotadas
+"""
+
+import logging
+import queue
+import threading
+from typing import Dict, Any, Iterable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Marca de fin de datos que circula entre etapas
+_DONE = object()
+
+class ConcurrentPipeline:
+    """
+    Pipeline por etapas: descarga IMAP → extracción → subida a Drive → hoja
+
+    Cada etapa se comunica con la siguiente mediante una cola acotada, así una
+    etapa lenta frena a las anteriores (backpressure) en lugar de acumular
+    correos en memoria. La hoja de cálculo se escribe desde un único hilo y en
+    orden de buzón, de modo que las filas son las mismas que en modo secuencial.
+    """
+
+    def __init__(self, processor: Any, workers: int = 4, queue_size: Optional[int] = None):
+        """
+        Inicializa el pipeline
+
+        Args:
+            processor: DocuFindProcessor que aporta las etapas
+            workers: Hilos por etapa de extracción y de subida
+            queue_size: Capacidad de cada cola (por defecto 2 × workers)
+        """
+        self.processor = processor
+        self.workers = max(1, int(workers))
+        size = queue_size or self.workers * 2
+
+        self.extract_queue: queue.Queue = queue.Queue(maxsize=size)
+        self.upload_queue: queue.Queue = queue.Queue(maxsize=size)
+        self.record_queue: queue.Queue = queue.Queue(maxsize=size)
+
+        self._abort = threading.Event()
+
+    def run(self, emails: Iterable[Dict[str, Any]], results: Dict[str, Any]) -> int:
+        """
+        Procesa los correos y rellena results/stats igual que el modo secuencial
+
+        Args:
+            emails: Correos a procesar (puede ser un generador de descarga)
+            results: Diccionario de resultados a completar
+
+        Returns:
+            Número de correos registrados
+        """
+        threads = [threading.Thread(target=self._fetch_stage, args=(emails,),
+                                    name='pipeline-imap', daemon=True)]
+
+        for i in range(self.workers):
+            threads.append(threading.Thread(
+                target=self._stage_worker,
+                args=(self.extract_queue, self.upload_queue, self._extract),
+                name=f'pipeline-extract-{i + 1}', daemon=True
+            ))
+            threads.append(threading.Thread(
+                target=self._stage_worker,
+                args=(self.upload_queue, self.record_queue, self._upload),
+                name=f'pipeline-upload-{i + 1}', daemon=True
+            ))
+
+        for thread in threads:
+            thread.start()
+
+        try:
+            processed = self._record_stage(results)
+        except BaseException:
+            # Detener el resto de etapas si el escritor falla o se interrumpe
+            self._abort.set()
+            raise
+
+        for thread in threads:
+            thread.join()
+
+        return processed
+
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """Encola respetando la capacidad; devuelve False si se abortó"""
+        while not self._abort.is_set():
+            try:
+                target.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _fetch_stage(self, emails: Iterable[Dict[str, Any]]):
+        """Etapa IMAP: numera los correos en orden de buzón y los encola"""
+        try:
+            for idx, email in enumerate(emails, 1):
+                if not self._put(self.extract_queue, (idx, email)):
+                    return
+        except Exception as e:
+            logger.error(f"❌ Error descargando correos: {e}")
+            self.processor._increment_stat('errores')
+        finally:
+            for _ in range(self.workers):
+                self._put(self.extract_queue, _DONE)
+
+    def _extract(self, idx: int, email: Dict[str, Any]) -> Dict[str, Any]:
+        """Etapa de extracción (CPU): adjuntos y datos de factura"""
+        try:
+            return self.processor._extract_stage(email, idx, None)
+        except Exception as e:
+            logger.error(f"❌ Error inesperado extrayendo datos: {e}")
+            return {'email': email, 'attachments': [], 'invoice_attachment': None,
+                    'invoice_data': None, 'content_hash': None, 'existing_file_id': None,
+                    'file_id': None, 'error': e}
+
+    def _upload(self, idx: int, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Etapa de subida a Drive (red)"""
+        try:
+            return self.processor._upload_stage(job)
+        except Exception as e:
+            logger.error(f"❌ Error inesperado subiendo a Drive: {e}")
+            job['error'] = e
+            return job
+
+    def _stage_worker(self, source: queue.Queue, target: queue.Queue,
+                      handler: Callable[[int, Any], Any]):
+        """Hilo genérico de etapa: consume, procesa y pasa el resultado"""
+        while True:
+            item = source.get()
+            if item is _DONE:
+                self._put(target, _DONE)
+                return
+
+            idx, payload = item
+            result = handler(idx, payload)
+
+            if not self._put(target, (idx, result)):
+                return
+
+    def _record_stage(self, results: Dict[str, Any]) -> int:
+        """
+        Etapa de la hoja: escribe las filas en orden de buzón
+
+        Los trabajos pueden llegar desordenados; se retienen hasta que llega
+        el siguiente número esperado.
+        """
+        pending: Dict[int, Dict[str, Any]] = {}
+        next_idx = 1
+        finished = 0
+
+        while finished < self.workers:
+            item = self.record_queue.get()
+            if item is _DONE:
+                finished += 1
+                continue
+
+            idx, job = item
+            pending[idx] = job
+
+            while next_idx in pending:
+                job = pending.pop(next_idx)
+                self.processor._record_stage(job, results)
+                next_idx += 1
+
+        # No debería quedar nada, pero no perder trabajos si hubo huecos
+        for idx in sorted(pending):
+            job = pending[idx]
+            self.processor._record_stage(job, results)
+
+        return next_idx - 1 + len(pending)
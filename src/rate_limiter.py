@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Rate Limiter - DOCUFIND
+Limitador de cuota compartido (token bucket) con reintentos y backoff exponencial
+"""
+
+import random
+import logging
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Peticiones por segundo por defecto (api, tipo) → (ritmo, ráfaga).
+# Drive admite ~12.000 consultas/min por usuario pero limita las escrituras
+# sostenidas a unas pocas por segundo; Sheets, 60 lecturas y 60 escrituras
+# por minuto y usuario.
+DEFAULT_RATE_LIMITS: Dict[Tuple[str, str], Tuple[float, int]] = {
+    ('drive', 'read'): (10.0, 20),
+    ('drive', 'write'): (3.0, 10),
+    ('sheets', 'read'): (1.0, 10),
+    ('sheets', 'write'): (1.0, 10)
+}
+
+# Estados HTTP que indican cuota agotada o un fallo transitorio del servidor
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+# Motivos de un 403 que son límites de ritmo (reintentables), no de permisos
+RATE_LIMIT_REASONS = ('userratelimitexceeded', 'ratelimitexceeded')
+
+class TokenBucket:
+    """
+    Token bucket seguro entre hilos
+
+    Se rellena a `rate` tokens por segundo hasta `capacity`. Cada petición
+    consume un token y, si no hay, el hilo espera lo justo para que lo haya.
+    Un aviso de cuota del servidor (penalize) pausa el bucket para todos.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        """
+        Inicializa el bucket lleno
+
+        Args:
+            rate: Tokens por segundo
+            capacity: Tokens máximos acumulables (ráfaga)
+        """
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(1, int(capacity))
+        self.tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+        # Métricas
+        self.requests = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self, tokens: int = 1) -> float:
+        """
+        Consume tokens, esperando si hace falta
+
+        Args:
+            tokens: Tokens a consumir (p. ej. peticiones de un lote)
+
+        Returns:
+            Segundos esperados
+        """
+        tokens = min(max(1, tokens), self.capacity)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+
+                delay = self._paused_until - now
+                if delay <= 0:
+                    if self.tokens >= tokens:
+                        self.tokens -= tokens
+                        self.requests += tokens
+                        self.wait_seconds += waited
+                        return waited
+                    delay = (tokens - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def penalize(self, seconds: float):
+        """Pausa el bucket para todos los hilos y lo vacía"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+class ApiRateLimiter:
+    """
+    Limitador compartido para las APIs de Google
+
+    Mantiene un TokenBucket por (api, tipo): Drive y Sheets, lectura y
+    escritura. Todas las peticiones pasan por call(), que espera su turno,
+    reintenta con backoff exponencial con jitter ante cuota agotada
+    (429, 403 rateLimitExceeded) o errores 5xx, y acumula el tiempo de
+    espera como métrica.
+    """
+
+    def __init__(self,
+                 limits: Optional[Dict[Tuple[str, str], Tuple[float, int]]] = None,
+                 max_retries: int = 5,
+                 base_delay: float = 1.0,
+                 max_delay: float = 64.0):
+        """
+        Inicializa el limitador
+
+        Args:
+            limits: (api, tipo) → (peticiones por segundo, ráfaga); se combinan
+                con DEFAULT_RATE_LIMITS
+            max_retries: Reintentos máximos por petición
+            base_delay: Espera base del backoff en segundos
+            max_delay: Espera máxima de un reintento en segundos
+        """
+        merged = dict(DEFAULT_RATE_LIMITS)
+        merged.update(limits or {})
+        self.buckets = {key: TokenBucket(rate, capacity) for key, (rate, capacity) in merged.items()}
+        self.max_retries = max(0, int(max_retries))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.backoff_seconds = 0.0
+
+    def bucket(self, api: str, kind: str) -> TokenBucket:
+        """Bucket de una API y tipo (se crea con el límite de lectura si no existe)"""
+        key = (api, kind)
+        if key not in self.buckets:
+            with self._lock:
+                if key not in self.buckets:
+                    rate, capacity = DEFAULT_RATE_LIMITS.get((api, 'read'), (10.0, 20))
+                    self.buckets[key] = TokenBucket(rate, capacity)
+        return self.buckets[key]
+
+    def acquire(self, api: str, kind: str, tokens: int = 1) -> float:
+        """Espera turno para una petición sin ejecutarla (p. ej. un bloque de subida)"""
+        return self.bucket(api, kind).acquire(tokens)
+
+    def backoff(self, attempt: int) -> float:
+        """Espera del reintento `attempt` (1, 2, ...): exponencial con jitter completo"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, api: str, kind: str, func: Callable[[], Any], tokens: int = 1) -> Any:
+        """
+        Ejecuta una petición respetando la cuota y reintentando si procede
+
+        Args:
+            api: 'drive' o 'sheets'
+            kind: 'read' o 'write'
+            func: Función que ejecuta la petición
+            tokens: Tokens que consume (peticiones reales que representa)
+
+        Returns:
+            Resultado de func
+
+        Raises:
+            La última excepción si se agotan los reintentos o no es reintentable
+        """
+        bucket = self.bucket(api, kind)
+        attempt = 0
+
+        while True:
+            bucket.acquire(tokens)
+            try:
+                return func()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable_error(e, write=(kind == 'write')):
+                    raise
+
+                attempt += 1
+                self.wait_retry(api, kind, attempt, e)
+
+    def wait_retry(self, api: str, kind: str, attempt: int, error: Exception,
+                   description: Optional[str] = None) -> float:
+        """
+        Espera el backoff antes de reintentar una petición fallida
+
+        Si el error es de cuota, el bucket entero queda en pausa ese tiempo
+        (la cuota es de todos los hilos). La espera se suma a las métricas.
+
+        Args:
+            api: 'drive' o 'sheets'
+            kind: 'read' o 'write'
+            attempt: Número de reintento (1, 2, ...)
+            error: Error que provocó el reintento
+            description: Texto del log (por defecto api/tipo)
+
+        Returns:
+            Segundos esperados
+        """
+        delay = self.backoff(attempt)
+        if is_rate_limit_error(error):
+            self.bucket(api, kind).penalize(delay)
+
+        with self._lock:
+            self.retries += 1
+            self.backoff_seconds += delay
+
+        status = _error_status(error)
+        logger.warning(f"🚦 {description or f'{api}/{kind}'}: {status or error} — "
+                       f"reintento {attempt} en {delay:.1f}s")
+        time.sleep(delay)
+        return delay
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Métricas acumuladas
+
+        Returns:
+            Peticiones y segundos de espera por bucket, reintentos y segundos
+            de backoff
+        """
+        buckets = {
+            f"{api}_{kind}": {
+                'requests': bucket.requests,
+                'wait_seconds': round(bucket.wait_seconds, 3)
+            }
+            for (api, kind), bucket in self.buckets.items()
+        }
+        return {
+            'buckets': buckets,
+            'wait_seconds': round(sum(bucket.wait_seconds for bucket in self.buckets.values()), 3),
+            'retries': self.retries,
+            'backoff_seconds': round(self.backoff_seconds, 3)
+        }
+
+def parse_rate_limits(config: Optional[Dict[str, Any]]) -> Dict[Tuple[str, str], Tuple[float, int]]:
+    """
+    Convierte la sección rate_limits de la configuración
+
+    Acepta claves "api_tipo" (drive_read, drive_write, sheets_read,
+    sheets_write) con un número (peticiones por segundo) o [ritmo, ráfaga].
+
+    Returns:
+        Límites en el formato de ApiRateLimiter
+    """
+    limits: Dict[Tuple[str, str], Tuple[float, int]] = {}
+    for name, value in (config or {}).items():
+        if '_' not in name:
+            logger.warning(f"⚠️ Límite de API desconocido: {name}")
+            continue
+        key = tuple(name.lower().rsplit('_', 1))
+        default_capacity = DEFAULT_RATE_LIMITS.get(key, (0, 10))[1]
+        if isinstance(value, (list, tuple)):
+            limits[key] = (float(value[0]), int(value[1]) if len(value) > 1 else default_capacity)
+        else:
+            limits[key] = (float(value), default_capacity)
+    return limits
+
+def _error_status(error: Exception) -> Optional[int]:
+    """Estado HTTP de un error de la API (None si no es un error HTTP)"""
+    resp = getattr(error, 'resp', None)
+    return getattr(resp, 'status', None)
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Indica si el error es de cuota (429 o 403 por límite de ritmo)"""
+    status = _error_status(error)
+    if status == 429:
+        return True
+    if status == 403:
+        content = getattr(error, 'content', b'') or b''
+        if isinstance(content, bytes):
+            content = content.decode('utf-8', errors='ignore')
+        content = content.lower()
+        return any(reason in content for reason in RATE_LIMIT_REASONS)
+    return False
+
+def is_retryable_error(error: Exception, write: bool = False) -> bool:
+    """
+    Indica si conviene reintentar la petición
+
+    Una lectura se reintenta ante cuota agotada, timeout o 5xx. Una
+    escritura solo ante cuota agotada (429/403): con un 5xx o un timeout el
+    servidor pudo haberla aplicado y repetirla duplicaría el archivo o la fila.
+
+    Args:
+        error: Error de la petición
+        write: Si la petición modifica datos (no es idempotente)
+    """
+    if is_rate_limit_error(error):
+        return True
+    return not write and _error_status(error) in RETRYABLE_STATUS_CODES
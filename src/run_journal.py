@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Run Journal - DOCUFIND
+Diario de ejecución (SQLite en modo WAL) con la etapa de cada correo
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Etapas de un correo, en orden: descargado, datos extraídos, archivo en
+# Drive (con su ID) y fila escrita en la hoja
+JOURNAL_STAGES = ('fetched', 'extracted', 'uploaded', 'recorded')
+_STAGE_RANK = {stage: rank for rank, stage in enumerate(JOURNAL_STAGES)}
+
+class RunJournal:
+    """
+    Diario persistente de las ejecuciones y del avance de cada correo
+
+    Cada cambio de etapa se confirma al momento en una base SQLite con
+    journal_mode=WAL, así un corte (error, Ctrl+C, proceso terminado) deja
+    registrado hasta dónde llegó cada correo. Al reanudar una ejecución se
+    omiten los correos con la fila ya escrita y se reutiliza el archivo de
+    los que ya estaban subidos, sin repetir la subida.
+    """
+
+    def __init__(self, path: str = "config/run_journal.db", keep_runs: int = 20):
+        """
+        Inicializa el diario
+
+        Args:
+            path: Ruta de la base de datos SQLite
+            keep_runs: Ejecuciones completadas que se conservan al iniciar otra
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.keep_runs = max(1, int(keep_runs))
+        self.run_id: Optional[int] = None
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        # WAL: cada commit es un append al log, sin reescribir la base
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                status TEXT NOT NULL,
+                params TEXT,
+                started_at TEXT,
+                finished_at TEXT
+            );
+            CREATE TABLE IF NOT EXISTS emails (
+                run_id INTEGER NOT NULL,
+                email_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                stage_rank INTEGER NOT NULL,
+                file_id TEXT,
+                content_hash TEXT,
+                error TEXT,
+                updated_at TEXT,
+                PRIMARY KEY (run_id, email_id)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def start_run(self, params: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Inicia una ejecución nueva
+
+        Las ejecuciones interrumpidas anteriores dejan de poder reanudarse y
+        se descartan las completadas más antiguas que keep_runs.
+
+        Args:
+            params: Parámetros de la ejecución (se restauran al reanudar)
+
+        Returns:
+            ID de la ejecución
+        """
+        now = datetime.now().isoformat()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = 'abandoned' WHERE status IN ('running', 'interrupted')"
+            )
+            cursor = self._conn.execute(
+                "INSERT INTO runs (status, params, started_at) VALUES ('running', ?, ?)",
+                (json.dumps(params or {}, ensure_ascii=False, default=str), now)
+            )
+            self.run_id = cursor.lastrowid
+
+            self._conn.execute(
+                """
+                DELETE FROM runs WHERE run_id NOT IN (
+                    SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?
+                )
+                """,
+                (self.keep_runs,)
+            )
+            self._conn.execute("DELETE FROM emails WHERE run_id NOT IN (SELECT run_id FROM runs)")
+            self._conn.commit()
+
+        logger.info(f"📓 Ejecución #{self.run_id} registrada en el diario ({self.path})")
+        return self.run_id
+
+    def resume_run(self) -> Optional[Dict[str, Any]]:
+        """
+        Retoma la última ejecución que no terminó
+
+        Returns:
+            Diccionario con run_id, params, started_at y el número de correos
+            por etapa, o None si no hay ninguna pendiente
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id, params, started_at FROM runs "
+                "WHERE status IN ('running', 'interrupted') ORDER BY run_id DESC LIMIT 1"
+            ).fetchone()
+            if not row:
+                return None
+
+            self.run_id = row[0]
+            self._conn.execute("UPDATE runs SET status = 'running', finished_at = NULL WHERE run_id = ?",
+                               (self.run_id,))
+            self._conn.commit()
+
+        return {
+            'run_id': row[0],
+            'params': json.loads(row[1] or '{}'),
+            'started_at': row[2],
+            'stages': self.stage_counts()
+        }
+
+    def finish_run(self, status: str = 'completed'):
+        """
+        Cierra la ejecución actual
+
+        Args:
+            status: 'completed' o 'interrupted' (se podrá reanudar)
+        """
+        if self.run_id is None:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET status = ?, finished_at = ? WHERE run_id = ?",
+                (status, datetime.now().isoformat(), self.run_id)
+            )
+            self._conn.commit()
+
+        if status != 'completed':
+            logger.info(f"📓 Ejecución #{self.run_id} incompleta: se puede continuar con --resume")
+
+    def mark(self, email_id: str, stage: str, file_id: Optional[str] = None,
+             content_hash: Optional[str] = None, error: Optional[str] = None):
+        """
+        Registra que un correo alcanzó una etapa
+
+        La etapa nunca retrocede y los campos en None no borran lo guardado,
+        de modo que reprocesar un correo al reanudar conserva su file_id.
+
+        Args:
+            email_id: UID del correo
+            stage: Una de JOURNAL_STAGES
+            file_id: ID del archivo en Drive
+            content_hash: Hash del adjunto procesado
+            error: Último error del correo
+        """
+        if self.run_id is None or email_id is None:
+            return
+
+        with self._lock:
+            self._upsert(str(email_id), stage, file_id, content_hash, error)
+            self._conn.commit()
+
+    def mark_recorded(self, email_ids: Iterable[str]):
+        """Registra como escritas, en una sola transacción, las filas de varios correos"""
+        if self.run_id is None:
+            return
+
+        with self._lock:
+            for email_id in email_ids:
+                if email_id is not None:
+                    self._upsert(str(email_id), 'recorded', None, None, None)
+            self._conn.commit()
+
+    def _upsert(self, email_id: str, stage: str, file_id: Optional[str],
+                content_hash: Optional[str], error: Optional[str]):
+        """Inserta o avanza la entrada de un correo (requiere tener el lock)"""
+        self._conn.execute(
+            """
+            INSERT INTO emails (run_id, email_id, stage, stage_rank, file_id, content_hash, error, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(run_id, email_id) DO UPDATE SET
+                stage = CASE WHEN excluded.stage_rank > stage_rank THEN excluded.stage ELSE stage END,
+                stage_rank = MAX(stage_rank, excluded.stage_rank),
+                file_id = COALESCE(excluded.file_id, file_id),
+                content_hash = COALESCE(excluded.content_hash, content_hash),
+                error = COALESCE(excluded.error, error),
+                updated_at = excluded.updated_at
+            """,
+            (self.run_id, email_id, stage, _STAGE_RANK[stage], file_id, content_hash, error,
+             datetime.now().isoformat())
+        )
+
+    def get(self, email_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la entrada de un correo en la ejecución actual
+
+        Returns:
+            Diccionario con stage, file_id, content_hash y error, o None
+        """
+        if self.run_id is None:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT stage, file_id, content_hash, error FROM emails WHERE run_id = ? AND email_id = ?",
+                (self.run_id, str(email_id))
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'stage': row[0],
+            'file_id': row[1],
+            'content_hash': row[2],
+            'error': row[3]
+        }
+
+    def recorded_ids(self) -> Set[str]:
+        """UIDs de los correos con la fila ya escrita en la ejecución actual"""
+        if self.run_id is None:
+            return set()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT email_id FROM emails WHERE run_id = ? AND stage = 'recorded'",
+                (self.run_id,)
+            ).fetchall()
+
+        return {row[0] for row in rows}
+
+    def pending_ids(self) -> Set[str]:
+        """UIDs de la ejecución actual que empezaron pero no llegaron a escribir su fila"""
+        if self.run_id is None:
+            return set()
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT email_id FROM emails WHERE run_id = ? AND stage != 'recorded'",
+                (self.run_id,)
+            ).fetchall()
+
+        return {row[0] for row in rows}
+
+    def stage_counts(self) -> Dict[str, int]:
+        """Número de correos de la ejecución actual en cada etapa"""
+        counts = dict.fromkeys(JOURNAL_STAGES, 0)
+        if self.run_id is None:
+            return counts
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT stage, COUNT(*) FROM emails WHERE run_id = ? GROUP BY stage",
+                (self.run_id,)
+            ).fetchall()
+
+        counts.update(dict(rows))
+        return counts
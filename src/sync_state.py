@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Sync State - DOCUFIND
+Estado de sincronización incremental por cuenta y carpeta IMAP
+"""
+
+import json
+import os
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class SyncStateStore:
+    """
+    Almacén persistente del último UID procesado por cuenta y carpeta
+
+    Cada entrada guarda el UIDVALIDITY de la carpeta: si el servidor lo
+    cambia, los UIDs guardados dejan de ser válidos y hay que resincronizar.
+    """
+
+    def __init__(self, path: str = "config/sync_state.json"):
+        """
+        Inicializa el almacén de estado
+
+        Args:
+            path: Ruta del archivo JSON de estado
+        """
+        self.path = Path(path)
+        self.state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Carga el estado desde disco si existe"""
+        if not self.path.exists():
+            return
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+            logger.info(f"🔖 Estado de sincronización cargado desde: {self.path}")
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"⚠️ Estado de sincronización ilegible, se hará sincronización completa: {e}")
+            self.state = {}
+
+    def _save(self):
+        """Guarda el estado de forma atómica (archivo temporal + replace)"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _key(account: str, folder: str) -> str:
+        """Clave de una cuenta/carpeta"""
+        return f"{account.lower()}|{folder}"
+
+    def get(self, account: str, folder: str) -> Optional[Dict[str, Any]]:
+        """
+        Obtiene el estado guardado de una cuenta/carpeta
+
+        Returns:
+            Diccionario con uidvalidity, last_uid, retry_uids y failures, o None
+        """
+        return self.state.get(self._key(account, folder))
+
+    def update(self, account: str, folder: str, uidvalidity: int, last_uid: int,
+               retry_uids: Optional[Iterable[int]] = None):
+        """
+        Registra el último UID procesado y los anteriores que quedaron pendientes
+
+        El cursor nunca retrocede con el mismo UIDVALIDITY. Los UIDs menores
+        que no se completaron (lote fallido, mensaje ilegible, error al
+        procesarlo) se guardan aparte para añadirlos a la próxima búsqueda.
+
+        Args:
+            account: Usuario de la cuenta
+            folder: Carpeta IMAP
+            uidvalidity: UIDVALIDITY actual de la carpeta
+            last_uid: Último UID procesado
+            retry_uids: UIDs menores que last_uid aún sin procesar (None: sin cambios)
+        """
+        with self._lock:
+            key = self._key(account, folder)
+            current = self.state.get(key)
+            same_folder = bool(current) and current.get('uidvalidity') == uidvalidity
+            previous_retry = sorted(current.get('retry_uids', [])) if same_folder else []
+
+            if same_folder:
+                last_uid = max(last_uid, current.get('last_uid', 0))
+            retry = sorted(set(retry_uids)) if retry_uids is not None else previous_retry
+            retry = [uid for uid in retry if uid < last_uid]
+
+            # Los intentos fallidos solo importan mientras el UID siga pendiente
+            previous_failures = current.get('failures', {}) if same_folder else {}
+            pending = set(retry)
+            failures = {uid: count for uid, count in previous_failures.items()
+                        if int(uid) in pending or int(uid) > last_uid}
+
+            if (same_folder and current.get('last_uid') == last_uid and previous_retry == retry
+                    and previous_failures == failures):
+                return
+
+            self.state[key] = {
+                'uidvalidity': uidvalidity,
+                'last_uid': last_uid,
+                'retry_uids': retry,
+                'failures': failures,
+                'updated_at': datetime.now().isoformat()
+            }
+            self._save()
+
+    def record_failure(self, account: str, folder: str, uidvalidity: int, uid: int) -> int:
+        """
+        Suma un intento fallido a un UID que sigue pendiente
+
+        Args:
+            account: Usuario de la cuenta
+            folder: Carpeta IMAP
+            uidvalidity: UIDVALIDITY actual de la carpeta
+            uid: UID del correo que falló
+
+        Returns:
+            Intentos fallidos acumulados del UID (incluido este)
+        """
+        with self._lock:
+            key = self._key(account, folder)
+            current = self.state.get(key)
+            if not current or current.get('uidvalidity') != uidvalidity:
+                current = {'uidvalidity': uidvalidity, 'last_uid': 0, 'retry_uids': []}
+                self.state[key] = current
+
+            failures = current.setdefault('failures', {})
+            attempts = failures.get(str(uid), 0) + 1
+            failures[str(uid)] = attempts
+            current['updated_at'] = datetime.now().isoformat()
+            self._save()
+            return attempts
+
+    def reset(self, account: str, folder: str):
+        """Elimina el estado de una cuenta/carpeta (fuerza sincronización completa)"""
+        with self._lock:
+            if self.state.pop(self._key(account, folder), None) is not None:
+                self._save()
+                logger.info(f"🔄 Estado de sincronización reiniciado: {account} / {folder}")
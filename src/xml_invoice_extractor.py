@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+XML Invoice Extractor - DOCUFIND
+Extrae datos exactos de facturas electrónicas CFDI (México) y UBL (Colombia/DIAN)
+"""
+
+import io
+import re
+import mmap
+import logging
+import xml.etree.ElementTree as ET
+from typing import Dict, Any, Optional, List, Union
+
+logger = logging.getLogger(__name__)
+
+# Claves SAT de forma de pago (CFDI) → métodos de pago del extractor
+CFDI_PAYMENT_METHODS = {
+    '01': 'cash',
+    '02': 'check',
+    '03': 'transfer',
+    '04': 'credit_card',
+    '28': 'credit_card',
+    '29': 'credit_card'
+}
+
+# Códigos UN/ECE 4461 de medio de pago (UBL) → métodos de pago del extractor
+UBL_PAYMENT_METHODS = {
+    '10': 'cash',
+    '20': 'check',
+    '30': 'transfer',
+    '31': 'transfer',
+    '42': 'transfer',
+    '47': 'transfer',
+    '48': 'credit_card',
+    '49': 'transfer',
+    '54': 'credit_card',
+    '55': 'credit_card'
+}
+
+# Elementos raíz reconocidos y el esquema que representan
+ROOT_ELEMENTS = {
+    'Comprobante': 'cfdi',
+    'Invoice': 'ubl',
+    'AttachedDocument': 'attached'
+}
+
+# Primer elemento del documento, saltando BOM, declaración XML y comentarios
+_ROOT_RE = re.compile(r'^\ufeff?\s*(?:<\?.*?\?>\s*|<!--.*?-->\s*)*<(?:[\w.-]+:)?([\w.-]+)', re.DOTALL)
+
+# Máximo de conceptos que se concatenan en el campo concepto
+MAX_CONCEPTS = 3
+
+def _local_name(tag: str) -> str:
+    """Nombre de un elemento sin espacio de nombres"""
+    return tag.rsplit('}', 1)[-1]
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    """Convierte un importe del XML a float"""
+    if value is None:
+        return None
+    try:
+        return float(value.strip())
+    except ValueError:
+        return None
+
+def looks_like_invoice_xml(content: Union[bytes, str, mmap.mmap]) -> bool:
+    """
+    Indica si el contenido parece una factura electrónica XML
+
+    Args:
+        content: Contenido del adjunto
+
+    Returns:
+        True si el elemento raíz es un Comprobante CFDI o una Invoice UBL
+    """
+    head = content[:2048]
+    if isinstance(head, bytes):
+        head = head.decode('utf-8', errors='ignore')
+
+    match = _ROOT_RE.match(head)
+    return bool(match) and match.group(1) in ROOT_ELEMENTS
+
+class XMLInvoiceExtractor:
+    """
+    Extractor de facturas electrónicas CFDI 3.3/4.0 y UBL 2.1
+
+    Usa iterparse y libera cada elemento al cerrarlo, así las facturas con
+    miles de conceptos no construyen el árbol completo en memoria.
+    """
+
+    def extract(self, content: Union[bytes, str, mmap.mmap]) -> Optional[Dict[str, Any]]:
+        """
+        Extrae los datos de una factura XML
+
+        Args:
+            content: XML de la factura (bytes, texto o mmap de un adjunto en disco)
+
+        Returns:
+            Diccionario con los campos de InvoiceData (ver InvoiceData.from_dict), o None
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+
+        try:
+            fields = self._parse(content)
+        except ET.ParseError as e:
+            logger.warning(f"⚠️ XML de factura mal formado: {e}")
+            return None
+
+        if not fields:
+            return None
+
+        return self._build_result(fields)
+
+    def _parse(self, content: Union[bytes, mmap.mmap]) -> Optional[Dict[str, Any]]:
+        """Recorre el XML en streaming y reúne los campos del esquema"""
+        fields: Dict[str, Any] = {'concepts': []}
+        path: List[str] = []
+        elements: List[ET.Element] = []
+        schema = None
+
+        # Un mmap se lee como flujo, sin copiarlo a memoria
+        if isinstance(content, mmap.mmap):
+            content.seek(0)
+            source = content
+        else:
+            source = io.BytesIO(content)
+
+        for event, elem in ET.iterparse(source, events=('start', 'end')):
+            name = _local_name(elem.tag)
+
+            if event == 'start':
+                path.append(name)
+                elements.append(elem)
+
+                if schema is None:
+                    schema = ROOT_ELEMENTS.get(name)
+                    if schema is None:
+                        return None
+
+                if schema == 'cfdi':
+                    self._handle_cfdi(name, elem.attrib, fields)
+                continue
+
+            # event == 'end'
+            if schema == 'ubl':
+                self._handle_ubl(path, elem, fields)
+            elif schema == 'attached' and name == 'Description' and 'ExternalReference' in path:
+                # Documento DIAN: la factura UBL viaja embebida como texto
+                embedded = (elem.text or '').strip()
+                if looks_like_invoice_xml(embedded):
+                    return self._parse(embedded.encode('utf-8'))
+
+            # Liberar el elemento ya procesado
+            path.pop()
+            elements.pop()
+            elem.clear()
+            if elements:
+                elements[-1].remove(elem)
+
+        fields['schema'] = schema
+        return fields if schema in ('cfdi', 'ubl') else None
+
+    def _handle_cfdi(self, name: str, attrib: Dict[str, str], fields: Dict[str, Any]):
+        """Procesa los atributos de un elemento CFDI"""
+        if name == 'Comprobante':
+            serie = attrib.get('Serie', '')
+            folio = attrib.get('Folio', '')
+            if folio:
+                fields['invoice_number'] = f"{serie}-{folio}" if serie else folio
+            fields['invoice_date'] = attrib.get('Fecha', '')[:10] or None
+            fields['amount'] = _to_float(attrib.get('Total'))
+            fields['subtotal'] = _to_float(attrib.get('SubTotal'))
+            fields['currency'] = attrib.get('Moneda')
+            fields['payment_method'] = CFDI_PAYMENT_METHODS.get(attrib.get('FormaPago', ''))
+
+        elif name == 'Emisor':
+            fields['vendor'] = attrib.get('Nombre')
+            fields['tax_id'] = attrib.get('Rfc')
+
+        elif name == 'Concepto':
+            description = attrib.get('Descripcion')
+            if description and len(fields['concepts']) < MAX_CONCEPTS:
+                fields['concepts'].append(description)
+
+        elif name == 'Impuestos' and 'TotalImpuestosTrasladados' in attrib:
+            # Solo el nodo de impuestos del comprobante trae los totales
+            fields['tax'] = _to_float(attrib.get('TotalImpuestosTrasladados'))
+
+        elif name == 'TimbreFiscalDigital' and 'invoice_number' not in fields:
+            fields['invoice_number'] = attrib.get('UUID')
+
+    def _handle_ubl(self, path: List[str], elem: ET.Element, fields: Dict[str, Any]):
+        """Procesa un elemento UBL ya cerrado (con su texto completo)"""
+        name = path[-1]
+        parent = path[-2] if len(path) > 1 else ''
+        text = (elem.text or '').strip()
+        depth = len(path)
+
+        # Campos directos de la factura (hijos de la raíz)
+        if depth == 2:
+            if name == 'ID':
+                fields['invoice_number'] = text
+            elif name == 'IssueDate':
+                fields['invoice_date'] = text
+            elif name == 'DueDate':
+                fields['due_date'] = text
+            elif name == 'DocumentCurrencyCode':
+                fields['currency'] = text
+
+        elif 'AccountingSupplierParty' in path:
+            if name in ('RegistrationName', 'Name') and parent in ('PartyTaxScheme', 'PartyLegalEntity', 'PartyName'):
+                # Preferir la razón social registrada sobre el nombre comercial
+                if name == 'RegistrationName' or not fields.get('vendor'):
+                    fields['vendor'] = text
+            elif name == 'CompanyID' and not fields.get('tax_id'):
+                fields['tax_id'] = text
+
+        elif parent == 'LegalMonetaryTotal':
+            if name == 'PayableAmount':
+                fields['amount'] = _to_float(text)
+            elif name == 'LineExtensionAmount':
+                fields['subtotal'] = _to_float(text)
+
+        elif name == 'TaxAmount' and parent == 'TaxTotal' and depth == 3:
+            # Solo los TaxTotal del documento, no los de cada línea
+            fields['tax'] = (fields.get('tax') or 0.0) + (_to_float(text) or 0.0)
+
+        elif name == 'PaymentMeansCode' and parent == 'PaymentMeans':
+            fields['payment_method'] = UBL_PAYMENT_METHODS.get(text)
+
+        elif name == 'Description' and parent == 'Item':
+            if text and len(fields['concepts']) < MAX_CONCEPTS:
+                fields['concepts'].append(text)
+
+    def _build_result(self, fields: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Construye el resultado con los campos de InvoiceData"""
+        concepts = fields.pop('concepts')
+        schema = fields.pop('schema')
+
+        data = {key: value for key, value in fields.items() if value not in (None, '')}
+        if concepts:
+            data['concept'] = '; '.join(concepts)[:200]
+        data.setdefault('payment_method', None)
+        data['language'] = 'es'
+        data['extraction_method'] = schema
+
+        if 'amount' not in data:
+            return None
+
+        # Con los campos del esquema presentes el dato es exacto
+        schema_complete = all(data.get(key) for key in ('amount', 'vendor', 'tax_id', 'invoice_number'))
+        data['confidence'] = 1.0 if schema_complete else 0.9
+
+        logger.debug(f"🧾 Factura {schema.upper()} leída: {data.get('invoice_number', 's/n')} "
+                    f"({data.get('amount')} {data.get('currency', '')})")
+        return data
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests del spool de adjuntos - DOCUFIND
+"""
+
+import os
+import sys
+import subprocess
+import tempfile
+import unittest
+from email.message import EmailMessage
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.attachment_spool import AttachmentSpool, SPOOL_DIR_PREFIX
+
+def _spool_dir(base, pid):
+    path = Path(base) / f'{SPOOL_DIR_PREFIX}{pid}'
+    path.mkdir()
+    (path / 'docufind-att-x').write_bytes(b'data')
+    return path
+
+class AttachmentSpoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @unittest.skipUnless(os.name == 'posix', "Comprobación de PID solo en POSIX")
+    def test_only_spools_of_dead_processes_are_removed(self):
+        finished = subprocess.Popen([sys.executable, '-c', 'pass'])
+        finished.wait()
+
+        running = _spool_dir(self.tmp.name, os.getppid())
+        dead = _spool_dir(self.tmp.name, finished.pid)
+        own = _spool_dir(self.tmp.name, os.getpid())
+
+        spool = AttachmentSpool(self.tmp.name)
+
+        self.assertTrue((running / 'docufind-att-x').exists())
+        self.assertFalse(dead.exists())
+        self.assertEqual(list(own.iterdir()), [])
+        self.assertEqual(spool.directory, own)
+
+    def test_spilled_attachment_lives_in_process_directory(self):
+        spool = AttachmentSpool(self.tmp.name, memory_budget=0)
+        part = EmailMessage()
+        part.set_content(b'x' * 1000, maintype='application', subtype='pdf')
+
+        attachment = spool.store(part)
+        self.assertFalse(attachment.in_memory)
+        self.assertEqual(attachment.path.parent, spool.directory)
+        self.assertEqual(bytes(attachment.content), b'x' * 1000)
+
+        path = attachment.path
+        attachment.close()
+        self.assertFalse(path.exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Tests de la caché de IDs de Drive - DOCUFIND
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.drive_cache import DriveIdCache
+
+class DriveIdCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = DriveIdCache(None)
+        self.cache.ids = {
+            'folder:root/DOCUFIND': 'R',
+            'folder:R/2026': 'Y',
+            'folder:Y/10-October': 'M',
+            'folder:M/Otros': 'O',
+            'folder:R/2025': 'Z',
+        }
+
+    def test_invalidate_tree_removes_descendants(self):
+        self.assertEqual(self.cache.invalidate_tree('Y'), 3)
+        self.assertEqual(self.cache.ids, {'folder:root/DOCUFIND': 'R', 'folder:R/2025': 'Z'})
+
+    def test_folder_path(self):
+        self.assertEqual(self.cache.folder_path('O'), 'DOCUFIND/2026/10-October/Otros')
+        self.cache.invalidate_tree('M')
+        self.assertIsNone(self.cache.folder_path('O'))
+
+if __name__ == '__main__':
+    unittest.main()
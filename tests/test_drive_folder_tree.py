@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Tests de la creación de carpetas por lotes - DOCUFIND
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    from src.google_drive_client import GoogleDriveClient
+except ImportError:
+    GoogleDriveClient = None
+
+class FakeRequest:
+    """Petición sin ejecutar: devuelve una respuesta fija dentro del lote"""
+
+    def __init__(self, method, response):
+        self.method = method
+        self.response = response
+
+class FakeBatch:
+    """Lote HTTP que responde cada petición con su respuesta fija"""
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        for request_id, request in self.requests:
+            self.callback(request_id, request.response, None)
+
+class FakeFiles:
+
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, q, fields):
+        return FakeRequest('GET', {'files': []})
+
+    def create(self, body, fields):
+        self.service.created.append(body['name'])
+        return FakeRequest('POST', {'id': f"id-{body['name']}"})
+
+class FakeDriveService:
+
+    def __init__(self):
+        self.created = []
+
+    def files(self):
+        return FakeFiles(self)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(callback)
+
+@unittest.skipIf(GoogleDriveClient is None, "Librerías de Google no instaladas")
+class CreateFolderTreeTest(unittest.TestCase):
+
+    def test_fresh_client_authenticates_first(self):
+        client = GoogleDriveClient()
+        service = FakeDriveService()
+
+        def authenticate():
+            client.drive_service = service
+            return True
+
+        client.authenticate = authenticate
+        self.assertEqual(client.create_folder_tree(['DOCUFIND/2026']),
+                         {'DOCUFIND/2026': 'id-2026'})
+        self.assertEqual(service.created, ['DOCUFIND', '2026'])
+
+    def test_failed_authentication_returns_empty(self):
+        client = GoogleDriveClient()
+        client.authenticate = lambda: False
+        self.assertEqual(client.create_folder_tree(['DOCUFIND/2026']), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Tests de la actualización parcial de extracciones en caché - DOCUFIND
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.invoice_extractor import InvoiceExtractor
+
+# Documento largo (cabecera y cola) sin monto ni número de factura
+LONG_TEXT = "Proveedor: ACME SAS\nServicio de hosting mensual\n" + "Detalle de uso del servicio\n" * 1000
+
+class ExtractionRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = InvoiceExtractor()
+        _, self.state = self.extractor.extract_with_state(LONG_TEXT)
+
+    def test_full_scan_is_recorded(self):
+        self.assertNotIn('full', self.state['windows'])
+        self.assertEqual(sorted(self.state['full_scan']), ['amount', 'invoice_number'])
+
+    def test_unrelated_stale_group_refreshes(self):
+        self.assertIsNotNone(self.extractor.refresh(self.state, {'category'}))
+        self.assertIsNotNone(self.extractor.refresh(self.state, {'patterns.vendor'}))
+
+    def test_stale_required_field_needs_full_text(self):
+        self.assertIsNone(self.extractor.refresh(self.state, {'patterns.amount'}))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests del pool de sesiones IMAP - DOCUFIND
+"""
+
+import os
+import sys
+import imaplib
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.email_processor import IMAPConnectionPool
+
+class FakeSession:
+    """Sesión IMAP mínima para el pool"""
+
+    def __init__(self):
+        self.logged_out = False
+
+    def logout(self):
+        self.logged_out = True
+
+class IMAPConnectionPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.opened = []
+
+        def factory():
+            session = FakeSession()
+            self.opened.append(session)
+            return session
+
+        self.pool = IMAPConnectionPool(factory, size=1)
+
+    def test_error_returns_session_to_pool(self):
+        with self.assertRaises(imaplib.IMAP4.error):
+            with self.pool.connection():
+                raise imaplib.IMAP4.error('UID STORE failed')
+
+        # Con size=1, una sesión perdida bloquearía acquire() para siempre
+        with self.pool.connection() as session:
+            self.assertIs(session, self.opened[0])
+        self.assertEqual(len(self.opened), 1)
+        self.assertFalse(self.opened[0].logged_out)
+
+    def test_value_error_returns_session_to_pool(self):
+        with self.assertRaises(ValueError):
+            with self.pool.connection():
+                int('no-uid')
+
+        with self.pool.connection() as session:
+            self.assertIs(session, self.opened[0])
+
+    def test_abort_discards_session(self):
+        with self.assertRaises(imaplib.IMAP4.abort):
+            with self.pool.connection():
+                raise imaplib.IMAP4.abort('socket error')
+
+        self.assertTrue(self.opened[0].logged_out)
+        with self.pool.connection() as session:
+            self.assertIs(session, self.opened[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Tests de montos y monedas del extractor - DOCUFIND
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.invoice_extractor import InvoiceExtractor, parse_amount_text
+
+class InvoiceAmountTest(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = InvoiceExtractor()
+
+    def test_decimal_comma_amount_with_currency_code(self):
+        data = self.extractor.extract("Factura No. 123\nProveedor: ACME SAS\nTotal: $1.234,56 COP\n")
+        self.assertEqual(data.amount, 1234.56)
+        self.assertEqual(data.currency, 'COP')
+
+    def test_dollar_sign_without_code_is_usd(self):
+        data = self.extractor.extract("Invoice #55\nFrom: Foo Inc\nTotal: $1,234.56\n")
+        self.assertEqual(data.amount, 1234.56)
+        self.assertEqual(data.currency, 'USD')
+
+    def test_parse_amount_formats(self):
+        self.assertEqual(parse_amount_text('1.234,56'), 1234.56)
+        self.assertEqual(parse_amount_text('1,234.56'), 1234.56)
+        self.assertEqual(parse_amount_text('1.234.567'), 1234567.0)
+        self.assertEqual(parse_amount_text('1,234,567'), 1234567.0)
+        self.assertEqual(parse_amount_text('12,5'), 12.5)
+        self.assertIsNone(parse_amount_text('N/A'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests del buffer de filas de Google Sheets - DOCUFIND
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+try:
+    from src.google_drive_client import SheetRowBuffer
+except ImportError:
+    SheetRowBuffer = None
+
+class FakeClient:
+    """Cliente que registra las filas enviadas"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+        self.appended = threading.Event()
+
+    def append_rows_to_spreadsheet(self, spreadsheet_id, rows):
+        if self.fail:
+            return False
+        self.sent.append(list(rows))
+        self.appended.set()
+        return True
+
+@unittest.skipIf(SheetRowBuffer is None, "Librerías de Google no instaladas")
+class SheetRowBufferTest(unittest.TestCase):
+
+    def test_rows_are_flushed_on_time_without_new_rows(self):
+        client = FakeClient()
+        written = []
+        buffer = SheetRowBuffer(client, 'sheet', max_rows=10, max_seconds=0.05,
+                                on_written=written.extend)
+        buffer.add(['a'], tag='1')
+
+        self.assertTrue(client.appended.wait(2))
+        self.assertEqual(client.sent, [[['a']]])
+        self.assertEqual(written, ['1'])
+        self.assertEqual(buffer.rows, [])
+
+    def test_close_stops_the_timer(self):
+        client = FakeClient()
+        buffer = SheetRowBuffer(client, 'sheet', max_rows=10, max_seconds=0.05)
+        buffer.add(['a'])
+        buffer.close()
+
+        self.assertFalse(client.appended.wait(0.2))
+        self.assertEqual(buffer.rows, [['a']])
+
+if __name__ == '__main__':
+    unittest.main()
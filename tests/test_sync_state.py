@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests de la sincronización incremental - DOCUFIND
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.email_processor import EmailProcessor
+from src.sync_state import SyncStateStore
+
+class FakeIMAP:
+    """Conexión IMAP mínima: STATUS, SELECT y UID SEARCH"""
+
+    def __init__(self, uids):
+        self.uids = uids
+        self.criteria = None
+
+    def status(self, folder, items):
+        return 'OK', [b'INBOX (UIDNEXT 100 UIDVALIDITY 7)']
+
+    def select(self, folder):
+        return 'OK', [b'1']
+
+    def uid(self, command, charset, criteria):
+        self.criteria = criteria
+        return 'OK', [b' '.join(str(uid).encode() for uid in self.uids)]
+
+class IncrementalSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = SyncStateStore(os.path.join(self.tmp.name, 'sync_state.json'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _processor(self, uids):
+        processor = EmailProcessor({'username': 'user', 'spool_attachments': False},
+                                   sync_state=self.store)
+        processor.connected = True
+        processor.connection = FakeIMAP(uids)
+        return processor
+
+    def test_failed_uid_is_retried_next_run(self):
+        processor = self._processor([1, 2, 3, 4])
+        processor.search_uids()
+        for uid in ('1', '2', '4'):
+            processor.mark_processed(uid)
+
+        state = self.store.get('user', 'INBOX')
+        self.assertEqual(state['last_uid'], 4)
+        self.assertEqual(state['retry_uids'], [3])
+
+        processor = self._processor([3, 5])
+        self.assertEqual(processor.search_uids(), [b'3', b'5'])
+        self.assertIn('OR UID 3 UID 5:*', processor.connection.criteria)
+
+        processor.mark_processed('3')
+        processor.mark_processed('5')
+        state = self.store.get('user', 'INBOX')
+        self.assertEqual(state['last_uid'], 5)
+        self.assertEqual(state['retry_uids'], [])
+
+    def test_rejected_uid_is_not_retried(self):
+        processor = self._processor([1, 2, 3, 4])
+        processor.search_uids()
+        processor._fetch_metadata_batch = lambda batch, connection: (
+            [{'uid': uid, 'parts': []} for uid in batch], 0)
+        processor._select_parts = lambda meta, *filters: None if meta['uid'] in (2, 4) else []
+        processor._fetch_parts_batch = lambda selected, connection: (
+            [{'id': str(meta['uid'])} for meta, _ in selected], 0)
+
+        emails, _, _, rejected = processor._fetch_two_phase_batch([1, 2, 3, 4], None, None, None, True, None)
+        self.assertEqual([email['id'] for email in emails], ['1', '3'])
+        self.assertEqual(rejected, [2, 4])
+
+        # 1 falla al procesarse: solo ese queda pendiente
+        processor.mark_skipped(rejected)
+        processor.mark_processed('3')
+        state = self.store.get('user', 'INBOX')
+        self.assertEqual(state['last_uid'], 4)
+        self.assertEqual(state['retry_uids'], [1])
+
+    def test_failing_uid_gives_up_after_max_retries(self):
+        attempts = []
+        for run in range(3):
+            processor = self._processor([3, 4] if run == 0 else [3])
+            processor.search_uids()
+            attempts.append(processor.mark_failed('3'))
+            if run == 0:
+                processor.mark_processed('4')
+            state = self.store.get('user', 'INBOX')
+            self.assertEqual(state['retry_uids'], [3] if run < 2 else [])
+
+        self.assertEqual(attempts, [1, 2, 3])
+        self.assertEqual(state['failures'], {})
+
+    def test_cursor_never_moves_back(self):
+        self.store.update('user', 'INBOX', 7, 10)
+        self.store.update('user', 'INBOX', 7, 4)
+        self.assertEqual(self.store.get('user', 'INBOX')['last_uid'], 10)
+
+if __name__ == '__main__':
+    unittest.main()